@@ -1,20 +1,16 @@
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
 import json
-from tools.generate_image import generate_image
-
-# Define model constant locally to avoid circular import
-MODEL_GEMINI_2_0_FLASH = "gemini-2.0-flash"
-
-# Define model
-MODEL_GEMINI_2_0_FLASH = "gemini-2.0-flash"
-MODEL_GEMINI_2_5_FLASH_LIVE ="gemini-live-2.5-flash-preview"
-AGENT_MODEL = MODEL_GEMINI_2_0_FLASH
+from tools.generate_image import generate_images
+from tools.image_jobs import cancel_image_job, get_image_job_status, submit_image_job
+from tools.result_shaping import shape_tool_result
+from tools.template_answers import answer_from_template
+from models.registry import model_for
+from models.response_cache import lookup_cached_response, store_model_response
 
 image_agent = Agent(
     name="image_agent_v1",
-    model=AGENT_MODEL,  # Can be a string for Gemini or a LiteLlm object
+    model=model_for("image_agent"),  # AGENT_MODEL / IMAGE_AGENT_MODEL via models/registry.py
     description="A specialized AI image generation assistant that creates images using OpenAI's DALL-E API based on text descriptions.",
     instruction="""You are a creative and helpful AI image generation assistant. Your primary function is to create stunning images using OpenAI's DALL-E API based on user descriptions.
 
@@ -39,17 +35,24 @@ When a user asks for image generation:
    - **Portrait (1024x1792)**: Perfect for phone wallpapers, posters, tall compositions
    - **Quality**: Standard (faster, cost-effective) or HD (higher detail, premium)
 
-4. **Use the generate_image tool** to create the image with appropriate parameters:
+4. **Use the submit_image_job tool** to start the image in the background with appropriate parameters:
    - Default to 1024x1024 and standard quality unless specified
    - Choose size based on the intended use case
    - Use HD quality for professional or detailed work when requested
+   - It returns a job_id right away; tell the user the image is being created (rendering takes 10-20 seconds)
+   - Use the get_image_job_status tool with the job_id when the user asks about the image or wants to see it
+   - If the job is still 'queued' or 'running', say so and offer to check again
+   - Use the cancel_image_job tool if the user changes their mind or asks to stop
+   - Matching earlier images are reused automatically (the status shows cache_hit and the cached_prompt); set force_new=True when the user explicitly wants a fresh or different version
 
-5. **Present the results professionally**:
+5. **Present the results professionally** once get_image_job_status reports 'succeeded':
    - If successful, provide both the image URL and local file path
    - Show the local path prominently since ADK web doesn't have image preview yet
+   - When the result includes an image_link, share it as the link to view the image
    - Include the final prompt used for transparency
    - Mention the image specifications (size, quality)
    - Offer to create variations or modifications
+   - When the user wants several variations, use the generate_images tool in one call: pass prompt with n for renders of one prompt, or prompts for a list of different takes. Report every image, including any that failed
 
 6. **Handle different scenarios**:
    - If no specific description is given, ask for clarification
@@ -103,6 +106,9 @@ Example response format:
 **Suggestions**: [Any follow-up ideas or variations]
 ```
 
-Remember: Always use the generate_image tool to create actual images. Never claim to have generated images without using the tool. Focus on creating detailed, artistic prompts that will produce high-quality results. Be helpful in refining prompts and guiding users toward better image generation.""",
-    tools=[generate_image],  # Pass the function directly
+Remember: Always use the submit_image_job tool to create actual images and get_image_job_status to retrieve them. Never claim to have generated images without using the tool. Focus on creating detailed, artistic prompts that will produce high-quality results. Be helpful in refining prompts and guiding users toward better image generation.""",
+    tools=[submit_image_job, get_image_job_status, cancel_image_job, generate_images],  # Single renders run in a background worker pool
+    after_tool_callback=shape_tool_result,  # Trim results to a token budget before the next model turn
+    before_model_callback=[answer_from_template, lookup_cached_response],  # Templates only count the turn here; LLM_CACHE_EXCLUDED_AGENTS skips the cache by default
+    after_model_callback=store_model_response,  # Persists responses for identical requests (models/response_cache.py)
 )
\ No newline at end of file
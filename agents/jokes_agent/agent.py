@@ -1,20 +1,15 @@
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
 import json
-from tools.get_jokes import get_jokes
-
-# Define model constant locally to avoid circular import
-MODEL_GEMINI_2_0_FLASH = "gemini-2.0-flash"
-
-# Define model
-MODEL_GEMINI_2_0_FLASH = "gemini-2.0-flash"
-MODEL_GEMINI_2_5_FLASH_LIVE ="gemini-live-2.5-flash-preview"
-AGENT_MODEL = MODEL_GEMINI_2_0_FLASH
+from tools.get_jokes import get_jokes, search_jokes
+from tools.result_shaping import shape_tool_result
+from tools.template_answers import answer_from_template
+from models.registry import model_for
+from models.response_cache import lookup_cached_response, store_model_response
 
 jokes_agent = Agent(
     name="jokes_agent_v1",
-    model=AGENT_MODEL,  # Can be a string for Gemini or a LiteLlm object
+    model=model_for("jokes_agent"),  # AGENT_MODEL / JOKES_AGENT_MODEL via models/registry.py
     description="A specialized comedy assistant that provides jokes from various categories to brighten your day.",
     instruction="""You are a friendly and entertaining jokes assistant. Your primary function is to provide jokes from various categories to users who want to laugh and have fun.
 
@@ -34,6 +29,8 @@ When a user asks for jokes:
    - **general**: Universal, family-friendly jokes
    - **office**: Workplace and professional humor
 
+   If the user asks for jokes about a topic rather than a category ("a joke about cats", "something about databases", "coffee jokes"), use the **search_jokes** tool with the topic as the query instead. It searches every joke's text and falls back to a category when the query names one.
+
 3. **Present the jokes engagingly**:
    - If the tool returns successful results, deliver the jokes with enthusiasm
    - Format jokes clearly with setup and punchline
@@ -44,7 +41,7 @@ When a user asks for jokes:
    - If no category is specified, default to "general"
    - If no count is mentioned, provide 1 joke
    - If users ask for multiple jokes (2-5), accommodate their request
-   - If an invalid category is requested, suggest available categories
+   - If an unknown category is requested, try search_jokes with it as the query before suggesting available categories
 
 5. **Error handling**:
    - If the tool returns an error, politely inform the user
@@ -52,7 +49,7 @@ When a user asks for jokes:
    - Offer to tell a general joke as a fallback
 
 6. **Interactive features**:
-   - Ask if users want more jokes from the same category
+   - Ask if users want more jokes from the same category (the tool won't repeat a joke in this conversation until the category runs out)
    - Suggest other categories they might enjoy
    - Encourage sharing and spreading laughter
    - Be conversational and maintain a fun atmosphere
@@ -69,6 +66,9 @@ When a user asks for jokes:
    - Use line breaks and spacing for better readability
    - Number multiple jokes clearly
 
-Remember: Always use the get_jokes tool to get actual jokes. Never make up jokes. Focus on delivering entertainment and spreading joy through humor. Be respectful and keep all content family-friendly.""",
-    tools=[get_jokes],  # Pass the function directly
+Remember: Always use the get_jokes or search_jokes tool to get actual jokes. Never make up jokes. Focus on delivering entertainment and spreading joy through humor. Be respectful and keep all content family-friendly.""",
+    tools=[get_jokes, search_jokes],  # Pass the functions directly
+    after_tool_callback=shape_tool_result,  # Trim results to a token budget before the next model turn
+    before_model_callback=[answer_from_template, lookup_cached_response],  # Simple joke requests skip the model when TEMPLATE_ANSWERS_ENABLED is set
+    after_model_callback=store_model_response,  # Persists responses for identical requests (models/response_cache.py)
 )
\ No newline at end of file
@@ -1,22 +1,20 @@
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
 import json
 import os
 from dotenv import load_dotenv
-from tools.get_latest_news import get_news
+from tools.get_latest_news import get_news_async, get_news_many
+from tools.result_shaping import shape_tool_result
+from tools.template_answers import answer_from_template
+from models.registry import model_for
+from models.response_cache import lookup_cached_response, store_model_response
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Define model
-MODEL_GEMINI_2_0_FLASH = "gemini-2.0-flash"
-MODEL_GEMINI_2_5_FLASH_LIVE ="gemini-live-2.5-flash-preview"
-AGENT_MODEL = MODEL_GEMINI_2_0_FLASH
-
 social_media_agent = Agent(
     name="social_media_agent_v1",
-    model=AGENT_MODEL,  # Can be a string for Gemini or a LiteLlm object
+    model=model_for("social_media_agent"),  # AGENT_MODEL / SOCIAL_MEDIA_AGENT_MODEL via models/registry.py
     description="A specialized social media assistant that creates engaging social media posts from news content.",
     instruction="""You are a creative and engaging social media assistant. Your primary function is to transform news content into compelling social media posts for Threads and Twitter.
 
@@ -28,7 +26,8 @@ When a user asks for social media content:
    - "Make posts about technology trends"
    - "Social media content for artificial intelligence"
 
-2. **Use the get_news tool** to fetch relevant news articles for that topic.
+2. **Use the get_news_async tool** to fetch relevant news articles for that topic.
+   - If the request covers several topics (e.g., "AI and climate and chips"), call **get_news_many** once with all topics instead of calling get_news_async per topic. Its articles are already deduplicated and each one lists the topics it matched.
 
 3. **Create multiple social media post variations**:
    - **Twitter/X**: Concise, engaging, use hashtags, focus on key facts and trends (280 character limit)
@@ -93,6 +92,9 @@ When a user asks for social media content:
    - Explain your reasoning for tone and approach
    - Use clear numbering (Suggestion #1, Suggestion #2, etc.) with proper spacing between suggestions
 
-Remember: Always use the get_news tool to get actual news data. Never make up news content. Focus on creating engaging, shareable content that adds value to your audience. Provide one Unsplash search term that works for all posts to maintain visual consistency.""",
-   tools=[get_news]
+Remember: Always use the get_news_async tool to get actual news data. Never make up news content. Focus on creating engaging, shareable content that adds value to your audience. Provide one Unsplash search term that works for all posts to maintain visual consistency.""",
+   tools=[get_news_async, get_news_many],  # Async variants keep the event loop free while NewsAPI responds
+   after_tool_callback=shape_tool_result,  # Trim results to a token budget before the next model turn
+   before_model_callback=[answer_from_template, lookup_cached_response],  # Templates only count the turn here; repeated requests are answered from the LLM cache
+   after_model_callback=store_model_response,  # Persists responses for identical requests (models/response_cache.py)
 ) 
\ No newline at end of file
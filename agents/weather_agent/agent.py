@@ -1,20 +1,15 @@
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
 import json
-from tools.get_weather import get_weather
-
-# Define model constant locally to avoid circular import
-MODEL_GEMINI_2_0_FLASH = "gemini-2.0-flash"
-
-# Define model
-MODEL_GEMINI_2_0_FLASH = "gemini-2.0-flash"
-MODEL_GEMINI_2_5_FLASH_LIVE ="gemini-live-2.5-flash-preview"
-AGENT_MODEL = MODEL_GEMINI_2_0_FLASH
+from tools.get_weather import get_weather, get_weather_many
+from tools.result_shaping import shape_tool_result
+from tools.template_answers import answer_from_template
+from models.registry import model_for
+from models.response_cache import lookup_cached_response, store_model_response
 
 weather_agent = Agent(
     name="weather_agent_v1",
-    model=AGENT_MODEL,  # Can be a string for Gemini or a LiteLlm object
+    model=model_for("weather_agent"),  # AGENT_MODEL / WEATHER_AGENT_MODEL via models/registry.py
     description="A specialized weather assistant that provides current weather information for cities worldwide.",
     instruction="""You are a helpful and accurate weather assistant. Your primary function is to provide weather information for specific cities.
 
@@ -27,6 +22,8 @@ When a user asks about the weather:
    - "Weather for Paris"
 
 2. **Use the get_weather tool** to fetch the current weather information for that city.
+   - Pass the city as the user wrote it; nicknames ("NYC") and small misspellings ("Tokio") are resolved by the tool
+   - If the question covers several cities (e.g., "Which of these is warmest?", "Where is it not raining?"), call **get_weather_many** once with all of them instead of calling get_weather per city. Let it do the work: sort_by ('warmest', 'coldest', 'name', 'population'), filter (e.g., "temperature > 20 and not rain", "conditions = snow", "country = JP"), units ('C' or 'F') and limit for a top N. Its results are already ranked.
 
 3. **Present the information clearly**:
    - If the tool returns a successful response, provide a friendly, conversational weather report
@@ -43,6 +40,9 @@ When a user asks about the weather:
    - Provide context when appropriate (e.g., "That's quite warm for this time of year")
    - Ask follow-up questions if the user might want additional information
 
-Remember: Always use the get_weather tool to get the actual weather data. Never make up weather information.""",
-    tools=[get_weather],  # Pass the function directly
+Remember: Always use the get_weather or get_weather_many tool to get the actual weather data. Never make up weather information.""",
+    tools=[get_weather, get_weather_many],  # Pass the functions directly
+    after_tool_callback=shape_tool_result,  # Trim results to a token budget before the next model turn
+    before_model_callback=[answer_from_template, lookup_cached_response],  # Simple lookups skip the model when TEMPLATE_ANSWERS_ENABLED is set
+    after_model_callback=store_model_response,  # Persists responses for identical requests (models/response_cache.py)
 )
\ No newline at end of file
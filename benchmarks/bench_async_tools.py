@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Async Tools Benchmark
+Runs N concurrent "sessions" on one event loop against a local stand-in
+server and compares the sync tools (called inline, as ADK does for plain
+functions) with the async variants. Reports wall time, per-session latency
+and the worst event-loop stall seen by a heartbeat task.
+
+Usage: python -m benchmarks.bench_async_tools [--sessions 20] [--delay 0.5]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.stand_in_server import StandInServer
+
+
+async def _heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Returns the largest delay observed between scheduled ticks."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def _run(label: str, sessions: int, call) -> None:
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(stop))
+    latencies = []
+
+    async def session(i: int) -> None:
+        start = time.perf_counter()
+        result = await call(i)
+        latencies.append(time.perf_counter() - start)
+        assert result["status"] == "success", result
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    wall = time.perf_counter() - start
+    stop.set()
+    stall = await heartbeat
+
+    print(
+        f"{label:<24} wall={wall:7.2f}s  p50={statistics.median(latencies):6.2f}s  "
+        f"max={max(latencies):6.2f}s  worst_loop_stall={stall:6.2f}s"
+    )
+
+
+async def main(sessions: int, delay: float, image_delay: float) -> None:
+    server = StandInServer(delay=delay, image_delay=image_delay).start()
+    os.environ["NEWS_API_BASE_URL"] = f"{server.base_url}/v2/everything"
+    os.environ["NEWS_API_KEY"] = "stand-in"
+    os.environ["OPENAI_BASE_URL"] = f"{server.base_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "stand-in"
+    os.environ["GENERATED_IMAGES_DIR"] = tempfile.mkdtemp(prefix="bench_images_")
+    os.environ["NEWS_ARCHIVE_ENABLED"] = "false"
+
+    # Import after the environment points at the stand-in server
+    from tools.get_latest_news import get_news, get_news_async
+    from tools.generate_image import generate_image, generate_image_async
+    from tools.cache import clear_caches
+    from tools.scheduler import UpstreamLimits, configure_upstream
+
+    # Lift the production rate limits so only event-loop blocking is measured
+    for upstream in ("newsapi", "openai_images", "image_download"):
+        configure_upstream(upstream, UpstreamLimits(rate=1000, burst=1000, max_concurrency=sessions))
+
+    print(f"{sessions} concurrent sessions, news delay {delay}s, image delay {image_delay}s")
+
+    async def sync_news(i):
+        return get_news(f"sync topic {i}")
+
+    async def async_news(i):
+        return await get_news_async(f"async topic {i}")
+
+    async def sync_image(i):
+        return generate_image(f"sync prompt {i}")
+
+    async def async_image(i):
+        return await generate_image_async(f"async prompt {i}")
+
+    clear_caches()
+    await _run("get_news (sync)", sessions, sync_news)
+    await _run("get_news_async", sessions, async_news)
+    await _run("generate_image (sync)", sessions, sync_image)
+    await _run("generate_image_async", sessions, async_image)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.5, help="NewsAPI stand-in delay (seconds)")
+    parser.add_argument("--image-delay", type=float, default=1.0, help="Image generation stand-in delay (seconds)")
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions, args.delay, args.image_delay))
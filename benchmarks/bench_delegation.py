@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Delegation Mode Benchmark
+Runs the agent team end to end in each delegation mode (AGENT_DELEGATION_MODE:
+"transfer" or "tools") with a scripted stand-in model in place of Gemini, and
+reports LLM calls, estimated prompt/output tokens and wall time per query.
+
+The stand-in "understands" a request by keywords (weather, joke, post) and
+behaves the way the real model is instructed to:
+
+- transfer: the coordinator transfers to one specialist; the specialist calls
+  its tool and answers, transferring back to the coordinator while parts of
+  the request remain
+- tools: the coordinator calls every relevant specialist tool in one turn
+  (ADK runs them in parallel), then combines their answers
+
+Each call sleeps for a first-token delay plus per-token prefill and decode
+time, so wall time reflects both call count and parallelism. Tools are the
+real ones: weather from the mock provider, jokes from the local corpus, news
+from the local stand-in server. Template answers and the LLM response cache
+are disabled; --router keeps the local intent router in transfer mode.
+
+Usage: python -m benchmarks.bench_delegation [--first-token 0.3] [--decode-rate 100] [--router]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from collections import Counter
+
+from benchmarks.stand_in_server import StandInServer
+
+QUERIES = [
+    "What's the weather in Paris?",
+    "Tell me a programming joke",
+    "Create a post about AI news",
+    "What's the weather in Tokyo? Also tell me a joke",
+    "Weather in London, and write a post about climate news",
+    "Weather in Rome, a joke, and a post about space news",
+]
+
+# Request keyword -> specialist the stand-in model delegates to
+INTENTS = {"weather": "weather_agent_v1", "joke": "jokes_agent_v1", "post": "social_media_agent_v1"}
+
+
+def _intents(text: str) -> list:
+    lowered = text.lower()
+    return [agent for keyword, agent in INTENTS.items() if keyword in lowered]
+
+
+def _tool_call(agent: str, text: str):
+    """The tool call a specialist makes for a request."""
+    if agent == "weather_agent_v1":
+        city = re.search(r"weather in ([A-Z][a-z]+)", text, re.IGNORECASE)
+        return "get_weather", {"city": city.group(1) if city else "Paris"}
+    if agent == "jokes_agent_v1":
+        return "get_jokes", {"category": "programming", "count": 1}
+    topic = re.search(r"about (\w+) news", text)
+    return "get_news_async", {"topic": topic.group(1) if topic else "AI", "max_articles": 3}
+
+
+def _build_stand_in(meter: Counter, first_token: float, prefill_rate: float, decode_rate: float, root_name: str):
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.genai import types
+    from tools.result_shaping import estimate_tokens
+
+    def texts(llm_request) -> list:
+        return [part.text for content in llm_request.contents for part in content.parts or [] if part.text]
+
+    def request_text(llm_request) -> str:
+        """The request this agent was given: the user's message, or an AgentTool request."""
+        for text in texts(llm_request):
+            if not text.startswith("For context"):
+                return text
+        return ""
+
+    def answered(llm_request) -> set:
+        """Specialists whose answers already appear in the conversation."""
+        joined = "\n".join(texts(llm_request))
+        return {agent for agent in INTENTS.values() if f"[{agent}] said" in joined}
+
+    def function_responses(llm_request) -> list:
+        return [part.function_response for content in llm_request.contents for part in content.parts or [] if part.function_response]
+
+    def call(name: str, **args):
+        return types.Part(function_call=types.FunctionCall(name=name, args=args))
+
+    class StandInLlm(BaseLlm):
+        """Scripted model for one agent (its name follows "stand-in/")."""
+
+        async def generate_content_async(self, llm_request, stream=False):
+            agent = self.model.split("/", 1)[1]
+            text = request_text(llm_request)
+            tools = set(llm_request.tools_dict)
+            if agent == root_name:
+                parts = self._coordinate(llm_request, text, tools)
+            else:
+                parts = self._specialize(agent, llm_request, text, tools)
+
+            instruction = llm_request.config.system_instruction if llm_request.config else ""
+            declarations = [tool.model_dump(mode="json", exclude_none=True) for tool in (llm_request.config.tools or [])] if llm_request.config else []
+            prompt_tokens = estimate_tokens(str(instruction)) + estimate_tokens(declarations) + estimate_tokens(
+                [content.model_dump(mode="json", exclude_none=True) for content in llm_request.contents]
+            )
+            output_tokens = estimate_tokens([part.model_dump(mode="json", exclude_none=True) for part in parts])
+            meter["calls"] += 1
+            meter[f"calls:{agent}"] += 1
+            meter["prompt_tokens"] += prompt_tokens
+            meter["output_tokens"] += output_tokens
+            await asyncio.sleep(first_token + prompt_tokens / prefill_rate + output_tokens / decode_rate)
+            yield LlmResponse(content=types.Content(role="model", parts=parts))
+
+        def _coordinate(self, llm_request, text: str, tools: set) -> list:
+            intents = _intents(text)
+            if "transfer_to_agent" in tools:
+                remaining = [agent for agent in intents if agent not in answered(llm_request)]
+                if remaining:
+                    return [call("transfer_to_agent", agent_name=remaining[0])]
+                return [types.Part(text="How else can I help?")]
+            results = [response for response in function_responses(llm_request) if response.name in INTENTS.values()]
+            if results or not intents:
+                combined = "\n\n".join(str((response.response or {}).get("result", ""))[:400] for response in results)
+                return [types.Part(text=f"Here's everything you asked for:\n\n{combined}" if combined else "How can I help?")]
+            return [call(agent, request=text) for agent in intents]
+
+        def _specialize(self, agent: str, llm_request, text: str, tools: set) -> list:
+            own = [response for response in function_responses(llm_request) if response.name in tools - {"transfer_to_agent"}]
+            if not own:
+                name, args = _tool_call(agent, text)
+                return [call(name, **args)]
+            answer = types.Part(text=f"Here you go: {json.dumps(own[-1].response, ensure_ascii=False, default=str)[:400]}")
+            remaining = [other for other in _intents(text) if other != agent and other not in answered(llm_request)]
+            if remaining and "transfer_to_agent" in tools:
+                return [answer, call("transfer_to_agent", agent_name=root_name)]
+            return [answer]
+
+    return StandInLlm
+
+
+async def main(first_token: float, prefill_rate: float, decode_rate: float, news_delay: float, router: bool) -> None:
+    server = StandInServer(delay=news_delay).start()
+    os.environ["NEWS_API_BASE_URL"] = f"{server.base_url}/v2/everything"
+    os.environ["NEWS_API_KEY"] = "stand-in"
+    os.environ["NEWS_ARCHIVE_ENABLED"] = "false"
+    os.environ["WEATHER_PROVIDER"] = "mock"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["TEMPLATE_ANSWERS_ENABLED"] = "false"
+    os.environ["ROUTER_ENABLED"] = "true" if router else "false"
+
+    # Import after the environment is configured
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+    from host_agent.agent import DELEGATION_MODES, ROOT_AGENT_NAME, build_root_agent
+    from agents.weather_agent.agent import weather_agent
+    from agents.social_media_agent.agent import social_media_agent
+    from agents.jokes_agent.agent import jokes_agent
+    from agents.image_agent.agent import image_agent
+    from tools.cache import clear_caches
+
+    meter = Counter()
+    stand_in = _build_stand_in(meter, first_token, prefill_rate, decode_rate, ROOT_AGENT_NAME)
+
+    async def run(runner, query: str) -> float:
+        clear_caches()
+        meter.clear()
+        session = await runner.session_service.create_session(app_name="bench_delegation", user_id="bench")
+        start = time.perf_counter()
+        async for _ in runner.run_async(
+            user_id="bench", session_id=session.id, new_message=types.Content(role="user", parts=[types.Part(text=query)])
+        ):
+            pass
+        return time.perf_counter() - start
+
+    runners = {}
+    for mode in DELEGATION_MODES:
+        # Fresh copies per mode: an agent can only have one parent
+        specialists = [
+            agent.clone(update={"model": stand_in(model=f"stand-in/{agent.name}")})
+            for agent in (weather_agent, social_media_agent, jokes_agent, image_agent)
+        ]
+        root = build_root_agent(mode, specialists=specialists, model=stand_in(model=f"stand-in/{ROOT_AGENT_NAME}"))
+        runners[mode] = InMemoryRunner(agent=root, app_name="bench_delegation")
+        # Untimed warm-up: gazetteer, joke corpus and router load on first use
+        await run(runners[mode], QUERIES[-1])
+
+    print(
+        f"stand-in model: first token {first_token}s, prefill {prefill_rate:g} tok/s, decode {decode_rate:g} tok/s; "
+        f"news delay {news_delay}s; router {'on' if router else 'off'}\n"
+    )
+    print(f"{'query':<56} {'mode':<9} {'calls':>5} {'prompt tok':>10} {'output tok':>10} {'wall':>7}  calls by agent")
+
+    totals = {}
+    for mode, runner in runners.items():
+        totals[mode] = Counter()
+        for query in QUERIES:
+            wall = await run(runner, query)
+            by_agent = ", ".join(
+                f"{key.split(':', 1)[1].replace('_agent_v1', '').replace(ROOT_AGENT_NAME, 'coordinator')}={count}"
+                for key, count in sorted(meter.items()) if key.startswith("calls:")
+            )
+            print(
+                f"{query[:55]:<56} {mode:<9} {meter['calls']:>5} {meter['prompt_tokens']:>10} "
+                f"{meter['output_tokens']:>10} {wall:>6.2f}s  {by_agent}"
+            )
+            totals[mode].update({key: meter[key] for key in ("calls", "prompt_tokens", "output_tokens")})
+            totals[mode]["wall_ms"] += round(wall * 1000)
+
+    print()
+    for mode, total in totals.items():
+        print(
+            f"{'total':<56} {mode:<9} {total['calls']:>5} {total['prompt_tokens']:>10} "
+            f"{total['output_tokens']:>10} {total['wall_ms'] / 1000:>6.2f}s"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-token", type=float, default=0.3, help="Stand-in time to first token (seconds)")
+    parser.add_argument("--prefill-rate", type=float, default=20000, help="Stand-in prompt tokens per second")
+    parser.add_argument("--decode-rate", type=float, default=100, help="Stand-in output tokens per second")
+    parser.add_argument("--news-delay", type=float, default=0.2, help="NewsAPI stand-in delay (seconds)")
+    parser.add_argument("--router", action="store_true", help="Keep the local intent router on in transfer mode")
+    args = parser.parse_args()
+    asyncio.run(main(args.first_token, args.prefill_rate, args.decode_rate, args.news_delay, args.router))
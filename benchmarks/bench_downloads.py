@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Image Download Benchmark
+Downloads padded PNGs from the local stand-in server with N concurrent
+workers, comparing the old approach (read the whole body, then write it)
+with the streaming, atomic download in tools/downloads.py. Reports wall
+time and peak Python memory (tracemalloc) for each image size.
+
+Usage: python -m benchmarks.bench_downloads [--sizes-mb 1 8 32] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.stand_in_server import StandInServer
+from tools import http_client
+from tools.downloads import async_download_to_file, download_stats
+
+
+def _naive_download(url: str, path: str) -> None:
+    response = http_client.get(url)
+    response.raise_for_status()
+    with open(path, "wb") as f:
+        f.write(response.content)
+
+
+async def _naive_download_async(url: str, path: str) -> None:
+    response = await http_client.async_get(url)
+    response.raise_for_status()
+    await asyncio.to_thread(_naive_write, path, response.content)
+
+
+def _naive_write(path: str, content: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+async def _run(label: str, download, url: str, directory: str, concurrency: int) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(download(url, os.path.join(directory, f"{label}_{i}.png")) for i in range(concurrency)))
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<10} wall={wall:6.2f}s  peak_memory={peak / 2 ** 20:8.1f} MiB")
+
+
+async def main(sizes_mb: list, concurrency: int) -> None:
+    directory = tempfile.mkdtemp(prefix="bench_downloads_")
+    for size_mb in sizes_mb:
+        server = StandInServer(image_bytes=size_mb * 2 ** 20).start()
+        url = f"{server.base_url}/images/bench.png"
+        print(f"{concurrency} concurrent downloads of {size_mb} MiB")
+        await _run("naive", _naive_download_async, url, directory, concurrency)
+        await _run("streaming", async_download_to_file, url, directory, concurrency)
+        server.shutdown()
+    print(download_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes_mb, args.concurrency))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Gazetteer Benchmark
+Compiles synthetic gazetteers of 10k, 100k and 1M places and measures, in a
+fresh subprocess per size, resident memory after opening the memory-mapped
+file and after a round of lookups (split into private memory and mapped
+file pages, which the kernel can drop), plus p50/p99 latency of exact,
+alias, fuzzy (one typo) and unknown-name lookups. Linux only (/proc).
+
+Usage: python -m benchmarks.bench_gazetteer [--sizes 10000 100000 1000000] [--queries 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from tools.gazetteer import build_gazetteer, normalize_place_name
+
+# Onset, vowel and optional coda give about 5,000 syllables, so names share
+# common trigrams the way real place names do without all looking alike
+ONSETS = ["", "b", "br", "c", "ch", "d", "dr", "f", "g", "gr", "h", "j", "k", "kr", "l", "m", "n",
+          "p", "pl", "qu", "r", "s", "sh", "st", "t", "tr", "v", "w", "y", "z"]
+VOWELS = ["a", "e", "i", "o", "u", "ai", "ea", "ou", "y"]
+CODAS = ["", "", "", "n", "r", "l", "s", "m", "t", "ng", "rd", "ck", "x", "th", "sk", "ll", "z"]
+SYLLABLES = [onset + vowel + coda for onset in ONSETS for vowel in VOWELS for coda in set(CODAS)]
+SUFFIXES = ["", "", "", " city", " springs", " heights", " falls", " harbor", " valley", " port"]
+
+
+def _name(rng: random.Random) -> str:
+    word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+    return (word + rng.choice(SUFFIXES)).title()
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    position = rng.randrange(1, len(text) - 1)
+    edit = rng.choice(["swap", "drop", "replace"])
+    if edit == "swap":
+        return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+    if edit == "drop":
+        return text[:position] + text[position + 1:]
+    return text[:position] + rng.choice("aeioulnrst") + text[position + 1:]
+
+
+def _places(size: int, rng: random.Random) -> list:
+    places = []
+    for _ in range(size):
+        name = _name(rng)
+        aliases = [_name(rng)] if rng.random() < 0.3 else []
+        places.append((name, "XX", rng.uniform(-60, 70), rng.uniform(-180, 180), int(rng.paretovariate(1.2) * 1000), aliases))
+    return places
+
+
+def _queries(places: list, count: int, rng: random.Random) -> dict:
+    named = rng.sample(places, count)
+    aliased = [place for place in places[: count * 10] if place[5]][:count]
+    long_names = [place[0] for place in named if len(place[0]) >= 8]
+    return {
+        "exact": [place[0] for place in named],
+        "alias": [place[5][0] for place in aliased],
+        "fuzzy": [[_typo(name, rng), normalize_place_name(name)] for name in long_names],
+        "unknown": ["Qx" + "".join(rng.choice("qxzjw") for _ in range(8)) for _ in range(count)],
+    }
+
+
+def _rss_mib() -> tuple:
+    """(private, file-backed) resident MiB; mapped gazetteer pages count as file-backed."""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0]) / 1024
+    return fields["RssAnon"], fields["RssFile"]
+
+
+def _rss_delta(baseline: tuple) -> str:
+    anon, mapped = _rss_mib()
+    return f"{anon - baseline[0]:.1f}+{mapped - baseline[1]:.1f}"
+
+
+def measure(path: str, queries_path: str) -> None:
+    """Runs in the child process: opens the gazetteer and times lookups."""
+    from tools.gazetteer import Gazetteer
+
+    with open(queries_path) as f:
+        queries = json.load(f)
+    baseline = _rss_mib()
+    start = time.perf_counter()
+    gazetteer = Gazetteer(path)
+    open_ms = (time.perf_counter() - start) * 1000
+    report = {"open_ms": round(open_ms, 3), "rss_open_mib": _rss_delta(baseline)}
+    for kind, items in queries.items():
+        latencies, found = [], 0
+        for item in items:
+            query, expected = item if kind == "fuzzy" else (item, None)
+            start = time.perf_counter()
+            result = gazetteer.lookup(query)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            if result is not None and (expected is None or normalize_place_name(result["name"]) == expected):
+                found += 1
+        latencies.sort()
+        report[kind] = {
+            "p50_us": round(latencies[len(latencies) // 2], 1),
+            "p99_us": round(latencies[int(len(latencies) * 0.99)], 1),
+            "found": round(found / len(items), 3),
+        }
+    report["rss_after_mib"] = _rss_delta(baseline)
+    print(json.dumps(report))
+
+
+def main(sizes: list, query_count: int) -> None:
+    directory = tempfile.mkdtemp(prefix="bench_gazetteer_")
+    for size in sizes:
+        rng = random.Random(size)
+        places = _places(size, rng)
+        path = os.path.join(directory, f"gazetteer_{size}.bin")
+        start = time.perf_counter()
+        built = build_gazetteer(places, path)
+        build_seconds = time.perf_counter() - start
+        queries_path = os.path.join(directory, f"queries_{size}.json")
+        with open(queries_path, "w") as f:
+            json.dump(_queries(places, query_count, rng), f)
+        del places
+
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_gazetteer", "--measure", path, queries_path],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{size:>9} places  {built['keys']:>9} keys  file={built['bytes'] / 2 ** 20:6.1f} MiB  "
+            f"build={build_seconds:5.1f}s  open={report['open_ms']}ms  "
+            f"rss (private+mapped) open={report['rss_open_mib']} after={report['rss_after_mib']} MiB"
+        )
+        for kind in ("exact", "alias", "fuzzy", "unknown"):
+            stats = report[kind]
+            print(f"    {kind:<8} p50={stats['p50_us']:7.1f}us  p99={stats['p99_us']:7.1f}us  found={stats['found']:.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--measure", nargs=2, metavar=("GAZETTEER", "QUERIES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(*args.measure)
+    else:
+        main(args.sizes, args.queries)
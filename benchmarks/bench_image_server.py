@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Image Server Benchmark
+Fills a temporary image store with padded PNGs and fetches them from
+tools/image_server.py with N concurrent keep-alive clients, comparing the
+sendfile handler with a naive handler that reads each file into memory and
+writes it to the socket. Reports requests/s, throughput and peak Python
+memory (tracemalloc) per image size.
+
+Usage: python -m benchmarks.bench_image_server [--sizes-mb 0.1 1 8] [--concurrency 8] [--requests 200]
+"""
+
+import argparse
+import http.client
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from benchmarks.stand_in_server import PNG_BYTES
+from tools.image_server import ImageRequestHandler, ImageServer
+from tools.image_store import ImageStore
+
+
+class NaiveImageRequestHandler(ImageRequestHandler):
+    """Reads the whole range into memory, then writes it through the socket file."""
+
+    def send_file_range(self, f, offset: int, count: int) -> None:
+        f.seek(offset)
+        self.wfile.write(f.read(count))
+
+
+def _fill_store(size_bytes: int, images: int) -> tuple:
+    store = ImageStore(tempfile.mkdtemp(prefix="bench_image_server_"), max_bytes=2 ** 40)
+    ids = []
+    for i in range(images):
+        path = store.incoming_path()
+        with open(path, "wb") as f:
+            # Distinct content per image so the store keeps them all
+            f.write(PNG_BYTES + i.to_bytes(4, "big") + bytes(max(0, size_bytes - len(PNG_BYTES) - 4)))
+        ids.append(store.add(path)["id"])
+    return store, ids
+
+
+def _client(port: int, ids: list, requests: int, errors: list) -> None:
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    for i in range(requests):
+        connection.request("GET", f"/images/{ids[i % len(ids)]}")
+        response = connection.getresponse()
+        # Drain in chunks so client buffers don't dominate the memory numbers
+        received = 0
+        for chunk in iter(lambda: response.read(64 * 1024), b""):
+            received += len(chunk)
+        if response.status != 200 or received != int(response.headers["Content-Length"]):
+            errors.append(response.status)
+    connection.close()
+
+
+def _run(label: str, handler, store: ImageStore, ids: list, size_bytes: int, concurrency: int, requests: int) -> None:
+    server = ImageServer(("127.0.0.1", 0), store=store, handler=handler).start()
+    port = server.server_address[1]
+    errors: list = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=_client, args=(port, ids, requests // concurrency, errors))
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    server.shutdown()
+    server.server_close()
+
+    total = (requests // concurrency) * concurrency
+    print(
+        f"  {label:<9} {total / wall:8.0f} req/s  {total * size_bytes / wall / 2 ** 20:8.1f} MiB/s  "
+        f"peak_memory={peak / 2 ** 20:6.1f} MiB  errors={len(errors)}"
+    )
+
+
+def main(sizes_mb: list, concurrency: int, requests: int) -> None:
+    for size_mb in sizes_mb:
+        size_bytes = int(size_mb * 2 ** 20)
+        store, ids = _fill_store(size_bytes, images=16)
+        print(f"{requests} GETs of {size_mb} MiB images, {concurrency} concurrent clients")
+        _run("naive", NaiveImageRequestHandler, store, ids, size_bytes, concurrency, requests)
+        _run("sendfile", ImageRequestHandler, store, ids, size_bytes, concurrency, requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[0.1, 1, 8])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    main(args.sizes_mb, args.concurrency, args.requests)
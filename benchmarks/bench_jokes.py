@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Joke Corpus Benchmark
+Compiles synthetic joke corpora of 1k to 1M jokes and measures, in a fresh
+subprocess per size, load time and resident memory (split into private
+memory and mapped file pages, which the kernel can drop) plus p50/p99
+latency of category lookups, random joke reads, session shuffle-bag draws
+and BM25 keyword searches. Joke text is drawn from a Zipf-distributed
+vocabulary of 20,000 words. Searches use one to three topic words (any but
+the 100 most frequent); "common" searches use only the 10 most frequent
+words, which appear in a large share of all jokes, as a worst case.
+For comparison, the same jokes are loaded from TSV into a dict of
+lists, the way an in-memory database would hold them. Linux only (/proc).
+
+Usage: python -m benchmarks.bench_jokes [--sizes 1000 10000 100000 1000000] [--queries 5000]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from tools.joke_corpus import build_corpus
+
+CATEGORIES = ["programming", "dad", "science", "general", "office", "animals", "food", "sports"]
+SYLLABLES = [onset + vowel for onset in ["", "b", "c", "d", "f", "g", "k", "l", "m", "n", "p", "r", "s", "t", "v", "z"]
+             for vowel in ["a", "e", "i", "o", "u", "ay", "oo"]]
+VOCABULARY_SIZE = 20_000
+
+
+def _vocabulary(rng: random.Random) -> tuple:
+    """(words, cumulative Zipf weights): a few words are very common, most are rare."""
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    cumulative, total = [], 0.0
+    for rank in range(len(words)):
+        total += 1 / (rank + 1)
+        cumulative.append(total)
+    return words, cumulative
+
+
+def _jokes(size: int, rng: random.Random, vocabulary: tuple) -> list:
+    # Skewed category sizes, like real corpora: the first categories are much larger
+    weights = [1 / (rank + 1) for rank in range(len(CATEGORIES))]
+    words, cumulative = vocabulary
+    jokes = []
+    for category in rng.choices(CATEGORIES, weights, k=size):
+        joke = " ".join(rng.choices(words, cum_weights=cumulative, k=rng.randint(6, 14))).capitalize() + "?"
+        punchline = " ".join(rng.choices(words, cum_weights=cumulative, k=rng.randint(3, 8))).capitalize() + "!"
+        jokes.append((category, joke, punchline))
+    return jokes
+
+
+def _search_queries(count: int, rng: random.Random, vocabulary: tuple) -> dict:
+    words = vocabulary[0]
+    return {
+        "search": [" ".join(rng.choices(words[100:], k=rng.randint(1, 3))) for _ in range(count)],
+        "common": [" ".join(rng.choices(words[:10], k=rng.randint(1, 3))) for _ in range(count)],
+    }
+
+
+def _rss_mib() -> tuple:
+    """(private, file-backed) resident MiB; mapped corpus pages count as file-backed."""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0]) / 1024
+    return fields["RssAnon"], fields["RssFile"]
+
+
+def _rss_delta(baseline: tuple) -> str:
+    anon, mapped = _rss_mib()
+    return f"{anon - baseline[0]:.1f}+{mapped - baseline[1]:.1f}"
+
+
+def _percentiles(latencies: list) -> dict:
+    latencies.sort()
+    return {"p50_us": round(latencies[len(latencies) // 2], 2), "p99_us": round(latencies[int(len(latencies) * 0.99)], 2)}
+
+
+def measure(path: str, queries: int, searches_path: str) -> None:
+    """Runs in the child process: opens the corpus and times lookups, draws and searches."""
+    from tools import joke_corpus
+
+    with open(searches_path) as f:
+        searches = json.load(f)
+    rng = random.Random(0)
+    baseline = _rss_mib()
+    start = time.perf_counter()
+    corpus = joke_corpus.JokeCorpus(path)
+    report = {"open_ms": round((time.perf_counter() - start) * 1000, 3), "rss_open_mib": _rss_delta(baseline)}
+    categories = corpus.categories()
+
+    latencies = []
+    for _ in range(queries):
+        category = rng.choice(categories)
+        start = time.perf_counter()
+        corpus.span(category)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    report["category"] = _percentiles(latencies)
+
+    latencies = []
+    for _ in range(queries):
+        index = rng.randrange(corpus.n_jokes)
+        start = time.perf_counter()
+        corpus.joke(index)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    report["joke"] = _percentiles(latencies)
+
+    # One session drawing from every category: bag draw plus joke read
+    bags, latencies = {}, []
+    for _ in range(queries):
+        category = rng.choice(categories)
+        start = time.perf_counter()
+        first, size = corpus.span(category)
+        index, bags[category], _ = joke_corpus.draw(bags.get(category), size)
+        corpus.joke(first + index)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    report["draw"] = _percentiles(latencies)
+
+    for kind, queries_of_kind in searches.items():
+        latencies, matches = [], 0
+        for query in queries_of_kind:
+            start = time.perf_counter()
+            hits, _ = corpus.search(query, limit=8)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            matches += bool(hits)
+        report[kind] = dict(_percentiles(latencies), found=round(matches / len(queries_of_kind), 3))
+    report["rss_after_mib"] = _rss_delta(baseline)
+    print(json.dumps(report))
+
+
+def measure_in_memory(source: str) -> None:
+    """Runs in the child process: loads the TSV into a dict of lists for comparison."""
+    from tools.joke_corpus import read_jokes
+
+    baseline = _rss_mib()
+    start = time.perf_counter()
+    database = {}
+    for category, joke, punchline in read_jokes(source):
+        database.setdefault(category, []).append({"joke": joke, "punchline": punchline})
+    load_ms = (time.perf_counter() - start) * 1000
+    print(json.dumps({"load_ms": round(load_ms, 1), "rss_mib": _rss_delta(baseline)}))
+
+
+def _child(*args: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_jokes", *args], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(sizes: list, queries: int) -> None:
+    directory = tempfile.mkdtemp(prefix="bench_jokes_")
+    vocabulary = _vocabulary(random.Random(0))
+    for size in sizes:
+        rng = random.Random(size)
+        jokes = _jokes(size, rng, vocabulary)
+        source = os.path.join(directory, f"jokes_{size}.tsv")
+        with open(source, "w", encoding="utf-8") as f:
+            f.writelines(f"{category}\t{joke}\t{punchline}\n" for category, joke, punchline in jokes)
+        path = os.path.join(directory, f"jokes_{size}.bin")
+        start = time.perf_counter()
+        built = build_corpus(jokes, path)
+        build_seconds = time.perf_counter() - start
+        del jokes
+
+        searches_path = os.path.join(directory, f"searches_{size}.json")
+        with open(searches_path, "w") as f:
+            json.dump(_search_queries(queries, rng, vocabulary), f)
+
+        report = _child("--measure", path, str(queries), searches_path)
+        in_memory = _child("--measure-in-memory", source)
+        print(
+            f"{size:>9} jokes  {built['terms']:>6} terms  file={built['bytes'] / 2 ** 20:6.1f} MiB  build={build_seconds:5.1f}s  "
+            f"mmap open={report['open_ms']}ms rss (private+mapped) open={report['rss_open_mib']} "
+            f"after={report['rss_after_mib']} MiB  |  in-memory load={in_memory['load_ms']}ms rss={in_memory['rss_mib']} MiB"
+        )
+        for kind in ("category", "joke", "draw", "search", "common"):
+            stats = report[kind]
+            found = f"  found={stats['found']:.1%}" if "found" in stats else ""
+            print(f"    {kind:<9} p50={stats['p50_us']:8.2f}us  p99={stats['p99_us']:8.2f}us{found}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--measure", nargs=3, metavar=("CORPUS", "QUERIES", "SEARCHES"), help=argparse.SUPPRESS)
+    parser.add_argument("--measure-in-memory", metavar="SOURCE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.measure[0], int(args.measure[1]), args.measure[2])
+    elif args.measure_in_memory:
+        measure_in_memory(args.measure_in_memory)
+    else:
+        main(args.sizes, args.queries)
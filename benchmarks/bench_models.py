@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Model Registry Benchmark
+Sends requests through models/registry.py against local stand-in models, and
+compares model chains with and without fallback and hedging:
+
+- tail: answers after a lognormal latency; --tail-rate of calls take
+  --tail-factor times longer (a slow replica, a long queue)
+- flaky: like tail, but --failure-rate of calls fail with 503
+- hang: never answers, so only the timeout moves on
+
+Each scenario reports end-to-end latency percentiles, model calls per
+request (hedges add calls), hedges won, fallbacks and failed requests.
+
+Usage: python -m benchmarks.bench_models [--requests 200] [--concurrency 16] [--tail-rate 0.05]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import time
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from google.genai.errors import ServerError
+
+from models.registry import ModelRegistry, register_backend
+
+
+def _register_stand_ins(median: float, tail_rate: float, tail_factor: float, failure_rate: float, seed: int) -> None:
+    class StandInModel(BaseLlm):
+        """Local model whose behavior is named after "stand-in/"."""
+
+        async def generate_content_async(self, llm_request, stream=False):
+            profile = self.model.split("/", 1)[1]
+            rng = _rngs.setdefault(profile, random.Random(f"{seed}:{profile}"))
+            if profile == "hang":
+                await asyncio.sleep(3600)
+            latency = median * rng.lognormvariate(0, 0.25)
+            if rng.random() < tail_rate:
+                latency *= tail_factor
+            await asyncio.sleep(latency)
+            if profile == "flaky" and rng.random() < failure_rate:
+                raise ServerError(503, {"error": {"message": "stand-in unavailable", "status": "UNAVAILABLE"}})
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=f"answer from {profile}")]))
+
+    _rngs = {}
+    register_backend("stand-in", lambda name: StandInModel(model=f"stand-in/{name}"))
+
+
+async def _run(model: BaseLlm, requests: int, concurrency: int) -> dict:
+    latencies, failures = [], 0
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index)
+
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            index = queue.get_nowait()
+            request = LlmRequest(
+                model=model.model, contents=[types.Content(role="user", parts=[types.Part(text=f"request {index}")])]
+            )
+            start = time.perf_counter()
+            try:
+                async for _ in model.generate_content_async(request):
+                    pass
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                failures += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else float("nan")
+
+    return {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99), "max": percentile(1.0), "failures": failures}
+
+
+async def main(args) -> None:
+    _register_stand_ins(args.median, args.tail_rate, args.tail_factor, args.failure_rate, args.seed)
+    scenarios = [
+        ("tail", "stand-in/tail", {}),
+        ("tail, hedged at p95", "stand-in/tail", {"hedge": True, "hedge_percentile": 95}),
+        ("tail, hedged at p90", "stand-in/tail", {"hedge": True, "hedge_percentile": 90}),
+        ("flaky", "stand-in/flaky", {}),
+        ("flaky -> tail", "stand-in/flaky,stand-in/tail", {}),
+        ("hang -> tail", "stand-in/hang,stand-in/tail", {}),
+    ]
+    print(
+        f"stand-in models: median {args.median * 1000:.0f}ms, {args.tail_rate:.0%} of calls x{args.tail_factor:g}, "
+        f"flaky fails {args.failure_rate:.0%}; {args.requests} requests, {args.concurrency} concurrent, "
+        f"timeout {args.timeout:g}s, hedging needs {args.hedge_min_samples} samples\n"
+    )
+    print(f"{'scenario':<22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'calls/req':>9} {'hedge wins':>10} {'fallbacks':>9} {'failed':>6}")
+    for label, chain, options in scenarios:
+        registry = ModelRegistry(
+            settings={"BENCH_AGENT_MODEL": chain},
+            timeout=args.timeout,
+            hedge_min_samples=args.hedge_min_samples,
+            hedge_min_delay=args.hedge_min_delay,
+            **options,
+        )
+        model = registry.model_for("bench_agent")
+        with contextlib.redirect_stdout(io.StringIO()):  # Fallback/hedge log lines
+            result = await _run(model, args.requests, args.concurrency)
+        counts = registry.stats().get("bench_agent", {})
+        calls = sum(stats.get("calls", 0) for stats in counts.values()) or args.requests
+        hedges = sum(stats.get("hedges", 0) for stats in counts.values())
+        hedge_wins = sum(stats.get("hedge_wins", 0) for stats in counts.values())
+        fallbacks = sum(stats.get("fallbacks", 0) for stats in counts.values())
+        print(
+            f"{label:<22} {result['p50']:>8.0f} {result['p95']:>8.0f} {result['p99']:>8.0f} {result['max']:>8.0f} "
+            f"{calls / args.requests:>9.2f} {f'{hedge_wins}/{hedges}':>10} {fallbacks:>9} {result['failures']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--median", type=float, default=0.1, help="Stand-in median latency (seconds)")
+    parser.add_argument("--tail-rate", type=float, default=0.05, help="Share of calls that are slow")
+    parser.add_argument("--tail-factor", type=float, default=10, help="How much slower a slow call is")
+    parser.add_argument("--failure-rate", type=float, default=0.2, help="Share of flaky calls that fail with 503")
+    parser.add_argument("--timeout", type=float, default=2.5, help="Seconds to a model's first response before falling back")
+    parser.add_argument("--hedge-min-samples", type=int, default=20)
+    parser.add_argument("--hedge-min-delay", type=float, default=0.05, help="Shortest wait before a hedge (seconds)")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Collapsing Benchmark
+Builds synthetic article lists where each story is syndicated by several
+outlets with small wording changes, then times the collapsing stage used by
+get_news (one-permutation MinHash with LSH banding, plus a headline check) and
+reports recall against the known clusters.
+
+Usage: python -m benchmarks.bench_near_duplicates [--sizes 100 300 1000]
+"""
+
+import argparse
+import random
+import time
+
+from tools.get_latest_news import _collapse_near_duplicates
+
+VOCABULARY = [f"word{i}" for i in range(5000)]
+
+
+def _make_articles(size: int, copies: int, rng: random.Random) -> list:
+    articles = []
+    for story in range(max(1, size // copies)):
+        title_words = rng.sample(VOCABULARY, 8)
+        description_words = rng.sample(VOCABULARY, 30)
+        for copy in range(copies):
+            words = list(description_words)
+            if copy:
+                # Outlets tweak a word here and there
+                words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+            articles.append({
+                "title": f"{' '.join(title_words)} - Outlet {copy}",
+                "description": " ".join(words),
+                "url": f"https://outlet{copy}.example/{story}",
+                "published_at": "2025-07-19T10:00:00Z",
+                "source": f"Outlet {copy}",
+                "author": "Staff",
+                "content": " ".join(words[:20]) + "...",
+            })
+    rng.shuffle(articles)
+    return articles[:size]
+
+
+def main(sizes: list, copies: int) -> None:
+    rng = random.Random(7)
+    print(f"{'articles':>8} {'ms':>8} {'kept':>6} {'collapsed':>10} {'expected':>9} {'tokens_saved':>13}")
+    for size in sizes:
+        articles = _make_articles(size, copies, rng)
+        expected = len(articles) - len({article["url"].rsplit("/", 1)[1] for article in articles})
+        start = time.perf_counter()
+        kept, collapsed, tokens_saved = _collapse_near_duplicates(articles)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{len(articles):>8} {elapsed:>8.1f} {len(kept):>6} {collapsed:>10} {expected:>9} {tokens_saved:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--copies", type=int, default=4, help="Outlets syndicating each story")
+    args = parser.parse_args()
+    main(args.sizes, args.copies)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Upstream Scheduler Benchmark
+Queues a backlog of batch requests against a rate-limited stand-in upstream,
+then sends interactive requests while the backlog drains. Compares plain FIFO
+(every request in one class) with the scheduler's priority classes and
+reports latency per class plus the scheduler's own queue-wait stats.
+
+Usage: python -m benchmarks.bench_scheduler [--batch 40] [--interactive 10] [--rate 20]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.stand_in_server import StandInServer
+from tools import http_client
+from tools.scheduler import BATCH, INTERACTIVE, UpstreamLimits, configure_upstream, scheduler_stats, set_priority
+
+
+async def _call(url: str, upstream: str, priority: int, latencies: list) -> None:
+    set_priority(priority)  # Each task has its own context
+    start = time.perf_counter()
+    response = await http_client.async_get(url, params={"q": "bench", "pageSize": 1}, upstream=upstream)
+    response.raise_for_status()
+    latencies.append(time.perf_counter() - start)
+
+
+async def _run(label: str, url: str, limits: UpstreamLimits, batch: int, interactive: int, use_priority: bool) -> None:
+    upstream = f"bench_{label}"
+    configure_upstream(upstream, limits)
+    batch_latencies, interactive_latencies = [], []
+    interactive_priority = INTERACTIVE if use_priority else BATCH
+
+    tasks = [asyncio.create_task(_call(url, upstream, BATCH, batch_latencies)) for _ in range(batch)]
+    for _ in range(interactive):
+        await asyncio.sleep(0.05)  # Users arrive while the backlog drains
+        tasks.append(asyncio.create_task(_call(url, upstream, interactive_priority, interactive_latencies)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+
+    print(
+        f"{label:<10} wall={wall:6.2f}s  interactive p50={statistics.median(interactive_latencies):5.2f}s "
+        f"max={max(interactive_latencies):5.2f}s  batch p50={statistics.median(batch_latencies):5.2f}s "
+        f"max={max(batch_latencies):5.2f}s"
+    )
+    print(f"{'':<10} queue_wait={scheduler_stats()[upstream]['queue_wait']}")
+
+
+async def main(batch: int, interactive: int, rate: float, concurrency: int, delay: float) -> None:
+    server = StandInServer(delay=delay).start()
+    url = f"{server.base_url}/v2/everything"
+    limits = dict(rate=rate, burst=concurrency, max_concurrency=concurrency, max_wait=600)
+
+    print(f"{batch} batch + {interactive} interactive requests, {rate}/s, {concurrency} concurrent, {delay}s upstream delay")
+    await _run("fifo", url, UpstreamLimits(**limits), batch, interactive, use_priority=False)
+    await _run("priority", url, UpstreamLimits(**limits), batch, interactive, use_priority=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=40)
+    parser.add_argument("--interactive", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=20, help="Upstream calls per second")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.1, help="Stand-in response delay in seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch, args.interactive, args.rate, args.concurrency, args.delay))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Intent Router Evaluation
+Trains the router (host_agent/router.py) on data/router_intents.jsonl and
+scores it on held-out labeled messages (data/router_eval.jsonl), offline:
+
+- coverage: share of messages routed without the coordinator LLM
+- misroutes: messages sent to the wrong specialist (the costly error; a
+  fallback only costs the LLM call the router tried to save)
+- top-label accuracy of the model alone, and a confusion matrix
+- a sweep of ROUTER_MIN_CONFIDENCE showing the coverage/misroute trade-off
+- training time and p50/p99 classification latency
+
+With --folds K, the training and held-out sets are pooled and scored by
+K-fold cross-validation instead.
+
+Usage: python -m benchmarks.eval_router [--train data/router_intents.jsonl]
+                                        [--eval data/router_eval.jsonl]
+                                        [--folds 5] [--repeat 200]
+"""
+
+import argparse
+import random
+import time
+
+from host_agent.router import FALLBACK_LABEL, ROUTER_MIN_CONFIDENCE, IntentModel, IntentRouter, read_examples
+
+THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.9, 0.95]
+_DATA = "data/router_intents.jsonl", "data/router_eval.jsonl"
+
+
+def _score(router: IntentRouter, examples: list) -> list:
+    """(expected agent, decision) for every example."""
+    return [(agent, router.classify(text)) for text, agent in examples]
+
+
+def _summary(scored: list) -> dict:
+    routable = sum(agent != FALLBACK_LABEL for agent, _ in scored)
+    routed = [(agent, decision) for agent, decision in scored if decision["agent"] is not None]
+    return {
+        "messages": len(scored),
+        "routed": len(routed),
+        "coverage": len(routed) / len(scored),
+        "routable_coverage": sum(decision["agent"] == agent for agent, decision in routed) / max(routable, 1),
+        "misroutes": sum(decision["agent"] != agent for agent, decision in routed),
+        "top_label_accuracy": sum(decision["label"] == agent for agent, decision in scored) / len(scored),
+        "by_rule": sum(decision["source"] == "rule" for _, decision in routed),
+    }
+
+
+def _print_summary(title: str, summary: dict) -> None:
+    print(
+        f"{title}: {summary['messages']} messages  routed={summary['routed']} ({summary['coverage']:.1%}, "
+        f"{summary['by_rule']} by rule)  routable routed correctly={summary['routable_coverage']:.1%}  "
+        f"misroutes={summary['misroutes']}  model top-label accuracy={summary['top_label_accuracy']:.1%}"
+    )
+
+
+def _print_confusion(scored: list, labels: list) -> None:
+    """Rows: expected label; columns: the router's decision (coordinator = fell back)."""
+    names = [label.replace("_agent_v1", "") for label in labels]
+    width = max(len(name) for name in names) + 2
+    print()
+    print("expected \\ routed to".ljust(width + 12) + "".join(name.rjust(width) for name in names))
+    for label, name in zip(labels, names):
+        decided = [decision["agent"] or FALLBACK_LABEL for agent, decision in scored if agent == label]
+        print(f"  {name}".ljust(width + 12) + "".join(str(decided.count(column)).rjust(width) for column in labels))
+
+
+def _print_misses(scored: list) -> None:
+    misroutes = [(agent, decision) for agent, decision in scored if decision["agent"] not in (None, agent)]
+    for agent, decision in misroutes:
+        print(f"  MISROUTE  expected {agent}, routed to {decision['agent']} ({decision['source']}, {decision['confidence']}): {decision['text']}")
+
+
+def _latency(router: IntentRouter, examples: list, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        for text, _ in examples:
+            start = time.perf_counter()
+            router.classify(text)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return {"p50_us": latencies[len(latencies) // 2], "p99_us": latencies[int(len(latencies) * 0.99)]}
+
+
+def evaluate(train: list, held_out: list, repeat: int) -> None:
+    start = time.perf_counter()
+    model = IntentModel.train(train)
+    training_ms = (time.perf_counter() - start) * 1000
+    print(f"trained on {len(train)} examples in {training_ms:.0f}ms  ({len(model.vocabulary)} features, labels: {', '.join(model.labels)})\n")
+
+    scored = [(agent, dict(decision, text=text)) for (text, _), (agent, decision) in zip(held_out, _score(IntentRouter(model), held_out))]
+    _print_summary(f"held-out @ {ROUTER_MIN_CONFIDENCE}", _summary(scored))
+    _print_misses(scored)
+    _print_confusion(scored, model.labels)
+
+    print("\nconfidence sweep (model-only routes need this probability):")
+    for threshold in THRESHOLDS:
+        _print_summary(f"  {threshold:.2f}", _summary(_score(IntentRouter(model, min_confidence=threshold), held_out)))
+
+    latency = _latency(IntentRouter(model), held_out, repeat)
+    print(f"\nclassify latency: p50={latency['p50_us']:.1f}us  p99={latency['p99_us']:.1f}us")
+
+
+def cross_validate(examples: list, folds: int) -> None:
+    examples = list(examples)
+    random.Random(0).shuffle(examples)
+    scored = []
+    for fold in range(folds):
+        held_out = examples[fold::folds]
+        train = [example for index, example in enumerate(examples) if index % folds != fold]
+        scored += _score(IntentRouter(IntentModel.train(train)), held_out)
+    _print_summary(f"{folds}-fold cross-validation @ {ROUTER_MIN_CONFIDENCE}", _summary(scored))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train", default=_DATA[0])
+    parser.add_argument("--eval", default=_DATA[1])
+    parser.add_argument("--folds", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the held-out set when timing")
+    args = parser.parse_args()
+
+    train, held_out = list(read_examples(args.train)), list(read_examples(args.eval))
+    if args.folds:
+        cross_validate(train + held_out, args.folds)
+    else:
+        evaluate(train, held_out, args.repeat)
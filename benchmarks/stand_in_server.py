@@ -0,0 +1,124 @@
+"""
+Stand-in Upstream Server
+A local HTTP server that mimics the NewsAPI, OpenAI image and Open-Meteo
+endpoints used by the tools, with a configurable response delay. Benchmarks
+point the tools at it through NEWS_API_BASE_URL, OPENAI_BASE_URL and
+OPEN_METEO_BASE_URL.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import json
+import threading
+import time
+
+# A tiny valid PNG (1x1 transparent pixel)
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d4944415478da63f8ffff3f0005fe02fea7d6a1c80000000049454e44ae426082"
+)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves /v2/everything, /v1/images/generations, /images/<name>.png and /v1/forecast."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.count(self.path)
+        parsed = urlparse(self.path)
+        if parsed.path == "/v2/everything":
+            time.sleep(self.server.delay)
+            topic = parse_qs(parsed.query).get("q", [""])[0]
+            page_size = int(parse_qs(parsed.query).get("pageSize", ["5"])[0])
+            articles = [
+                {
+                    "title": f"{topic} story {i}",
+                    "description": f"Coverage of {topic}, item {i}.",
+                    "url": f"https://news.example/{topic}/{i}",
+                    "publishedAt": f"2025-07-19T{10 + i:02d}:00:00Z",
+                    "source": {"name": f"Outlet {i}"},
+                    "author": "Stand-in",
+                    "content": f"Full text about {topic} number {i}. " * 10,
+                }
+                for i in range(page_size)
+            ]
+            self._send_json({"status": "ok", "totalResults": len(articles), "articles": articles})
+        elif parsed.path == "/v1/forecast":
+            time.sleep(self.server.delay)
+            query = parse_qs(parsed.query)
+            latitude, longitude = float(query["latitude"][0]), float(query["longitude"][0])
+            # Deterministic weather derived from the coordinates
+            self._send_json({
+                "latitude": latitude,
+                "longitude": longitude,
+                "current": {
+                    "time": time.strftime("%Y-%m-%dT%H:%M", time.gmtime()),
+                    "temperature_2m": round(30 - abs(latitude) / 3, 1),
+                    "weather_code": [0, 2, 3, 61, 71][int(abs(longitude)) % 5],
+                },
+            })
+        elif parsed.path.startswith("/images/"):
+            # Pad the PNG to image_bytes, sent in chunks so the server stays small
+            size = max(len(PNG_BYTES), self.server.image_bytes)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            self.wfile.write(PNG_BYTES)
+            remaining = size - len(PNG_BYTES)
+            padding = bytes(64 * 1024)
+            while remaining > 0:
+                self.wfile.write(padding[:remaining])
+                remaining -= len(padding)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        self.server.count(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if urlparse(self.path).path.endswith("/images/generations"):
+            time.sleep(self.server.image_delay)
+            host, port = self.server.server_address
+            url = f"http://{host}:{port}/images/{int(time.time() * 1e6)}.png"
+            self._send_json({"created": int(time.time()), "data": [{"url": url}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0.5, image_delay: float = 1.0, image_bytes: int = 0):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.delay = delay
+        self.image_delay = image_delay
+        self.image_bytes = image_bytes
+        self.hits = {}
+        self._hits_lock = threading.Lock()
+
+    def count(self, path: str) -> None:
+        with self._hits_lock:
+            key = urlparse(path).path
+            self.hits[key] = self.hits.get(key, 0) + 1
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
@@ -1,14 +1,19 @@
 import os
 import asyncio
-from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm  # For multi-model support
+from typing import List, Optional
+from google.adk.agents import Agent, BaseAgent
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
+from google.adk.tools.agent_tool import AgentTool
 from google.genai import types
 from agents.weather_agent.agent import weather_agent
 from agents.social_media_agent.agent import social_media_agent
 from agents.jokes_agent.agent import jokes_agent
 from agents.image_agent.agent import image_agent
+from models.registry import model_for
+from models.response_cache import lookup_cached_response, store_model_response
+from host_agent.router import route_to_specialist
+from tools.template_answers import answer_from_template
 
 import warnings
 # Ignore all warnings
@@ -17,10 +22,12 @@ warnings.filterwarnings("ignore")
 import logging
 logging.basicConfig(level=logging.ERROR)
 
-# LLM models
-MODEL_GEMINI_2_0_FLASH = "gemini-2.0-flash"
-MODEL_GEMINI_2_5_FLASH_LIVE ="gemini-live-2.5-flash-preview"
-ROOT_AGENT_MODEL = MODEL_GEMINI_2_0_FLASH
+# How the coordinator delegates:
+# - "transfer": sub-agents; the coordinator's LLM hands the conversation to one of them
+# - "tools": each sub-agent wrapped as an AgentTool; the coordinator can call several
+#   in one turn (in parallel) and answers with their combined results
+DELEGATION_MODES = ("transfer", "tools")
+AGENT_DELEGATION_MODE = os.getenv("AGENT_DELEGATION_MODE", "transfer").lower()
 
 # Global variables for session management
 USER_ID = "user_123"
@@ -31,12 +38,9 @@ social_media_agent_team = None
 session = None
 runner = None
 
-# Create the social media agent team
-root_agent = Agent(
-    name=ROOT_AGENT_NAME,
-    model=ROOT_AGENT_MODEL,
-    description="A coordinated team of specialized agents that can handle various tasks including weather information, social media management, jokes and entertainment, AI image generation, and more.",
-    instruction="""You are the coordinator for a team of specialized agents. Your role is to:
+ROOT_AGENT_DESCRIPTION = "A coordinated team of specialized agents that can handle various tasks including weather information, social media management, jokes and entertainment, AI image generation, and more."
+
+ROOT_AGENT_INSTRUCTION = """You are the coordinator for a team of specialized agents. Your role is to:
 
 1. **Route user requests** to the appropriate specialized agent based on the query type
 2. **Handle weather queries** by delegating to the weather agent
@@ -47,31 +51,87 @@ root_agent = Agent(
 7. **Maintain context** across different types of requests
 
 When users ask about weather:
-- Delegate to the weather_agent_v1 sub-agent
+- Delegate to weather_agent_v1
 - The weather agent will use the get_weather tool to fetch current weather data
 - Present the weather information in a clear, conversational manner
 
 When users ask for social media content or news summaries:
-- Delegate to the social_media_agent_v1 sub-agent
-- The social media agent will use the get_news tool to fetch relevant news
+- Delegate to social_media_agent_v1
+- The social media agent will use the get_news_async tool to fetch relevant news
 - The agent will create engaging social media posts for different platforms
 - Present the content in an organized, platform-specific format
 
 When users ask for jokes, humor, or entertainment:
-- Delegate to the jokes_agent_v1 sub-agent
+- Delegate to jokes_agent_v1
 - The jokes agent will use the get_jokes tool to fetch jokes from various categories
 - Present the jokes in an entertaining and engaging manner
 - Support different categories like programming, dad jokes, science, general, and office humor
 
 When users ask for image generation or visual content:
-- Delegate to the image_agent_v1 sub-agent
-- The image agent will use the generate_image tool to create images using OpenAI's DALL-E API
+- Delegate to image_agent_v1
+- The image agent starts images as background jobs (submit_image_job) using OpenAI's DALL-E API and checks on them with get_image_job_status
 - Support various image sizes (1024x1024, 1792x1024, 1024x1792) and quality levels
 - Help users refine prompts for better image generation results
 - Present generated images with clear URLs and specifications
 
 For other types of requests, handle them appropriately or ask for clarification.
 
-Always be helpful and conversational in your responses.""",
-    sub_agents=[weather_agent, social_media_agent, jokes_agent, image_agent]
-)
\ No newline at end of file
+Always be helpful and conversational in your responses."""
+
+# Appended to the instruction for each delegation mode
+DELEGATION_INSTRUCTIONS = {
+    "transfer": """
+
+Delegate by transferring the conversation to the specialized agent; it answers the user directly.""",
+    "tools": """
+
+Each specialized agent is available to you as a tool with the same name. Call it with the part of the
+user's request it should handle, written as a complete request (e.g., "What's the weather in Paris?").
+When a request has several parts (for example, the weather and a joke), call every relevant agent in
+the same turn; they run in parallel. Then combine their answers into a single reply to the user.""",
+}
+
+
+def build_root_agent(mode: str = AGENT_DELEGATION_MODE, specialists: Optional[List[BaseAgent]] = None, model=None) -> Agent:
+    """Builds the coordinator for a delegation mode.
+
+    Args:
+        mode (str): "transfer" (sub-agents) or "tools" (sub-agents wrapped as AgentTools).
+        specialists (List[BaseAgent], optional): Agents to delegate to; defaults to the weather,
+            social media, jokes and image agents. An agent can only have one parent, so a
+            second transfer-mode coordinator needs fresh agents (e.g., agent.clone()).
+        model (optional): The coordinator's model; defaults to the registry's (ROOT_AGENT_MODEL or AGENT_MODEL).
+
+    Returns:
+        Agent: The coordinator agent.
+    """
+    if mode not in DELEGATION_MODES:
+        raise ValueError(f"Unknown delegation mode '{mode}'. Use one of: {', '.join(DELEGATION_MODES)}.")
+    if specialists is None:
+        specialists = [weather_agent, social_media_agent, jokes_agent, image_agent]
+
+    if mode == "transfer":
+        delegation = dict(
+            sub_agents=specialists,
+            # Clear-cut requests are handed to their sub-agent locally, without a coordinator LLM call
+            # (answer_from_template only counts the turn here; the sub-agents hold the templates).
+            # Repeated requests that still need the model are answered from the LLM response cache.
+            before_model_callback=[answer_from_template, route_to_specialist, lookup_cached_response],
+        )
+    else:
+        delegation = dict(
+            tools=[AgentTool(agent=specialist) for specialist in specialists],
+            before_model_callback=[answer_from_template, lookup_cached_response],
+        )
+    return Agent(
+        name=ROOT_AGENT_NAME,
+        model=model or model_for("root_agent"),
+        description=ROOT_AGENT_DESCRIPTION,
+        instruction=ROOT_AGENT_INSTRUCTION + DELEGATION_INSTRUCTIONS[mode],
+        after_model_callback=store_model_response,
+        **delegation
+    )
+
+
+# Create the social media agent team
+root_agent = build_root_agent()
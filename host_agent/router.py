@@ -0,0 +1,279 @@
+"""
+Intent Router
+Local fast path in front of the coordinator. Most requests name their
+specialist plainly ("weather in Paris", "tell me a joke"), yet each one used
+to cost a full coordinator LLM call whose only output was a transfer to a
+sub-agent. The router classifies the user's message locally and, when it is
+confident, hands off directly:
+
+- rules: high-precision keyword patterns per agent
+- a TF-IDF (word, word-pair and character trigram) softmax regression,
+  trained at startup from labeled examples in data/router_intents.jsonl,
+  one {"text": ..., "agent": ...} object per line
+
+A rule proposes an agent and the model can veto it; without a rule, the
+model must be confident on its own. When rules for several agents match,
+the message is treated as multi-part and never routed. Greetings, multi-part requests and
+anything else the router isn't sure about go to the coordinator LLM as
+before. Examples labeled "coordinator" teach the model what those look like.
+
+Usage: python -m host_agent.router route "what's the weather in Paris?"
+       python -m benchmarks.eval_router    (offline accuracy and latency)
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import json
+import math
+import os
+import re
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+# Load environment variables
+load_dotenv()
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+ROUTER_TRAINING_DATA = os.getenv("ROUTER_TRAINING_DATA", os.path.join(_DATA_DIR, "router_intents.jsonl"))
+# Model probability needed to route without a matching rule
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.8"))
+# A rule's agent is overruled when the model gives another label at least this probability
+RULE_VETO_PROBABILITY = 0.5
+
+# Label for messages the coordinator LLM should handle
+FALLBACK_LABEL = "coordinator"
+
+RULES = {
+    "weather_agent_v1": [
+        r"\b(weather|forecast|temperatures?|temp|degrees|celsius|fahrenheit|humid|humidity)\b",
+        r"\b(raining|snowing|sunny|umbrella|warmest|coldest|hottest)\b",
+        r"\bhow (hot|cold|warm|chilly) is it\b",
+    ],
+    "jokes_agent_v1": [
+        r"\b(jokes?|puns?|one-liner|knock knock)\b",
+        r"\bmake me (laugh|giggle|chuckle|smile)\b",
+    ],
+    "social_media_agent_v1": [
+        r"\b(tweets?|twitter|threads post|instagram|linkedin|social media|hashtags?|captions?)\b",
+        r"\b(news|headlines?)\b",
+    ],
+    "image_agent_v1": [
+        r"\b(draw|paint|sketch|illustrate|render)\b",
+        r"\b(generate|create|make|design)\b.{0,40}\b(images?|pictures?|photos?|illustrations?|drawings?|logos?|wallpapers?|artwork|posters?|icons?)\b",
+        r"\b(my|the) (image|picture)\b",
+    ],
+}
+_RULES = {agent: re.compile("|".join(patterns)) for agent, patterns in RULES.items()}
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def features(text: str) -> List[str]:
+    """Words, adjacent word pairs and character trigrams (which tolerate typos)."""
+    words = _WORD.findall(text.lower())
+    result = [f"w:{word}" for word in words]
+    result += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        result += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return result
+
+
+def read_examples(path: str) -> Iterator[Tuple[str, str]]:
+    """(text, agent) pairs from a JSONL file; blank lines are skipped."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                yield example["text"], example["agent"]
+
+
+class IntentModel:
+    """Multinomial logistic regression over L2-normalized TF-IDF features."""
+
+    def __init__(self, labels: List[str], vocabulary: Dict[str, int], idf: np.ndarray, weights: np.ndarray, bias: np.ndarray):
+        self.labels = labels
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def train(
+        cls,
+        examples: List[Tuple[str, str]],
+        iterations: int = 600,
+        learning_rate: float = 4.0,
+        l2: float = 1e-4,
+    ) -> "IntentModel":
+        """Fits the model with full-batch gradient descent (deterministic; about a second for a few hundred examples)."""
+        labels = sorted({agent for _, agent in examples})
+        counts = [Counter(features(text)) for text, _ in examples]
+        document_frequency = Counter(feature for count in counts for feature in count)
+        vocabulary = {feature: index for index, feature in enumerate(sorted(document_frequency))}
+        idf = np.array(
+            [math.log((1 + len(examples)) / (1 + document_frequency[feature])) + 1 for feature in sorted(document_frequency)],
+            dtype=np.float32,
+        )
+
+        matrix = np.zeros((len(examples), len(vocabulary)), dtype=np.float32)
+        for row, count in enumerate(counts):
+            indices = np.fromiter((vocabulary[feature] for feature in count), dtype=np.int64, count=len(count))
+            matrix[row, indices] = 1 + np.log(np.fromiter(count.values(), dtype=np.float32, count=len(count)))
+        matrix *= idf
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+        targets = np.zeros((len(examples), len(labels)), dtype=np.float32)
+        targets[np.arange(len(examples)), [labels.index(agent) for _, agent in examples]] = 1
+        weights = np.zeros((len(vocabulary), len(labels)), dtype=np.float32)
+        bias = np.zeros(len(labels), dtype=np.float32)
+        for _ in range(iterations):
+            error = _softmax(matrix @ weights + bias) - targets
+            weights -= learning_rate * (matrix.T @ error / len(examples) + l2 * weights)
+            bias -= learning_rate * error.mean(axis=0)
+        return cls(labels, vocabulary, idf, weights, bias)
+
+    def predict(self, text: str) -> np.ndarray:
+        """Probability of every label, in self.labels order."""
+        count = Counter(feature for feature in features(text) if feature in self.vocabulary)
+        if not count:
+            return _softmax(self.bias)
+        indices = np.fromiter((self.vocabulary[feature] for feature in count), dtype=np.int64, count=len(count))
+        values = (1 + np.log(np.fromiter(count.values(), dtype=np.float32, count=len(count)))) * self.idf[indices]
+        values /= np.linalg.norm(values)
+        return _softmax(values @ self.weights[indices] + self.bias)
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exponentials = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exponentials / exponentials.sum(axis=-1, keepdims=True)
+
+
+class IntentRouter:
+    """Rules plus an IntentModel; decides whether to skip the coordinator LLM."""
+
+    def __init__(self, model: IntentModel, min_confidence: float = ROUTER_MIN_CONFIDENCE):
+        self.model = model
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._routed: Counter = Counter()
+        self._fallbacks = 0
+        self._seconds = 0.0
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """Chooses a sub-agent for a user message.
+
+        Returns:
+            Dict[str, Any]: agent (None to fall back to the coordinator),
+            confidence (the model's probability for the decision), source
+            ('rule', 'model' or 'fallback') and the model's top label.
+        """
+        start = time.perf_counter()
+        probabilities = dict(zip(self.model.labels, self.model.predict(text).tolist()))
+        label = max(probabilities, key=probabilities.get)
+        lowered = text.lower()
+        hits = [agent for agent, rule in _RULES.items() if rule.search(lowered)]
+
+        decision = {"agent": None, "confidence": round(probabilities[label], 3), "source": "fallback", "label": label}
+        if len(hits) == 1 and not any(
+            probability >= RULE_VETO_PROBABILITY for other, probability in probabilities.items() if other != hits[0]
+        ):
+            decision.update(agent=hits[0], confidence=round(probabilities.get(hits[0], 0.0), 3), source="rule")
+        elif label != FALLBACK_LABEL and probabilities[label] >= self.min_confidence and (not hits or hits == [label]):
+            decision.update(agent=label, source="model")
+
+        with self._lock:
+            self._seconds += time.perf_counter() - start
+            if decision["agent"] is None:
+                self._fallbacks += 1
+            else:
+                self._routed[(decision["agent"], decision["source"])] += 1
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routed = sum(self._routed.values())
+            total = routed + self._fallbacks
+            return {
+                "messages": total,
+                "routed": routed,
+                "fallbacks": self._fallbacks,
+                "routed_fraction": round(routed / total, 3) if total else 0.0,
+                "by_agent": {f"{agent}/{source}": count for (agent, source), count in sorted(self._routed.items())},
+                "mean_latency_us": round(self._seconds / total * 1e6, 1) if total else 0.0,
+            }
+
+
+_router: Optional[IntentRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> IntentRouter:
+    """Returns the process-wide router, training its model from ROUTER_TRAINING_DATA."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = IntentRouter(IntentModel.train(list(read_examples(ROUTER_TRAINING_DATA))))
+    return _router
+
+
+def router_stats() -> Dict[str, Any]:
+    """Routing counters for this process (empty until the router is first used)."""
+    return _router.stats() if _router is not None else {}
+
+
+def _text(content: Optional[types.Content]) -> str:
+    if content is None or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text).strip()
+
+
+def route_to_specialist(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """before_model_callback for the coordinator: transfers without an LLM call when confident.
+
+    Only the coordinator's first model call for a new user message is
+    routed; later calls in the same turn (e.g. after a sub-agent hands
+    control back) see the LLM as before.
+
+    Returns:
+        Optional[LlmResponse]: A transfer_to_agent function call, or None to call the model.
+    """
+    if not ROUTER_ENABLED or "transfer_to_agent" not in llm_request.tools_dict:
+        return None
+    text = _text(callback_context.user_content)
+    last = llm_request.contents[-1] if llm_request.contents else None
+    if not text or last is None or last.role != "user" or _text(last) != text:
+        return None
+
+    decision = get_router().classify(text)
+    agent = decision["agent"]
+    if agent is None or callback_context._invocation_context.agent.find_sub_agent(agent) is None:
+        return None
+    print(f"--- Router: {agent} ({decision['source']}, {decision['confidence']}) ---")  # Log routing decision
+    return LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[types.Part(function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": agent}))],
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify messages with the intent router.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    route = subcommands.add_parser("route", help="Show the routing decision for a message")
+    route.add_argument("text")
+    args = parser.parse_args()
+
+    print(json.dumps(get_router().classify(args.text), indent=2))
@@ -0,0 +1 @@
+from .scheduled_gemini import ScheduledGemini
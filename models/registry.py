@@ -0,0 +1,368 @@
+"""
+Model Registry
+Assigns each agent its model from configuration instead of a constant copied
+into every agent.py. AGENT_MODEL (written by setup.py) is the default for all
+agents; <AGENT>_MODEL overrides it for one agent (ROOT_AGENT_MODEL,
+WEATHER_AGENT_MODEL, SOCIAL_MEDIA_AGENT_MODEL, JOKES_AGENT_MODEL,
+IMAGE_AGENT_MODEL).
+
+A setting is a comma-separated fallback chain, e.g.
+
+    WEATHER_AGENT_MODEL=gemini-2.0-flash,openai/gpt-4o-mini
+
+Plain names are Gemini models, sent through the shared scheduler
+(ScheduledGemini). Names with a provider prefix ("openai/gpt-4o-mini",
+"ollama_chat/llama3", or explicitly "litellm/<model>") go through LiteLlm.
+Other prefixes can be registered with `register_backend`, which is how the
+benchmarks plug in local stand-in models.
+
+An agent with more than one model, or with hedging enabled, gets a
+ResilientModel:
+
+- fallback: a model that times out (MODEL_TIMEOUT_SECONDS to its first
+  response), fails to connect, or answers 429/5xx is replaced by the next
+  model in the chain. Once a model has produced part of the turn, a later
+  error propagates; two models are never spliced into one answer.
+- hedging (MODEL_HEDGE_ENABLED): when a call is still waiting for its first
+  response after the MODEL_HEDGE_PERCENTILE latency of that agent's recent
+  calls, a second identical call is sent and whichever answers first is used;
+  the other is cancelled. Hedges cost extra upstream calls (and Gemini
+  scheduler slots), about (100 - percentile)% of calls, so it's off by default.
+
+Agents with a single model and no hedging get the backend itself, unchanged.
+
+Usage: python -m models.registry          (show each agent's model chain)
+       python -m models.registry --json
+"""
+
+from collections import Counter, deque
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, List, Mapping, Optional, Tuple
+import argparse
+import asyncio
+import json
+import math
+import os
+import threading
+from dotenv import load_dotenv
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import PrivateAttr
+
+from models.scheduled_gemini import ScheduledGemini
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+AGENT_MODEL = os.getenv("AGENT_MODEL", DEFAULT_MODEL)
+MODEL_TIMEOUT_SECONDS = float(os.getenv("MODEL_TIMEOUT_SECONDS", "120"))
+MODEL_HEDGE_ENABLED = os.getenv("MODEL_HEDGE_ENABLED", "false").lower() == "true"
+MODEL_HEDGE_PERCENTILE = float(os.getenv("MODEL_HEDGE_PERCENTILE", "95"))
+# Calls observed before hedging starts, and the shortest wait before a hedge
+MODEL_HEDGE_MIN_SAMPLES = int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", "20"))
+MODEL_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("MODEL_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+
+# Agents configurable through <AGENT>_MODEL
+AGENT_KEYS = ("root_agent", "weather_agent", "social_media_agent", "jokes_agent", "image_agent")
+# Failures the next model in the chain is tried for (besides timeouts and connection errors)
+RETRIABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Recent first-response latencies kept per agent and model for the hedge threshold
+_LATENCY_WINDOW = 200
+
+
+def _lite_llm(model: str) -> BaseLlm:
+    from google.adk.models.lite_llm import LiteLlm  # Imported on first use: litellm is slow to load
+
+    return LiteLlm(model=model)
+
+
+# Model name prefix -> factory taking the rest of the name
+_BACKENDS: Dict[str, Callable[[str], BaseLlm]] = {"litellm": _lite_llm}
+
+
+def register_backend(prefix: str, factory: Callable[[str], BaseLlm]) -> None:
+    """Builds models named "<prefix>/<name>" with factory(name)."""
+    _BACKENDS[prefix] = factory
+
+
+def build_backend(name: str) -> BaseLlm:
+    """The model instance for one entry of a chain."""
+    prefix, _, rest = name.partition("/")
+    if rest and prefix in _BACKENDS:
+        return _BACKENDS[prefix](rest)
+    if rest:
+        return _lite_llm(name)
+    return ScheduledGemini(model=name)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # google-genai errors carry `code`; litellm, openai and httpx carry `status_code`
+    for value in (getattr(error, "code", None), getattr(error, "status_code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _should_fall_back(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return _status_code(error) in RETRIABLE_STATUS_CODES
+
+
+def _copy_request(llm_request: LlmRequest, model: str) -> LlmRequest:
+    """A copy one model can edit without affecting another attempt.
+
+    Models edit requests in place (appending a user turn, preprocessing
+    tools). Contents and config are copied; tools_dict holds live tool
+    objects that models only read, so it is shared.
+    """
+    return llm_request.model_copy(update={
+        "model": model,
+        "contents": [content.model_copy(deep=True) for content in llm_request.contents],
+        "config": llm_request.config.model_copy(deep=True) if llm_request.config else llm_request.config,
+    })
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))]
+
+
+async def _open(backend: BaseLlm, llm_request: LlmRequest, stream: bool) -> Tuple[AsyncGenerator, Optional[LlmResponse]]:
+    """Starts a call and waits for its first response."""
+    responses = backend.generate_content_async(llm_request, stream=stream)
+    try:
+        return responses, await responses.__anext__()
+    except StopAsyncIteration:
+        return responses, None
+    except BaseException:
+        await responses.aclose()
+        raise
+
+
+class ResilientModel(BaseLlm):
+    """Tries an agent's models in order, with a timeout and optional hedging per model.
+
+    `model` is the primary model's name: ADK copies it into each request, and
+    the LLM response cache keys on it.
+    """
+
+    agent: str
+    backends: List[BaseLlm]
+    timeout: float = MODEL_TIMEOUT_SECONDS
+    hedge: bool = MODEL_HEDGE_ENABLED
+    hedge_percentile: float = MODEL_HEDGE_PERCENTILE
+    hedge_min_samples: int = MODEL_HEDGE_MIN_SAMPLES
+    hedge_min_delay: float = MODEL_HEDGE_MIN_DELAY_SECONDS
+
+    # Updated from the event loop only, so no lock (and the model stays copyable)
+    # model -> recent first-response latencies (seconds)
+    _latencies: Dict[str, Deque[float]] = PrivateAttr(default_factory=dict)
+    # model -> calls, failures, timeouts, fallbacks, hedges, hedge_wins
+    _counts: Dict[str, Counter] = PrivateAttr(default_factory=dict)
+
+    @property
+    def capabilities(self):
+        # Requests are built before it's known which model serves them
+        return self.backends[0].capabilities
+
+    def connect(self, llm_request: LlmRequest):
+        # Live (bidirectional streaming) sessions stay on the primary model
+        return self.backends[0].connect(llm_request)
+
+    def _count(self, model: str, outcome: str) -> None:
+        self._counts.setdefault(model, Counter())[outcome] += 1
+
+    def _record_latency(self, model: str, seconds: float) -> None:
+        self._latencies.setdefault(model, deque(maxlen=_LATENCY_WINDOW)).append(seconds)
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait for a first response before hedging, or None to not hedge."""
+        if not self.hedge:
+            return None
+        samples = list(self._latencies.get(model, ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return max(_percentile(samples, self.hedge_percentile), self.hedge_min_delay)
+
+    async def _first_response(self, backend: BaseLlm, llm_request: LlmRequest, stream: bool):
+        """Calls one model, hedging if it is slow, and returns the first call to respond.
+
+        Raises:
+            asyncio.TimeoutError: No response within the timeout.
+            Exception: The call's error, once no call is left running.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.timeout
+        delay = self.hedge_delay(backend.model)
+        hedge_at = started + delay if delay is not None else None
+        # task -> (started at, is the hedge)
+        calls = {asyncio.ensure_future(_open(backend, _copy_request(llm_request, backend.model), stream)): (started, False)}
+        self._count(backend.model, "calls")
+        error: Optional[BaseException] = None
+        try:
+            while calls:
+                wake = min(deadline, hedge_at) if hedge_at is not None else deadline
+                done, _ = await asyncio.wait(calls, timeout=max(wake - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    call_started, is_hedge = calls.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                        self._count(backend.model, "failures")
+                        continue
+                    self._record_latency(backend.model, loop.time() - call_started)
+                    if is_hedge:
+                        self._count(backend.model, "hedge_wins")
+                    return task.result()
+                if done:
+                    continue
+                if loop.time() >= deadline:
+                    self._count(backend.model, "timeouts")
+                    raise asyncio.TimeoutError(f"{backend.model} gave no response within {self.timeout:g}s")
+                if hedge_at is not None and loop.time() >= hedge_at:
+                    hedge_at = None
+                    print(f"--- Model: hedging {backend.model} for {self.agent} after {delay:.2f}s ---")  # Log hedge
+                    hedge = asyncio.ensure_future(_open(backend, _copy_request(llm_request, backend.model), stream))
+                    calls[hedge] = (loop.time(), True)
+                    self._count(backend.model, "calls")
+                    self._count(backend.model, "hedges")
+            raise error
+        finally:
+            # Losers: cancel calls still waiting, close streams that answered at the same time
+            for task in calls:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    await task.result()[0].aclose()
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        for index, backend in enumerate(self.backends):
+            try:
+                responses, first = await self._first_response(backend, llm_request, stream)
+            except Exception as e:
+                if index == len(self.backends) - 1 or not _should_fall_back(e):
+                    raise
+                self._count(backend.model, "fallbacks")
+                print(
+                    f"--- Model: {backend.model} failed for {self.agent} ({type(e).__name__}: {e}); "
+                    f"falling back to {self.backends[index + 1].model} ---"
+                )  # Log fallback
+                continue
+            try:
+                if first is not None:
+                    yield first
+                async for response in responses:
+                    yield response
+            finally:
+                await responses.aclose()
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model call counts and first-response latency percentiles."""
+        report = {}
+        for backend in self.backends:
+            samples = list(self._latencies.get(backend.model, ()))
+            report[backend.model] = dict(
+                self._counts.get(backend.model, Counter()),
+                p50_s=round(_percentile(samples, 50), 3) if samples else None,
+                p95_s=round(_percentile(samples, 95), 3) if samples else None,
+            )
+        return report
+
+
+class ModelRegistry:
+    """Resolves agents to models from settings (the environment by default)."""
+
+    def __init__(
+        self,
+        settings: Optional[Mapping[str, str]] = None,
+        default: Optional[str] = None,
+        timeout: float = MODEL_TIMEOUT_SECONDS,
+        hedge: bool = MODEL_HEDGE_ENABLED,
+        hedge_percentile: float = MODEL_HEDGE_PERCENTILE,
+        hedge_min_samples: int = MODEL_HEDGE_MIN_SAMPLES,
+        hedge_min_delay: float = MODEL_HEDGE_MIN_DELAY_SECONDS,
+    ):
+        self.settings = os.environ if settings is None else settings
+        self.default = default or self.settings.get("AGENT_MODEL") or DEFAULT_MODEL
+        self.options = dict(
+            timeout=timeout,
+            hedge=hedge,
+            hedge_percentile=hedge_percentile,
+            hedge_min_samples=hedge_min_samples,
+            hedge_min_delay=hedge_min_delay,
+        )
+        self._lock = threading.Lock()
+        self._models: Dict[str, BaseLlm] = {}
+
+    def chain(self, agent: str) -> List[str]:
+        """The agent's model names, primary first."""
+        value = self.settings.get(f"{agent.upper()}_MODEL") or self.default
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        if not names:
+            raise ValueError(f"No model configured for {agent}. Set {agent.upper()}_MODEL or AGENT_MODEL.")
+        return names
+
+    def model_for(self, agent: str) -> BaseLlm:
+        """The agent's model; built once per agent and then reused."""
+        with self._lock:
+            if agent not in self._models:
+                backends = [build_backend(name) for name in self.chain(agent)]
+                if len(backends) == 1 and not self.options["hedge"]:
+                    self._models[agent] = backends[0]
+                else:
+                    self._models[agent] = ResilientModel(
+                        model=backends[0].model, agent=agent, backends=backends, **self.options
+                    )
+            return self._models[agent]
+
+    def stats(self) -> Dict[str, Any]:
+        """Fallback, hedge and latency statistics per agent with a ResilientModel."""
+        with self._lock:
+            models = dict(self._models)
+        return {agent: model.stats() for agent, model in models.items() if isinstance(model, ResilientModel)}
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Returns the process-wide registry, configured from the environment."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+
+def model_for(agent: str) -> BaseLlm:
+    """The configured model for an agent (e.g. "weather_agent", "root_agent")."""
+    return get_model_registry().model_for(agent)
+
+
+def model_registry_stats() -> Dict[str, Any]:
+    """Per-agent, per-model calls, failures, timeouts, fallbacks, hedges and latency."""
+    return get_model_registry().stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the model chain configured for each agent.")
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args()
+
+    registry = get_model_registry()
+    chains = {agent: registry.chain(agent) for agent in AGENT_KEYS}
+    if args.json:
+        print(json.dumps({"chains": chains, **registry.options}, indent=2))
+    else:
+        for agent, names in chains.items():
+            print(f"{agent:<20} {' -> '.join(names)}")
+        hedging = f"after the p{registry.options['hedge_percentile']:g} latency" if registry.options["hedge"] else "off"
+        print(f"\ntimeout {registry.options['timeout']:g}s per model; hedging {hedging}")
@@ -0,0 +1,263 @@
+"""
+LLM Response Cache
+Persistent cache of model responses, attached to agents through ADK's model
+callbacks. Many prompts repeat exactly (the example queries in run_agent.py,
+the same news topic from different users), and each used to cost a full
+Gemini call on the coordinator and again on every sub-agent.
+
+A request is keyed on the agent, the model, a hash of the normalized
+instruction, the tools offered, and the conversation contents, which carry
+the tool results. Function call ids are dropped because they differ on every
+run. Entries live in SQLite, expire after LLM_CACHE_TTL_SECONDS, and the
+least recently used are evicted once the stored responses exceed
+LLM_CACHE_MAX_BYTES.
+
+Agents attach `lookup_cached_response` as a before_model_callback and
+`store_model_response` as their after_model_callback. Agents listed in
+LLM_CACHE_EXCLUDED_AGENTS opt out: image_agent by default, since a repeated
+image request should render a new image. Cached responses carry
+custom_metadata {"response_cache": "hit"}.
+
+Usage: python -m models.response_cache stats
+       python -m models.response_cache clear
+"""
+
+from typing import Any, Dict, Optional
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+# Load environment variables
+load_dotenv()
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "llm_cache.sqlite3"),
+)
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 2 ** 20)))
+LLM_CACHE_EXCLUDED_AGENTS = frozenset(
+    name.strip() for name in os.getenv("LLM_CACHE_EXCLUDED_AGENTS", "image_agent_v1").split(",") if name.strip()
+)
+
+# Invocation-scoped state key ("temp:" is never persisted) carrying a request's key to the after callback
+_KEY_STATE_PREFIX = "temp:llm_cache_key:"
+# Fields that differ between identical requests or responses
+_VOLATILE_FIELDS = frozenset({"id", "thought_signature"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    agent TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used_at);
+"""
+
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _strip_volatile(item) for key, item in value.items() if key not in _VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_strip_volatile(item) for item in value]
+    return value
+
+
+def _instruction_hash(llm_request: LlmRequest) -> str:
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    if instruction is not None and not isinstance(instruction, str):
+        instruction = json.dumps(_strip_volatile(instruction.model_dump(mode="json", exclude_none=True)), sort_keys=True)
+    normalized = re.sub(r"\s+", " ", instruction or "").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def request_key(agent_name: str, llm_request: LlmRequest) -> str:
+    """Content address of a model request as one agent sends it."""
+    contents = [_strip_volatile(content.model_dump(mode="json", exclude_none=True)) for content in llm_request.contents]
+    material = {
+        "agent": agent_name,
+        "model": llm_request.model,
+        "instruction": _instruction_hash(llm_request),
+        "tools": sorted(llm_request.tools_dict),
+        "contents": contents,
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite table of serialized LlmResponses with TTL and LRU size bound."""
+
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # agent -> {"hits", "misses", "stores"} for this process
+        self._agents: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(response)), 0) FROM llm_responses").fetchone()[0]
+
+    def _count(self, agent: str, outcome: str) -> None:
+        counts = self._agents.setdefault(agent, {"hits": 0, "misses": 0, "stores": 0})
+        counts[outcome] += 1
+
+    def lookup(self, key: str, agent: str) -> Optional[LlmResponse]:
+        """Returns the cached response for a request key, or None (expired entries count as misses)."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, expires_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                self._count(agent, "misses")
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE llm_responses SET hits = hits + 1, last_used_at = ? WHERE key = ?", (now, key))
+            self._count(agent, "hits")
+        response = LlmResponse.model_validate_json(row[0])
+        response.custom_metadata = {**(response.custom_metadata or {}), "response_cache": "hit"}
+        return response
+
+    def store(self, key: str, agent: str, model: str, llm_response: LlmResponse) -> None:
+        """Saves a response, then evicts expired and least recently used entries over the size bound."""
+        # Usage metadata would count tokens that a hit doesn't spend
+        payload = _strip_volatile(llm_response.model_dump(mode="json", exclude_none=True, exclude={"usage_metadata"}))
+        serialized = json.dumps(payload, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._conn:
+            previous = self._conn.execute("SELECT LENGTH(response) FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, agent, model, response, created_at, expires_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, agent, model, serialized, now, now + self.ttl_seconds, now),
+            )
+            self._bytes += len(serialized) - (previous[0] if previous else 0)
+            self._count(agent, "stores")
+            if self._bytes > self.max_bytes:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """Drops expired entries, then the least recently used until under max_bytes. Caller holds the lock."""
+        removed = self._conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,)).rowcount
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(response)), 0) FROM llm_responses").fetchone()[0]
+        rows = self._conn.execute("SELECT key, LENGTH(response) FROM llm_responses ORDER BY last_used_at")
+        victims = []
+        for key, size in rows:
+            if self._bytes <= self.max_bytes:
+                break
+            victims.append((key,))
+            self._bytes -= size
+        self._conn.executemany("DELETE FROM llm_responses WHERE key = ?", victims)
+        self.evictions += removed + len(victims)
+
+    def clear(self) -> int:
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM llm_responses").rowcount
+            self._bytes = 0
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            agents = {}
+            for agent, counts in sorted(self._agents.items()):
+                lookups = counts["hits"] + counts["misses"]
+                agents[agent] = dict(counts, hit_rate=round(counts["hits"] / lookups, 4) if lookups else 0.0)
+            return {
+                "path": self.path,
+                "entries": entries,
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+                "agents": agents,
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Returns the process-wide response cache, or None when LLM_CACHE_ENABLED is false."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES)
+    return _cache
+
+
+def response_cache_stats() -> Dict[str, Any]:
+    """Per-agent hits, misses, stores and hit rate for this process, plus table size."""
+    cache = get_response_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def lookup_cached_response(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """ADK before_model_callback that answers repeated requests from the cache.
+
+    Returns:
+        Optional[LlmResponse]: The cached response, or None to call the model.
+    """
+    cache = get_response_cache()
+    agent = callback_context.agent_name
+    if cache is None or agent in LLM_CACHE_EXCLUDED_AGENTS:
+        return None
+    key = request_key(agent, llm_request)
+    cached = cache.lookup(key, agent)
+    if cached is not None:
+        print(f"--- LLM cache hit: {agent} ---")  # Log cache hit
+        return cached
+    callback_context.state[_KEY_STATE_PREFIX + agent] = {"key": key, "model": llm_request.model or ""}
+    return None
+
+
+def store_model_response(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+    """ADK after_model_callback that saves complete, successful model responses.
+
+    Returns None, so the response is passed on unchanged.
+    """
+    cache = get_response_cache()
+    agent = callback_context.agent_name
+    pending = callback_context.state.get(_KEY_STATE_PREFIX + agent)
+    if cache is None or not pending or llm_response.partial:
+        return None
+    callback_context.state[_KEY_STATE_PREFIX + agent] = None
+    if llm_response.error_code or llm_response.content is None or not llm_response.content.parts:
+        return None
+    cache.store(pending["key"], agent, pending["model"], llm_response)
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache.")
+    parser.add_argument("command", choices=["stats", "clear"])
+    args = parser.parse_args()
+
+    cache = get_response_cache() or ResponseCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES)
+    if args.command == "clear":
+        print(json.dumps({"removed": cache.clear()}))
+    else:
+        print(json.dumps(cache.stats(), indent=2))
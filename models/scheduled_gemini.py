@@ -0,0 +1,36 @@
+"""
+Scheduled Gemini Model
+Gemini model wrapper whose requests go through the shared upstream scheduler,
+so agent turns share one Gemini rate limit with priority for interactive users.
+"""
+
+from typing import AsyncGenerator
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from tools.scheduler import penalize, slot_async
+
+# Pause applied when Gemini answers 429 without a usable Retry-After
+GEMINI_RATE_LIMIT_PAUSE = 30.0
+
+
+class ScheduledGemini(Gemini):
+    """Gemini model that waits for a "gemini" scheduler slot before each request.
+
+    Use it anywhere a model name string was passed to an Agent:
+
+        Agent(name="...", model=ScheduledGemini(model="gemini-2.0-flash"), ...)
+    """
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        async with slot_async("gemini"):
+            try:
+                async for response in super().generate_content_async(llm_request, stream=stream):
+                    yield response
+            except Exception as e:
+                if getattr(e, "code", None) == 429:
+                    penalize("gemini", GEMINI_RATE_LIMIT_PAUSE)
+                raise
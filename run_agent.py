@@ -10,6 +10,7 @@ from dotenv import load_dotenv
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from host_agent.agent import root_agent
+from tools.scheduler import BATCH, set_priority
 
 # Load environment variables
 load_dotenv()
@@ -17,6 +18,9 @@ load_dotenv()
 async def main():
     """Main function to demonstrate agent interactions."""
     
+    # Scripted examples yield upstream capacity to interactive sessions
+    set_priority(BATCH)
+    
     # Check if News API key is configured
     if not os.getenv('NEWS_API_KEY'):
         print("⚠️  Warning: NEWS_API_KEY not found in environment variables.")
@@ -64,7 +64,8 @@ GOOGLE_CLOUD_PROJECT=your_project_id_here
 DEBUG=false
 
 # Model Configuration (optional)
-# Default is gemini-2.0-flash, you can change this if needed
+# Default is gemini-2.0-flash, you can change this if needed.
+# Override one agent with e.g. WEATHER_AGENT_MODEL; a comma-separated list is a fallback chain
 AGENT_MODEL=gemini-2.0-flash
 """
     
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+
+from tools import cache as cache_module
+from tools.cache import CachePolicy, ToolCache, cached_tool
+
+OK = {"status": "success", "value": 1}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_fresh_then_stale_then_miss(clock):
+    cache = ToolCache(CachePolicy("test", ttl=10, stale_ttl=20))
+    assert cache.lookup("key") == ("miss", None)
+    cache.store("key", OK)
+    assert cache.lookup("key") == ("fresh", OK)
+    clock[0] += 15
+    assert cache.lookup("key") == ("stale", OK)
+    clock[0] += 20
+    assert cache.lookup("key") == ("miss", None)
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.stale_hits, cache.misses) == (1, 1, 2)
+
+
+def test_lookups_return_copies(clock):
+    cache = ToolCache(CachePolicy("test"))
+    cache.store("key", {"status": "success", "items": [1]})
+    cache.lookup("key")[1]["items"].append(2)
+    assert cache.lookup("key")[1]["items"] == [1]
+
+
+def test_errors_are_not_cached(clock):
+    cache = ToolCache(CachePolicy("test"))
+    cache.store("key", {"status": "error", "error_message": "down"})
+    assert cache.lookup("key") == ("miss", None)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ToolCache(CachePolicy("test", max_entries=2))
+    cache.store("a", OK)
+    cache.store("b", OK)
+    cache.lookup("a")  # "b" is now the least recently used
+    cache.store("c", OK)
+    assert cache.lookup("b")[0] == "miss"
+    assert cache.lookup("a")[0] == "fresh"
+    assert cache.lookup("c")[0] == "fresh"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cached_tool_normalizes_arguments(clock):
+    calls = []
+
+    @cached_tool(CachePolicy("test_cached_tool", normalize=lambda arguments: {"city": arguments["city"].lower()}))
+    def tool(city: str):
+        calls.append(city)
+        return {"status": "success", "city": city}
+
+    assert tool("Paris") == tool(city="PARIS") == {"status": "success", "city": "Paris"}
+    assert calls == ["Paris"]
@@ -0,0 +1,19 @@
+import pytest
+
+from tools.gazetteer import get_gazetteer
+
+
+@pytest.mark.parametrize("query, name, match", [
+    ("Paris", "Paris", "exact"),
+    ("NYC", "New York", "alias"),
+    ("Tokio", "Tokyo", "fuzzy"),
+    ("Mumbay", "Mumbai", "fuzzy"),
+])
+def test_lookup(query, name, match):
+    place = get_gazetteer().lookup(query)
+    assert (place["name"], place["match"]) == (name, match)
+
+
+@pytest.mark.parametrize("query", ["home", "dome", "lime", "osl"])
+def test_short_words_are_not_corrected_into_cities(query):
+    assert get_gazetteer().lookup(query) is None
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+from tools import joke_corpus
+from tools.get_jokes import search_jokes
+
+JOKES = [
+    ("animals", "Why did the cat sit on the computer?", "To keep an eye on the mouse."),
+    ("animals", "What do you call a pile of cats?", "A meowtain."),
+    ("science", "Why can't you trust an atom?", "They make up everything."),
+    ("science", "What did the biologist wear on a first date?", "Designer genes."),
+]
+
+
+@pytest.fixture(autouse=True)
+def corpus(tmp_path, monkeypatch):
+    path = str(tmp_path / "jokes.bin")
+    joke_corpus.build_corpus(JOKES, path)
+    corpus = joke_corpus.JokeCorpus(path)
+    monkeypatch.setattr(joke_corpus, "get_joke_corpus", lambda: corpus)
+    return corpus
+
+
+def test_keyword_search():
+    result = search_jokes("a funny joke about cats", 2)
+    assert result["match"] == "search"
+    assert [joke["joke"] for joke in result["jokes"]] == [
+        "What do you call a pile of cats?",
+        "Why did the cat sit on the computer?",
+    ]
+    assert result["jokes"][0]["category"] == "animals"
+
+
+def test_category_name_is_answered_from_the_category():
+    result = search_jokes("science jokes", 2)
+    assert (result["match"], result["category"]) == ("category", "science")
+    assert {joke["category"] for joke in result["jokes"]} == {"science"}
+
+
+def test_no_keyword_match_falls_back_to_a_mentioned_category():
+    result = search_jokes("science jokes about unicorns")
+    assert (result["match"], result["category"]) == ("category", "science")
+
+
+def test_no_match_and_no_category_is_an_error():
+    result = search_jokes("unicorns")
+    assert result["status"] == "error"
+    assert "animals, science" in result["error_message"]
+
+
+def test_repeated_searches_prefer_jokes_not_told_yet():
+    tool_context = SimpleNamespace(state={})
+    first = search_jokes("cats", tool_context=tool_context)["jokes"][0]["joke"]
+    second = search_jokes("cats", tool_context=tool_context)["jokes"][0]["joke"]
+    assert first != second
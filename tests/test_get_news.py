@@ -0,0 +1,52 @@
+import pytest
+
+from benchmarks.stand_in_server import StandInServer
+from tools import get_latest_news, news_archive
+from tools.cache import clear_caches
+from tools.get_latest_news import get_news
+from tools.news_archive import NewsArchive
+
+ARTICLE = {
+    "title": "Climate summit opens",
+    "description": "Leaders meet to discuss emissions.",
+    "url": "https://news.example/climate/summit",
+    "publishedAt": "2025-07-19T10:00:00Z",
+    "source": {"name": "Outlet"},
+    "author": "Reporter",
+    "content": "Leaders meet to discuss emissions.",
+}
+
+
+@pytest.fixture
+def stand_in():
+    server = StandInServer(delay=0).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    archive = NewsArchive(str(tmp_path / "news.sqlite3"))
+    archive.store("climate", [ARTICLE])
+    monkeypatch.setattr(news_archive, "get_archive", lambda: archive)
+    monkeypatch.setattr(news_archive, "NEWS_ARCHIVE_FRESH_SECONDS", -1)  # Always ask NewsAPI first
+    monkeypatch.setenv("NEWS_API_KEY", "test-key")
+    clear_caches()
+    yield archive
+    clear_caches()
+
+
+def test_outage_fallback_is_not_cached(stand_in, archive, monkeypatch):
+    monkeypatch.setattr(get_latest_news, "NEWS_API_BASE_URL", f"{stand_in.base_url}/v2/unavailable")
+    for _ in range(2):
+        result = get_news("climate")
+        assert result["status"] == "success"
+        assert result["stale"] is True
+    assert stand_in.hits["/v2/unavailable"] == 2
+
+    # Once NewsAPI answers again, its articles are served instead of the archived fallback
+    monkeypatch.setattr(get_latest_news, "NEWS_API_BASE_URL", f"{stand_in.base_url}/v2/everything")
+    result = get_news("climate")
+    assert "stale" not in result
+    assert stand_in.hits["/v2/everything"] == 1
@@ -0,0 +1,28 @@
+import pytest
+
+from tools.get_weather import _format_report, get_weather, get_weather_many
+
+
+def test_limit_given_as_a_string_is_coerced():
+    result = get_weather_many(["New York", "London", "Tokyo"], limit="2")
+    assert result["status"] == "success"
+    assert len(result["results"]) == 2
+
+
+def test_invalid_limit_is_reported():
+    result = get_weather_many(["New York", "London"], limit="two")
+    assert result["status"] == "error"
+    assert "limit" in result["error_message"]
+
+
+@pytest.mark.parametrize("conditions", ["light rain", "thunderstorms with hail", "clear and sunny"])
+def test_report_reads_well_for_any_conditions(conditions):
+    place = {"name": "Tokyo", "country": "JP"}
+    result = _format_report(place, {"temperature_c": 18.0, "conditions": conditions})
+    assert result["report"] == f"Current conditions in Tokyo: {conditions}, 18°C."
+
+
+def test_report_for_a_city():
+    result = get_weather("Tokyo")
+    assert result["status"] == "success"
+    assert result["report"] == f"Current conditions in Tokyo: {result['conditions']}, {result['temperature']}."
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+
+import pytest
+
+from tools import image_jobs, image_store
+from tools.image_jobs import CANCELLED, RUNNING, SUCCEEDED, ImageJobQueue
+from tools.image_store import ImageStore
+from tools.singleflight import single_flight
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ImageStore(str(tmp_path / "images"), max_bytes=10 ** 6)
+    monkeypatch.setattr(image_store, "get_image_store", lambda: store)
+    return store
+
+
+def _stored_image(store: ImageStore, content: bytes, prompt: str) -> dict:
+    path = store.incoming_path()
+    with open(path, "wb") as f:
+        f.write(content)
+    return store.add(path, prompt=prompt)
+
+
+def _cancel_while_running(tmp_path, monkeypatch, render) -> dict:
+    """Runs one job whose render returns render() only after the job was cancelled."""
+    cancelled = threading.Event()
+
+    def generate_image(prompt, size, quality, force_new=False):
+        cancelled.wait(5)
+        return render()
+
+    monkeypatch.setattr(image_jobs, "generate_image", generate_image)
+    queue = ImageJobQueue(str(tmp_path / "jobs.sqlite3"), workers=1, max_pending=5)
+    job = queue.submit("a lighthouse at dusk", "1024x1024", "standard")
+    deadline = time.time() + 5
+    while queue.get(job["id"])["status"] != RUNNING and time.time() < deadline:
+        time.sleep(0.01)
+    queue.cancel(job["id"])
+    cancelled.set()
+    while queue.get(job["id"])["status"] != CANCELLED and time.time() < deadline:
+        time.sleep(0.01)
+    return queue.get(job["id"])
+
+
+def test_cancel_discards_a_new_render(store, tmp_path, monkeypatch):
+    def render():
+        entry = _stored_image(store, b"new render", "a lighthouse at dusk")
+        return {"status": "success", "local_path": entry["path"], "image_id": entry["id"]}
+
+    job = _cancel_while_running(tmp_path, monkeypatch, render)
+    assert job["status"] == CANCELLED
+    assert store.stats()["images"] == 0
+    assert store.stats()["bytes"] == 0
+
+
+@pytest.mark.parametrize("reuse", ["cache_hit", "deduplicated"])
+def test_cancel_keeps_an_earlier_image(store, tmp_path, monkeypatch, reuse):
+    earlier = _stored_image(store, b"earlier render", "a lighthouse at dusk")
+
+    def render():
+        if reuse == "cache_hit":
+            return {"status": "success", "local_path": earlier["path"], "image_id": earlier["id"], "cache_hit": True}
+        entry = _stored_image(store, b"earlier render", "a lighthouse at dusk")
+        return {"status": "success", "local_path": entry["path"], "image_id": entry["id"], "deduplicated": entry.get("deduplicated", False)}
+
+    job = _cancel_while_running(tmp_path, monkeypatch, render)
+    assert job["status"] == CANCELLED
+    assert os.path.exists(earlier["path"])
+    assert store.get(earlier["id"]) is not None
+    assert store.stats()["bytes"] == len(b"earlier render")
+
+
+def test_remove_drops_entry_and_file(store):
+    entry = _stored_image(store, b"some image", "a cat")
+    assert store.remove(entry["id"])
+    assert not os.path.exists(entry["path"])
+    assert store.get(entry["id"]) is None
+    assert store.stats()["bytes"] == 0
+    assert not store.remove(entry["id"])
+
+
+@pytest.mark.parametrize("cancelled", ["leader", "follower"])
+def test_cancel_keeps_a_render_shared_with_a_concurrent_job(store, tmp_path, monkeypatch, cancelled):
+    release = threading.Event()
+    renders = []
+
+    # Coalesced like tools.generate_image.generate_image
+    @single_flight(f"test_shared_render_{cancelled}", mark_shared=True)
+    def generate_image(prompt, size, quality, force_new=False):
+        renders.append(prompt)
+        release.wait(5)
+        entry = _stored_image(store, b"shared render", prompt)
+        return {"status": "success", "local_path": entry["path"], "image_id": entry["id"]}
+
+    monkeypatch.setattr(image_jobs, "generate_image", generate_image)
+    queue = ImageJobQueue(str(tmp_path / "jobs.sqlite3"), workers=2, max_pending=5)
+    leader = queue.submit("a lighthouse at dusk", "1024x1024", "standard")
+    deadline = time.time() + 5
+    while not renders and time.time() < deadline:
+        time.sleep(0.01)
+    follower = queue.submit("a lighthouse at dusk", "1024x1024", "standard")
+    while generate_image.single_flight.stats()["coalesced"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+
+    victim, survivor = (leader, follower) if cancelled == "leader" else (follower, leader)
+    queue.cancel(victim["id"])
+    release.set()
+    while queue.get(survivor["id"])["status"] != SUCCEEDED and time.time() < deadline:
+        time.sleep(0.01)
+    while queue.get(victim["id"])["status"] != CANCELLED and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert renders == ["a lighthouse at dusk"]
+    result = queue.get(survivor["id"])["result"]
+    assert os.path.exists(result["local_path"])
+    assert store.get(result["image_id"]) is not None
@@ -0,0 +1,31 @@
+import http.client
+
+from tools.image_server import ImageServer
+from tools.image_store import ImageStore
+
+
+def test_not_modified_has_no_content_length(tmp_path):
+    store = ImageStore(str(tmp_path / "images"), max_bytes=10 ** 6)
+    path = store.incoming_path()
+    with open(path, "wb") as f:
+        f.write(b"x" * 1000)
+    entry = store.add(path, prompt="a cat")
+    server = ImageServer(("127.0.0.1", 0), store=store).start()
+    try:
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        connection.request("GET", f"/images/{entry['id']}", headers={"If-None-Match": f'"{entry["sha256"]}"'})
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 304
+        assert response.getheader("Content-Length") is None
+        assert response.getheader("ETag") == f'"{entry["sha256"]}"'
+
+        # The connection is still usable afterwards
+        connection.request("GET", "/images/missing")
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 404
+        assert response.getheader("Content-Length") == "0"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,36 @@
+import os
+
+from tools.image_store import ImageStore
+
+
+def test_rebuild_copies_legacy_images_and_leaves_them_in_place(tmp_path):
+    root = tmp_path / "images"
+    root.mkdir()
+    legacy = root / "a_cat_in_a_hat_20250719_142200.png"
+    legacy.write_bytes(b"legacy image")
+    store = ImageStore(str(root), max_bytes=10 ** 6)
+
+    assert store.rebuild() == {"added": 1, "removed_missing": 0}
+    assert legacy.read_bytes() == b"legacy image"
+    assert store.stats()["images"] == 1
+
+    # Running it again finds the legacy file's content already stored
+    assert store.rebuild() == {"added": 0, "removed_missing": 0}
+    assert legacy.exists()
+    assert store.stats()["images"] == 1
+    assert store.stats()["bytes"] == len(b"legacy image")
+
+
+def test_rebuild_indexes_sharded_images_in_place(tmp_path):
+    store = ImageStore(str(tmp_path / "images"), max_bytes=10 ** 6)
+    path = store.incoming_path()
+    with open(path, "wb") as f:
+        f.write(b"sharded image")
+    entry = store.add(path, prompt="a dog")
+    store.remove(entry["id"])
+    with open(entry["path"], "wb") as f:  # The file is back, but the manifest forgot it
+        f.write(b"sharded image")
+
+    assert store.rebuild() == {"added": 1, "removed_missing": 0}
+    assert store.get_by_hash(entry["sha256"])["path"] == entry["path"]
+    assert os.listdir(os.path.join(store.root, ".incoming")) == []
@@ -0,0 +1,107 @@
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from tools import joke_corpus
+from tools.get_jokes import get_jokes
+from tools.joke_corpus import draw, new_bag, shuffled_index
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 100, 1000, 4097])
+def test_shuffled_index_is_a_permutation(size):
+    assert sorted(shuffled_index(position, size, seed=12345) for position in range(size)) == list(range(size))
+
+
+def test_bag_never_repeats_until_exhausted():
+    size = 50
+    bag, drawn = None, []
+    for _ in range(size):
+        index, bag, _ = draw(bag, size)
+        drawn.append(index)
+    assert sorted(drawn) == list(range(size))
+
+    # The next draw starts a new shuffle
+    index, bag, restarted = draw(bag, size)
+    assert restarted
+    assert bag["drawn"] == 1
+
+
+def test_bag_is_replaced_when_the_category_size_changes():
+    bag = dict(new_bag(10), drawn=3)
+    _, bag, restarted = draw(bag, 12)
+    assert restarted
+    assert (bag["size"], bag["drawn"]) == (12, 1)
+
+
+def test_session_hears_every_joke_in_a_category_before_a_repeat():
+    tool_context = SimpleNamespace(state={})
+    size = joke_corpus.get_joke_corpus().span("programming")[1]
+    told = []
+    for heard in range(1, size + 1):
+        result = get_jokes("programming", 1, tool_context=tool_context)
+        told += [joke["joke"] for joke in result["jokes"]]
+        assert result["remaining"] == size - heard
+    assert len(set(told)) == size
+
+
+ANIMAL_JOKES = [
+    ("animals", "Why did the cat sit on the computer?", "To keep an eye on the mouse."),
+    ("animals", "What do you call a pile of cats?", "A meowtain."),
+    ("animals", "Why don't dogs make good dancers?", "They have two left feet."),
+    ("science", "Why can't you trust an atom?", "They make up everything."),
+]
+
+
+def _corpus(tmp_path, jokes) -> joke_corpus.JokeCorpus:
+    path = str(tmp_path / "jokes.bin")
+    joke_corpus.build_corpus(jokes, path)
+    return joke_corpus.JokeCorpus(path)
+
+
+def test_search_ranks_jokes_matching_more_terms_first(tmp_path):
+    corpus = _corpus(tmp_path, ANIMAL_JOKES)
+    hits, total = corpus.search("cats and mice or a mouse")
+    assert [corpus.joke(index)["joke"] for index, _ in hits] == [
+        "Why did the cat sit on the computer?",
+        "What do you call a pile of cats?",
+    ]
+    assert hits[0][1] > hits[1][1]
+    assert total == 2
+    assert corpus.search("unicorns") == ([], 0)
+
+
+def _brute_force_bm25(documents: list, query: str) -> list:
+    """Reference BM25 over every document, best first."""
+    terms = set(joke_corpus.tokenize(query))
+    tokenized = [joke_corpus.tokenize(document) for document in documents]
+    average = sum(len(tokens) for tokens in tokenized) / len(tokenized)
+    frequencies = {term: sum(1 for tokens in tokenized if term in tokens) for term in terms}
+    scores = []
+    for tokens in tokenized:
+        score = 0.0
+        for term, frequency in frequencies.items():
+            tf = tokens.count(term)
+            if tf:
+                idf = math.log(1 + (len(documents) - frequency + 0.5) / (frequency + 0.5))
+                norm = joke_corpus.BM25_K1 * (1 - joke_corpus.BM25_B + joke_corpus.BM25_B * len(tokens) / average)
+                score += idf * tf * (joke_corpus.BM25_K1 + 1) / (tf + norm)
+        scores.append(score)
+    return sorted((score for score in scores if score > 0), reverse=True)
+
+
+def test_pruned_search_matches_brute_force_bm25(tmp_path):
+    rng = random.Random(7)
+    vocabulary = [f"word{n}" for n in range(300)]
+    jokes = [
+        ("general", " ".join(rng.choice(vocabulary) for _ in range(rng.randint(4, 12))), rng.choice(vocabulary))
+        for _ in range(2000)
+    ]
+    corpus = _corpus(tmp_path, jokes)
+    documents = [f"{joke} {punchline}" for _, joke, punchline in jokes]
+    for _ in range(20):
+        query = " ".join(rng.sample(vocabulary, rng.randint(2, 5)))
+        hits, _ = corpus.search(query, limit=5)
+        expected = _brute_force_bm25(documents, query)[:5]
+        assert [score for _, score in hits] == pytest.approx(expected, abs=1e-3)
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from google.genai.errors import ClientError, ServerError
+
+from models.registry import ModelRegistry, register_backend
+
+# Stand-in name -> async generator function producing its responses
+BEHAVIORS = {}
+# Stand-in names in call order, and the names of calls that were cancelled
+CALLS = []
+CANCELLED = []
+
+
+class StandInModel(BaseLlm):
+    """Local model whose behavior is named after "stand-in/"."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        name = self.model.split("/", 1)[1]
+        CALLS.append(name)
+        try:
+            async for response in BEHAVIORS[name]():
+                yield response
+        except asyncio.CancelledError:
+            CANCELLED.append(name)
+            raise
+
+
+register_backend("stand-in", lambda name: StandInModel(model=f"stand-in/{name}"))
+
+
+def _text(text: str) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+async def _answers():
+    yield _text("answer")
+
+
+async def _rate_limited():
+    raise ClientError(429, {"error": {"message": "quota exceeded", "status": "RESOURCE_EXHAUSTED"}})
+    yield
+
+
+async def _unavailable():
+    raise ServerError(503, {"error": {"message": "unavailable", "status": "UNAVAILABLE"}})
+    yield
+
+
+async def _bad_request():
+    raise ClientError(400, {"error": {"message": "bad request", "status": "INVALID_ARGUMENT"}})
+    yield
+
+
+async def _hangs():
+    await asyncio.sleep(3600)
+    yield
+
+
+async def _breaks_mid_stream():
+    yield _text("partial")
+    raise ServerError(503, {"error": {"message": "unavailable", "status": "UNAVAILABLE"}})
+
+
+@pytest.fixture(autouse=True)
+def stand_ins():
+    BEHAVIORS.clear()
+    BEHAVIORS.update(
+        answers=_answers,
+        rate_limited=_rate_limited,
+        unavailable=_unavailable,
+        bad_request=_bad_request,
+        hangs=_hangs,
+        breaks_mid_stream=_breaks_mid_stream,
+    )
+    CALLS.clear()
+    CANCELLED.clear()
+
+
+def _model(chain: str, **options):
+    return ModelRegistry(settings={"TEST_AGENT_MODEL": chain}, **options).model_for("test_agent")
+
+
+async def _collect(model) -> list:
+    request = LlmRequest(model=model.model, contents=[types.Content(role="user", parts=[types.Part(text="hi")])])
+    return [response.content.parts[0].text async for response in model.generate_content_async(request)]
+
+
+async def _cancelled_after(answers) -> list:
+    """Stand-ins cancelled while the loop still runs (asyncio.run cancels leftovers on exit)."""
+    await answers
+    await asyncio.sleep(0.01)
+    return list(CANCELLED)
+
+
+@pytest.mark.parametrize("primary", ["rate_limited", "unavailable"])
+def test_falls_back_on_retriable_status(primary):
+    model = _model(f"stand-in/{primary},stand-in/answers")
+    assert asyncio.run(_collect(model)) == ["answer"]
+    assert CALLS == [primary, "answers"]
+    assert model.stats()[f"stand-in/{primary}"]["fallbacks"] == 1
+
+
+def test_falls_back_on_timeout():
+    model = _model("stand-in/hangs,stand-in/answers", timeout=0.1)
+    assert asyncio.run(_cancelled_after(_collect(model))) == ["hangs"]
+    assert CALLS == ["hangs", "answers"]
+    assert model.stats()["stand-in/hangs"]["timeouts"] == 1
+
+
+def test_other_errors_propagate():
+    model = _model("stand-in/bad_request,stand-in/answers")
+    with pytest.raises(ClientError):
+        asyncio.run(_collect(model))
+    assert CALLS == ["bad_request"]
+
+
+def test_no_fallback_after_the_first_response():
+    model = _model("stand-in/breaks_mid_stream,stand-in/answers")
+    received = []
+
+    async def consume():
+        request = LlmRequest(model=model.model, contents=[types.Content(role="user", parts=[types.Part(text="hi")])])
+        async for response in model.generate_content_async(request):
+            received.append(response.content.parts[0].text)
+
+    with pytest.raises(ServerError):
+        asyncio.run(consume())
+    assert received == ["partial"]
+    assert CALLS == ["breaks_mid_stream"]
+
+
+def test_losing_hedge_call_is_cancelled():
+    calls = 0
+
+    async def slow_after_warm_up():
+        nonlocal calls
+        calls += 1
+        # The first slow call is hedged; the hedge answers at once
+        await asyncio.sleep(3600 if calls == 4 else 0.01)
+        yield _text(f"answer {calls}")
+
+    BEHAVIORS["slow_after_warm_up"] = slow_after_warm_up
+    model = _model("stand-in/slow_after_warm_up", hedge=True, hedge_percentile=50, hedge_min_samples=3, hedge_min_delay=0.05)
+    answers = []
+
+    async def main():
+        for _ in range(4):
+            answers.append(await _collect(model))
+
+    assert asyncio.run(_cancelled_after(main())) == ["slow_after_warm_up"]
+    assert answers[-1] == ["answer 5"]
+    stats = model.stats()["stand-in/slow_after_warm_up"]
+    assert stats["calls"] == 5
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from models import response_cache
+from models.response_cache import ResponseCache, lookup_cached_response, request_key, store_model_response
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return ResponseCache(str(tmp_path / "llm_cache.sqlite3"), ttl_seconds=60, max_bytes=2 ** 20)
+
+
+def _request(text: str = "weather in Paris", call_id: str = "call-1") -> LlmRequest:
+    call = types.FunctionCall(id=call_id, name="get_weather", args={"city": "Paris"})
+    return LlmRequest(model="gemini-2.0-flash", contents=[
+        types.Content(role="user", parts=[types.Part(text=text)]),
+        types.Content(role="model", parts=[types.Part(function_call=call)]),
+    ])
+
+
+def _response(text: str = "It is sunny in Paris.", **fields) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), **fields)
+
+
+def test_request_key_ignores_function_call_ids():
+    assert request_key("weather_agent_v1", _request(call_id="call-1")) == request_key("weather_agent_v1", _request(call_id="call-2"))
+    assert request_key("weather_agent_v1", _request()) != request_key("weather_agent_v1", _request("weather in Rome"))
+    assert request_key("weather_agent_v1", _request()) != request_key("jokes_agent_v1", _request())
+
+
+def test_hit_is_marked_and_expires_after_ttl(cache, clock):
+    cache.store("key", "weather_agent_v1", "gemini-2.0-flash", _response())
+    hit = cache.lookup("key", "weather_agent_v1")
+    assert hit.content.parts[0].text == "It is sunny in Paris."
+    assert hit.custom_metadata == {"response_cache": "hit"}
+    clock[0] += 60
+    assert cache.lookup("key", "weather_agent_v1") is None
+    assert cache.stats()["agents"]["weather_agent_v1"] == {"hits": 1, "misses": 1, "stores": 1, "hit_rate": 0.5}
+
+
+def test_least_recently_used_are_evicted_over_max_bytes(cache, clock):
+    cache.store("a", "agent", "model", _response("a"))
+    cache.max_bytes = 2 * cache.stats()["bytes"]
+    clock[0] += 1
+    cache.store("b", "agent", "model", _response("b"))
+    clock[0] += 1
+    assert cache.lookup("a", "agent") is not None
+    clock[0] += 1
+    cache.store("c", "agent", "model", _response("c"))
+    assert cache.lookup("b", "agent") is None
+    assert cache.lookup("a", "agent") is not None
+    assert cache.lookup("c", "agent") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+@pytest.fixture
+def enabled(monkeypatch, cache):
+    monkeypatch.setattr(response_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    return cache
+
+
+def _context(agent: str = "weather_agent_v1"):
+    return SimpleNamespace(agent_name=agent, state={})
+
+
+def test_callbacks_store_on_a_miss_and_answer_the_repeat(enabled):
+    context = _context()
+    assert lookup_cached_response(context, _request()) is None
+    assert store_model_response(context, _response()) is None
+    # Only the response to the request that missed is stored
+    assert store_model_response(context, _response("a second response")) is None
+    hit = lookup_cached_response(_context(), _request(call_id="call-2"))
+    assert hit.content.parts[0].text == "It is sunny in Paris."
+    assert enabled.stats()["agents"]["weather_agent_v1"]["stores"] == 1
+
+
+@pytest.mark.parametrize("response", [
+    _response(partial=True),
+    _response(error_code="RESOURCE_EXHAUSTED"),
+    LlmResponse(),
+])
+def test_partial_errored_or_empty_responses_are_not_stored(enabled, response):
+    context = _context()
+    lookup_cached_response(context, _request())
+    store_model_response(context, response)
+    assert lookup_cached_response(_context(), _request()) is None
+
+
+def test_partial_responses_wait_for_the_complete_one(enabled):
+    context = _context()
+    lookup_cached_response(context, _request())
+    store_model_response(context, _response("It is", partial=True))
+    store_model_response(context, _response())
+    assert lookup_cached_response(_context(), _request()).content.parts[0].text == "It is sunny in Paris."
+
+
+def test_image_agent_opts_out(enabled):
+    context = _context("image_agent_v1")
+    assert lookup_cached_response(context, _request()) is None
+    store_model_response(context, _response())
+    assert lookup_cached_response(_context("image_agent_v1"), _request()) is None
+    assert enabled.stats()["entries"] == 0
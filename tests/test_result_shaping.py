@@ -0,0 +1,70 @@
+import pytest
+
+from tools import result_shaping
+from tools.result_shaping import ShapingProfile, estimate_tokens, shape_result
+
+
+def _articles(count: int) -> list:
+    return [
+        {
+            "title": f"Story {i}",
+            "description": "A description of the story. " * 4,
+            "url": f"https://news.example/{i}",
+            "alternate_sources": [f"Outlet {n}" for n in range(10)],
+            "author": "Reporter",
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def profile(monkeypatch):
+    def register(**options) -> ShapingProfile:
+        profile = ShapingProfile(**options)
+        monkeypatch.setitem(result_shaping.PROFILES, ("test_tool", "*"), profile)
+        return profile
+
+    return register
+
+
+def test_projects_fields_and_records(profile):
+    profile(fields=["topic"], items_key="articles", item_fields=["title", "url"], max_tokens=10_000)
+    result = {"status": "success", "topic": "climate", "total_results": 3, "articles": _articles(2)}
+    shaped = shape_result("test_tool", result)
+    assert shaped == {
+        "status": "success",
+        "topic": "climate",
+        "articles": [{"title": "Story 0", "url": "https://news.example/0"}, {"title": "Story 1", "url": "https://news.example/1"}],
+    }
+    assert len(result["articles"][0]) == 5  # The tool's own result is left alone
+
+
+def test_trims_fields_lowest_priority_first(profile):
+    result = {"status": "success", "articles": _articles(3)}
+    without_sources = {"status": "success", "articles": [
+        {key: value for key, value in article.items() if key != "alternate_sources"} for article in _articles(3)
+    ]}
+    profile(items_key="articles", trim_order=["alternate_sources", "description"], max_tokens=estimate_tokens(without_sources))
+    shaped = shape_result("test_tool", result)
+    assert shaped == without_sources  # Fits once alternate_sources is gone, so description stays
+
+
+def test_drops_trailing_records_to_fit_the_budget(profile):
+    profile(items_key="articles", item_fields=["title", "url"], max_tokens=50)
+    shaped = shape_result("test_tool", {"status": "success", "articles": _articles(10)})
+    assert estimate_tokens(shaped) <= 50
+    assert [article["title"] for article in shaped["articles"]] == ["Story 0", "Story 1"]
+    assert shaped["items_dropped_for_budget"] == 8
+
+
+def test_keeps_at_least_one_record(profile):
+    profile(items_key="articles", max_tokens=1, max_string_chars=20)
+    shaped = shape_result("test_tool", {"status": "success", "articles": _articles(3)})
+    assert len(shaped["articles"]) == 1
+    assert shaped["articles"][0]["description"].endswith("...")  # Long strings were truncated first
+
+
+def test_errors_are_returned_unchanged(profile):
+    profile(fields=["topic"], max_tokens=1)
+    error = {"status": "error", "error_message": "News API key not found.", "topic": "climate", "hint": "set NEWS_API_KEY"}
+    assert shape_result("test_tool", error) is error
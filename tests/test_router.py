@@ -0,0 +1,22 @@
+import pytest
+
+from host_agent.router import ROUTER_TRAINING_DATA, IntentModel, IntentRouter, read_examples
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter(IntentModel.train(list(read_examples(ROUTER_TRAINING_DATA))))
+
+
+def test_single_intent_is_routed(router):
+    assert router.classify("What's the weather in Paris?")["agent"] == "weather_agent_v1"
+
+
+@pytest.mark.parametrize("text", [
+    "Weather in London, and write a post about climate news",
+    "Tell me a joke and show me the weather in Rome",
+])
+def test_multi_intent_falls_back_to_the_coordinator(router, text):
+    decision = router.classify(text)
+    assert decision["agent"] is None
+    assert decision["source"] == "fallback"
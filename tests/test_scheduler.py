@@ -0,0 +1,109 @@
+import asyncio
+import http.server
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from tools import generate_image as generate_image_module
+from tools import http_client
+from tools.scheduler import BATCH, INTERACTIVE, RateLimitExceeded, UpstreamLimits, UpstreamScheduler
+
+
+def test_interactive_waiters_are_served_before_batch():
+    scheduler = UpstreamScheduler({"upstream": UpstreamLimits(rate=1000, burst=1000, max_concurrency=1)})
+    order = []
+
+    async def call(label, priority):
+        await scheduler.acquire_async("upstream", priority)
+        order.append(label)
+        scheduler.release("upstream")
+
+    async def main():
+        await scheduler.acquire_async("upstream", BATCH)  # Holds the only slot
+        tasks = [asyncio.create_task(call(f"batch{i}", BATCH)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(call("interactive", INTERACTIVE)))
+        await asyncio.sleep(0.01)
+        scheduler.release("upstream")
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["interactive", "batch0", "batch1", "batch2"]
+
+
+def test_penalize_pauses_for_retry_after():
+    scheduler = UpstreamScheduler({"upstream": UpstreamLimits(rate=1000, burst=10, max_concurrency=10)})
+    scheduler.penalize("upstream", 0.2)
+    waited = scheduler.acquire("upstream")
+    scheduler.release("upstream")
+    assert 0.15 <= waited < 1.0
+    assert scheduler.stats()["upstream"]["penalties"] == 1
+
+
+def test_penalize_keeps_a_daily_quota():
+    # newsapi-style bucket: a day of quota, refilled at the daily rate
+    scheduler = UpstreamScheduler({"newsapi": UpstreamLimits(rate=100 / 86400, burst=100, max_concurrency=4, max_wait=10)})
+    scheduler.penalize("newsapi", 0.1)
+    time.sleep(0.15)
+    assert scheduler.acquire("newsapi") < 0.05
+    scheduler.release("newsapi")
+    assert scheduler.stats()["newsapi"]["tokens"] >= 98
+
+
+def test_retry_after_longer_than_max_wait_is_rejected():
+    scheduler = UpstreamScheduler({"upstream": UpstreamLimits(rate=1000, burst=10, max_concurrency=10, max_wait=1)})
+    scheduler.penalize("upstream", 30)
+    with pytest.raises(RateLimitExceeded):
+        scheduler.acquire("upstream")
+
+
+class _TooManyRequests(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(429)
+        self.send_header("Retry-After", "30")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_http_client_pauses_for_the_full_retry_after(monkeypatch):
+    penalties = []
+    monkeypatch.setattr(http_client, "penalize", lambda name, seconds: penalties.append((name, seconds)))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _TooManyRequests)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        response = http_client.get(f"http://127.0.0.1:{server.server_address[1]}/", upstream="upstream", retry=False)
+        assert response.status_code == 429
+    finally:
+        server.shutdown()
+        server.server_close()
+    # Longer than HTTP_BACKOFF_MAX, which only caps this caller's own retry delay
+    assert penalties == [("upstream", 30.0)]
+
+
+class _OpenAIRateLimit(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after": "45"})
+
+
+def test_image_rate_limit_pauses_where_it_is_handled(monkeypatch):
+    penalties = []
+    monkeypatch.setattr(generate_image_module, "penalize", lambda name, seconds: penalties.append((name, seconds)))
+    assert generate_image_module._friendly_error_message(_OpenAIRateLimit("Rate limit reached")) == (
+        "Rate limit exceeded. Please try again in a moment."
+    )
+    assert penalties == []  # Formatting a message has no side effects
+
+    def raise_rate_limit(**kwargs):
+        raise _OpenAIRateLimit("Rate limit reached")
+
+    client = SimpleNamespace(images=SimpleNamespace(generate=raise_rate_limit))
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(http_client, "get_openai_client", lambda api_key: client)
+    result = generate_image_module.generate_image("a lighthouse at dusk", force_new=True)
+    assert result["status"] == "error"
+    assert penalties == [("openai_images", 45.0)]
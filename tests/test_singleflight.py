@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+from tools.singleflight import SingleFlight
+
+
+def test_followers_share_one_call_and_get_copies():
+    group = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"status": "success", "items": [1]}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.do("key", fetch))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while group.stats()["coalesced"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"status": "success", "items": [1]}] * 3
+    assert len({id(result) for result in results}) == 3
+    results[0]["items"].append(2)
+    assert results[1]["items"] == [1]
+
+
+def test_follower_retries_when_the_leader_is_cancelled():
+    group = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(3600)
+        return "fresh result"
+
+    async def main():
+        leader = asyncio.create_task(group.do_async("key", fetch))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(group.do_async("key", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "fresh result"
+    assert len(calls) == 2
+    assert group.stats()["upstream_calls"] == 2
+    assert group.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_caller():
+    group = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(group.do_async("key", fail) for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert group.stats()["upstream_calls"] == 1
+
+
+def test_shared_results_are_marked_for_every_caller():
+    group = SingleFlight("test", mark_shared=True)
+    release = threading.Event()
+
+    def render():
+        release.wait(5)
+        return {"status": "success", "image_id": "abc"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.do("key", render))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while group.stats()["coalesced"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [{"status": "success", "image_id": "abc", "coalesced": True}] * 2
+    # A call nobody joined isn't marked
+    assert group.do("key", render) == {"status": "success", "image_id": "abc"}
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from tools import template_answers
+from tools.template_answers import TEMPLATE_STATE_KEY, answer_from_template, match_weather
+
+
+@pytest.mark.parametrize("text, city", [
+    ("What's the weather in Paris?", "Paris"),
+    ("weather nyc", "New York"),
+    ("temperature in tokyo right now", "Tokyo"),
+])
+def test_known_places_are_templated(text, city):
+    assert match_weather(text) == {"city": city}
+
+
+@pytest.mark.parametrize("text", [
+    "what's the weather like in Paris compared to London",
+    "temperature of the sun",
+    "weather in Narnia",
+    "temperature in Tokio right now",
+    "weather at home",
+])
+def test_unknown_or_guessed_places_go_to_the_model(text):
+    assert match_weather(text) is None
+
+
+def _context(state):
+    return SimpleNamespace(state=state, agent_name="weather_agent_v1", invocation_id="turn-1", user_content=None)
+
+
+def _tool_result(result):
+    response = types.FunctionResponse(name="get_weather", response=result)
+    return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(function_response=response)])])
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(template_answers, "TEMPLATE_ANSWERS_ENABLED", True)
+
+
+def test_report_is_rendered(enabled):
+    state = {TEMPLATE_STATE_KEY: {"agent": "weather_agent_v1", "tool": "get_weather"}}
+    report = "Current conditions in Paris: overcast, 13.7°C."
+    response = answer_from_template(_context(state), _tool_result({"status": "success", "report": report}))
+    assert response.content.parts[0].text == report
+    assert state[TEMPLATE_STATE_KEY] is None
+
+
+def test_error_result_goes_to_the_model(enabled):
+    state = {TEMPLATE_STATE_KEY: {"agent": "weather_agent_v1", "tool": "get_weather"}}
+    result = {"status": "error", "error_message": "Weather data is temporarily unavailable."}
+    assert answer_from_template(_context(state), _tool_result(result)) is None
+    assert state[TEMPLATE_STATE_KEY] is None
@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.stand_in_server import StandInServer
+from tools.weather_providers import OpenMeteoProvider, WeatherProvider, current_weather
+
+PARIS = {"name": "Paris", "country": "FR", "latitude": 48.8566, "longitude": 2.3522}
+
+
+@pytest.fixture
+def stand_in():
+    server = StandInServer(delay=0).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_provider_interface_is_abstract():
+    with pytest.raises(TypeError):
+        WeatherProvider()
+
+
+def test_open_meteo_observation(stand_in):
+    provider = OpenMeteoProvider(base_url=f"{stand_in.base_url}/v1/forecast")
+    # The stand-in derives the weather from the coordinates
+    assert provider.observe(PARIS) == {"temperature_c": 13.7, "conditions": "overcast", "weather_code": 3}
+    assert stand_in.hits["/v1/forecast"] == 1
+
+
+def test_open_meteo_upstream_error_raises(stand_in):
+    provider = OpenMeteoProvider(base_url=f"{stand_in.base_url}/v1/missing")
+    with pytest.raises(Exception):
+        provider.observe(PARIS)
+
+
+def test_nearby_places_share_one_call(stand_in):
+    provider = OpenMeteoProvider(base_url=f"{stand_in.base_url}/v1/forecast")
+    louvre = {"name": "Louvre", "country": "FR", "latitude": 48.8606, "longitude": 2.3376}
+    first = current_weather(PARIS, provider)
+    assert current_weather(louvre, provider) == first
+    assert stand_in.hits["/v1/forecast"] == 1
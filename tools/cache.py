@@ -0,0 +1,252 @@
+"""
+Tool Result Cache
+Shared caching layer for the ADK tools with per-tool policies: TTL, LRU
+eviction, argument key normalization and stale-while-revalidate refreshes.
+"""
+
+from typing import Any, Callable, Dict, Hashable, Optional
+from collections import OrderedDict
+import asyncio
+import copy
+import functools
+import inspect
+import threading
+import time
+
+# Registry of every cache created through @cached_tool, keyed by policy name
+_caches: Dict[str, "ToolCache"] = {}
+
+
+class CachePolicy:
+    """Caching policy for a single tool.
+
+    Args:
+        name (str): Name used in stats output (usually the tool name).
+        ttl (float): Seconds an entry is considered fresh.
+        max_entries (int): Maximum number of entries before LRU eviction.
+        stale_ttl (float): Extra seconds a stale entry may still be served while
+                           a background refresh runs. 0 disables stale-while-revalidate.
+        normalize (Callable, optional): Receives the bound call arguments as a dict
+                                        and returns the dict used to build the key.
+        cache_if (Callable, optional): Receives a tool result and returns True if it
+                                       may be cached. Defaults to successful results only.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float = 300.0,
+        max_entries: int = 256,
+        stale_ttl: float = 0.0,
+        normalize: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.normalize = normalize
+        self.cache_if = cache_if or _is_success
+
+
+def _is_success(result: Any) -> bool:
+    """Only cache results the tool reported as successful."""
+    return isinstance(result, dict) and result.get("status") == "success"
+
+
+def make_key(signature: inspect.Signature, normalize: Optional[Callable], args: tuple, kwargs: dict) -> Hashable:
+    """Builds a hashable cache key from call arguments (defaults applied)."""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+    if normalize is not None:
+        arguments = normalize(arguments)
+    return tuple(sorted((name, repr(value)) for name, value in arguments.items()))
+
+
+class ToolCache:
+    """Thread-safe LRU cache with TTL and stale-while-revalidate support."""
+
+    def __init__(self, policy: CachePolicy):
+        self.policy = policy
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (stored_at, value)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    def lookup(self, key: Hashable) -> tuple:
+        """Returns (state, value) where state is 'fresh', 'stale' or 'miss'."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return "miss", None
+
+            stored_at, value = entry
+            age = now - stored_at
+            if age <= self.policy.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return "fresh", copy.deepcopy(value)
+
+            if age <= self.policy.ttl + self.policy.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return "stale", copy.deepcopy(value)
+
+            # Expired beyond the stale window
+            del self._entries[key]
+            self.misses += 1
+            return "miss", None
+
+    def store(self, key: Hashable, value: Any) -> None:
+        """Stores a result if the policy allows it, evicting LRU entries as needed."""
+        if not self.policy.cache_if(value):
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.policy.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def begin_refresh(self, key: Hashable) -> bool:
+        """Marks a key as refreshing. Returns False if a refresh is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def end_refresh(self, key: Hashable) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+def cached_tool(policy: CachePolicy) -> Callable:
+    """Decorator that caches a tool's results according to `policy`.
+
+    The wrapped function keeps its name, docstring and signature so ADK builds
+    the same tool declaration. The cache is available as `func.cache`. Coroutine
+    functions are supported, and a sync and an async variant of the same tool
+    share entries when they use the same policy name.
+
+    Example:
+        >>> @cached_tool(CachePolicy("get_weather", ttl=600))
+        ... def get_weather(city: str) -> Dict[str, Any]:
+        ...     ...
+    """
+    def decorator(func: Callable) -> Callable:
+        cache = _caches.setdefault(policy.name, ToolCache(policy))
+        signature = inspect.signature(func)
+
+        if inspect.iscoroutinefunction(func):
+            return _async_wrapper(func, cache, signature)
+
+        def refresh(key: Hashable, args: tuple, kwargs: dict) -> None:
+            try:
+                cache.store(key, func(*args, **kwargs))
+            except Exception as e:
+                print(f"Warning: background refresh for {policy.name} failed: {e}")
+            finally:
+                cache.end_refresh(key)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = make_key(signature, policy.normalize, args, kwargs)
+            except TypeError:
+                # Let the tool report bad arguments itself
+                return func(*args, **kwargs)
+
+            state, value = cache.lookup(key)
+            if state == "fresh":
+                return value
+            if state == "stale":
+                if cache.begin_refresh(key):
+                    threading.Thread(target=refresh, args=(key, args, kwargs), daemon=True).start()
+                return value
+
+            result = func(*args, **kwargs)
+            cache.store(key, result)
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+# Strong references to in-flight background refresh tasks so they aren't garbage collected
+_refresh_tasks = set()
+
+
+def _async_wrapper(func: Callable, cache: ToolCache, signature: inspect.Signature) -> Callable:
+    """Builds the caching wrapper for a coroutine function tool."""
+    policy = cache.policy
+
+    async def refresh(key: Hashable, args: tuple, kwargs: dict) -> None:
+        try:
+            cache.store(key, await func(*args, **kwargs))
+        except Exception as e:
+            print(f"Warning: background refresh for {policy.name} failed: {e}")
+        finally:
+            cache.end_refresh(key)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            key = make_key(signature, policy.normalize, args, kwargs)
+        except TypeError:
+            return await func(*args, **kwargs)
+
+        state, value = cache.lookup(key)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            if cache.begin_refresh(key):
+                task = asyncio.get_running_loop().create_task(refresh(key, args, kwargs))
+                _refresh_tasks.add(task)
+                task.add_done_callback(_refresh_tasks.discard)
+            return value
+
+        result = await func(*args, **kwargs)
+        cache.store(key, result)
+        return result
+
+    wrapper.cache = cache
+    return wrapper
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns hit/miss/eviction counters for every registered tool cache."""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def clear_caches() -> None:
+    """Empties every registered tool cache."""
+    for cache in _caches.values():
+        cache.clear()
@@ -0,0 +1,171 @@
+"""
+Streaming File Downloads
+Downloads files in fixed-size chunks to a temp file next to the destination,
+hashing with SHA-256 as bytes arrive, then fsyncs and atomically renames it
+into place. Memory use per download is one chunk regardless of file size,
+and a failed or interrupted download never leaves a partial file behind.
+"""
+
+from typing import Any, Dict, Optional
+from collections import deque
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from tools import http_client
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(64 * 1024)))
+DOWNLOAD_SAMPLES = 500
+
+_lock = threading.Lock()
+_counters = {"downloads": 0, "failures": 0, "bytes": 0, "seconds": 0.0}
+_recent: deque = deque(maxlen=DOWNLOAD_SAMPLES)
+
+
+class ChecksumMismatch(ValueError):
+    """Raised when a downloaded file doesn't match the expected SHA-256."""
+
+
+def _open_temp(path: str):
+    """Creates the temp file in the destination directory so the rename is atomic."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+    return os.fdopen(fd, "wb"), temp_path
+
+
+def _commit(handle, temp_path: str, path: str, digest: str, expected_sha256: Optional[str]) -> None:
+    """Flushes the temp file to disk and renames it over the destination."""
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+    if expected_sha256 and digest != expected_sha256.lower():
+        raise ChecksumMismatch(f"SHA-256 mismatch: expected {expected_sha256}, got {digest}")
+    os.replace(temp_path, path)
+    # Persist the rename itself (directory entry); not supported on every platform
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def _discard(handle, temp_path: str) -> None:
+    if not handle.closed:
+        handle.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+def _record(size: int, seconds: float, ok: bool) -> Dict[str, Any]:
+    metrics = {
+        "bytes": size,
+        "seconds": round(seconds, 4),
+        "bytes_per_second": round(size / seconds) if seconds > 0 else None,
+    }
+    with _lock:
+        if ok:
+            _counters["downloads"] += 1
+            _counters["bytes"] += size
+            _counters["seconds"] += seconds
+            _recent.append(metrics)
+        else:
+            _counters["failures"] += 1
+    return metrics
+
+
+def download_to_file(url: str, path: str, expected_sha256: Optional[str] = None, upstream: Optional[str] = None) -> Dict[str, Any]:
+    """Streams `url` into `path` atomically.
+
+    Args:
+        url (str): The URL to download.
+        path (str): Destination file path. Its directory is created if needed.
+        expected_sha256 (str, optional): Reject the file unless its hash matches.
+        upstream (str, optional): Scheduler upstream name for rate limiting.
+
+    Returns:
+        Dict[str, Any]: path, sha256, bytes, seconds and bytes_per_second.
+
+    Raises:
+        requests.exceptions.RequestException: If the request failed.
+        ChecksumMismatch: If expected_sha256 was given and doesn't match.
+    """
+    start = time.perf_counter()
+    handle, temp_path = _open_temp(path)
+    size = 0
+    try:
+        response = http_client.get(url, stream=True, upstream=upstream)
+        try:
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                handle.write(chunk)
+                size += len(chunk)
+        finally:
+            response.close()
+        sha256 = digest.hexdigest()
+        _commit(handle, temp_path, path, sha256, expected_sha256)
+    except BaseException:
+        _discard(handle, temp_path)
+        _record(size, time.perf_counter() - start, ok=False)
+        raise
+
+    metrics = _record(size, time.perf_counter() - start, ok=True)
+    return {"path": path, "sha256": sha256, **metrics}
+
+
+async def async_download_to_file(url: str, path: str, expected_sha256: Optional[str] = None, upstream: Optional[str] = None) -> Dict[str, Any]:
+    """Async counterpart of download_to_file(); disk writes run in worker threads.
+
+    Raises:
+        httpx.HTTPError: If the request failed.
+        ChecksumMismatch: If expected_sha256 was given and doesn't match.
+    """
+    start = time.perf_counter()
+    handle, temp_path = await asyncio.to_thread(_open_temp, path)
+    size = 0
+    try:
+        response = await http_client.async_request("GET", url, stream=True, upstream=upstream)
+        try:
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            async for chunk in response.aiter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                await asyncio.to_thread(handle.write, chunk)
+                size += len(chunk)
+        finally:
+            await response.aclose()
+        sha256 = digest.hexdigest()
+        await asyncio.to_thread(_commit, handle, temp_path, path, sha256, expected_sha256)
+    except BaseException:
+        await asyncio.to_thread(_discard, handle, temp_path)
+        _record(size, time.perf_counter() - start, ok=False)
+        raise
+
+    metrics = _record(size, time.perf_counter() - start, ok=True)
+    return {"path": path, "sha256": sha256, **metrics}
+
+
+def download_stats() -> Dict[str, Any]:
+    """Reports download counts, bytes and per-download duration and throughput."""
+    with _lock:
+        stats = dict(_counters)
+        recent = list(_recent)
+    stats["seconds"] = round(stats["seconds"], 4)
+    stats["avg_bytes_per_second"] = round(stats["bytes"] / stats["seconds"]) if stats["seconds"] else None
+    if recent:
+        durations = sorted(sample["seconds"] for sample in recent)
+        rates = sorted(sample["bytes_per_second"] for sample in recent if sample["bytes_per_second"])
+        stats["p50_seconds"] = durations[int(0.5 * (len(durations) - 1))]
+        stats["p95_seconds"] = durations[int(0.95 * (len(durations) - 1))]
+        stats["p50_bytes_per_second"] = rates[int(0.5 * (len(rates) - 1))] if rates else None
+    return stats
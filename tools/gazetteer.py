@@ -0,0 +1,413 @@
+"""
+City Gazetteer
+Resolves free-form place names ("NYC", "New York City", "Tokio") to places
+with coordinates. The place list is compiled once into a compact binary file
+that is memory-mapped, so it loads instantly and scales to millions of
+entries without holding them as Python objects:
+
+- a sorted key table (normalized names and aliases) searched by bisection
+- a fixed-size place table (name, country, latitude, longitude, population)
+- a trigram index (dense offsets plus postings sorted by key length) for
+  fuzzy matches, verified with edit distance
+
+Usage: python -m tools.gazetteer build [source] [-o data/gazetteer.bin]
+       python -m tools.gazetteer lookup "new yrok"
+
+The source is a TSV of name, country, latitude, longitude, population and
+comma-separated aliases (see data/cities.tsv), or a GeoNames dump such as
+cities15000.txt.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import array
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import unicodedata
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+GAZETTEER_SOURCE = os.getenv("GAZETTEER_SOURCE", os.path.join(_DATA_DIR, "cities.tsv"))
+# Compiled from GAZETTEER_SOURCE on first use, and again whenever the source is newer
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(_DATA_DIR, "gazetteer.bin"))
+
+MAGIC = b"GAZ1"
+NAME, ALIAS = 0, 1
+# Fuzzy lookups count shared trigrams among keys of similar length, then
+# verify this many of the best-scoring candidates with edit distance
+FUZZY_CANDIDATES = 32
+# Candidates must share at least this many of the query's rarest trigrams
+FUZZY_MIN_SHARED = 3
+# Shorter names must match exactly: one edit turns too many common words
+# into cities ("home" -> Rome, "lime" -> Lima)
+FUZZY_MIN_LENGTH = 5
+
+# magic, n_places, n_keys, n_postings, then section offsets:
+# places, keys, key lengths, trigram offsets, postings, strings
+_HEADER = struct.Struct("<4sIIIQQQQQQ")
+_HEADER_SIZE = 64
+_PLACE = struct.Struct("<IH2sffI")  # name offset, name length, country, latitude, longitude, population
+_KEY = struct.Struct("<IHBxI")  # key offset, key length, NAME/ALIAS, place index
+
+_ALPHABET = "$ abcdefghijklmnopqrstuvwxyz0123456789"
+_SYMBOLS = {symbol: code for code, symbol in enumerate(_ALPHABET)}
+TRIGRAM_SLOTS = len(_ALPHABET) ** 3
+
+_ABBREVIATIONS = {"st": "saint", "ste": "sainte", "mt": "mount", "ft": "fort"}
+
+
+def normalize_place_name(name: str) -> str:
+    """Case-folds, strips accents and punctuation and expands common abbreviations."""
+    text = unicodedata.normalize("NFKD", name.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_ABBREVIATIONS.get(token, token) for token in re.findall(r"[a-z0-9]+", text))
+
+
+def _trigrams(key: str) -> set:
+    padded = f"$${key}$"
+    n = len(_ALPHABET)
+    return {
+        (_SYMBOLS[a] * n + _SYMBOLS[b]) * n + _SYMBOLS[c]
+        for a, b, c in zip(padded, padded[1:], padded[2:])
+    }
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count once), capped at limit + 1.
+
+    Only cells within `limit` of the diagonal are computed.
+    """
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    if a == b:
+        return 0
+    previous2, previous = None, [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+def read_places(path: str) -> Iterator[Tuple[str, str, float, float, int, List[str]]]:
+    """Yields (name, country, latitude, longitude, population, aliases) from a TSV or GeoNames file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) >= 15:
+                # GeoNames: name, asciiname, alternatenames, lat, lon, ..., country (8), population (14)
+                aliases = [columns[2]] + columns[3].split(",")
+                yield columns[1], columns[8], float(columns[4]), float(columns[5]), int(columns[14] or 0), aliases
+            else:
+                name, country, latitude, longitude, population = columns[:5]
+                aliases = columns[5].split(",") if len(columns) > 5 and columns[5] else []
+                yield name, country, float(latitude), float(longitude), int(population or 0), aliases
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def build_gazetteer(places: Iterable[Tuple[str, str, float, float, int, List[str]]], path: str) -> Dict[str, int]:
+    """Compiles places into the binary gazetteer format at `path` (written atomically).
+
+    Returns:
+        Dict[str, int]: places, keys, postings and bytes written.
+    """
+    strings = bytearray()
+    place_records = bytearray()
+    keys = []
+    for index, (name, country, latitude, longitude, population, aliases) in enumerate(places):
+        encoded = name.encode("utf-8")
+        place_records += _PLACE.pack(
+            len(strings), len(encoded), country.upper().encode("ascii")[:2].ljust(2), latitude, longitude, population
+        )
+        strings += encoded
+        seen = set()
+        for kind, text in [(NAME, name)] + [(ALIAS, alias) for alias in aliases]:
+            key = normalize_place_name(text)
+            if key and key not in seen:
+                seen.add(key)
+                # Among places sharing a key, the most populous sorts first
+                keys.append((key, -population, kind, index))
+    keys.sort()
+
+    # Key strings are stored once per distinct key; only the first (most
+    # populous) entry of each run of equal keys goes into the trigram index
+    key_records = bytearray()
+    key_lengths = array.array("B")
+    heads = array.array("I")
+    previous, offset = None, 0
+    for key_index, (key, _, kind, place) in enumerate(keys):
+        encoded = key.encode("ascii")
+        if key != previous:
+            offset = len(strings)
+            strings += encoded
+            heads.append(key_index)
+            previous = key
+        key_records += _KEY.pack(offset, len(encoded), kind, place)
+        key_lengths.append(min(len(encoded), 255))
+
+    # Counting sort of (trigram, key) pairs: count per trigram, then fill.
+    # Visiting keys shortest first leaves each trigram's postings sorted by
+    # key length, so lookups only scan keys of about the query's length.
+    heads = sorted(heads, key=lambda key_index: key_lengths[key_index])
+    counts = array.array("I", bytes(4 * (TRIGRAM_SLOTS + 1)))
+    codes = array.array("I")
+    code_counts = array.array("I")
+    for key_index in heads:
+        trigrams = _trigrams(keys[key_index][0])
+        codes.extend(trigrams)
+        code_counts.append(len(trigrams))
+        for code in trigrams:
+            counts[code + 1] += 1
+    for code in range(1, TRIGRAM_SLOTS + 1):
+        counts[code] += counts[code - 1]
+    postings = array.array("I", bytes(4 * len(codes)))
+    cursor = array.array("I", counts[:-1])
+    position = 0
+    for key_index, count in zip(heads, code_counts):
+        for code in codes[position:position + count]:
+            postings[cursor[code]] = key_index
+            cursor[code] += 1
+        position += count
+
+    sections = [place_records, key_records, key_lengths, _le(counts), _le(postings), strings]
+    offsets, end = [], _HEADER_SIZE
+    for section in sections:
+        end = _align(end)
+        offsets.append(end)
+        end += len(section)
+    header = _HEADER.pack(MAGIC, len(place_records) // _PLACE.size, len(keys), len(postings), *offsets)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.ljust(_HEADER_SIZE, b"\0"))
+            for offset, section in zip(offsets, sections):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(section)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return {"places": len(place_records) // _PLACE.size, "keys": len(keys), "postings": len(postings), "bytes": end}
+
+
+def _le(values: array.array) -> bytes:
+    """uint32 array as little-endian bytes (the on-disk byte order)."""
+    if sys.byteorder != "little":
+        values = array.array("I", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class Gazetteer:
+    """Read-only view of a compiled gazetteer file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n_places, self.n_keys, n_postings, *offsets = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer file")
+        self._places_off, self._keys_off, lengths_off, trigrams_off, postings_off, self._strings_off = offsets
+        self._key_lengths = memoryview(self._mm)[lengths_off:lengths_off + self.n_keys]
+        self._trigram_offsets = self._uint32(trigrams_off, TRIGRAM_SLOTS + 1)
+        self._postings = self._uint32(postings_off, n_postings)
+
+    def _uint32(self, offset: int, count: int):
+        view = memoryview(self._mm)[offset:offset + 4 * count]
+        if sys.byteorder == "little":
+            return view.cast("I")
+        values = array.array("I", view)
+        values.byteswap()
+        return values
+
+    def _key(self, index: int) -> Tuple[str, int, int]:
+        """Returns (key, kind, place index) of a key table entry."""
+        offset, length, kind, place = _KEY.unpack_from(self._mm, self._keys_off + index * _KEY.size)
+        start = self._strings_off + offset
+        return self._mm[start:start + length].decode("ascii"), kind, place
+
+    def _find(self, key: str) -> Optional[int]:
+        """Index of the first key table entry equal to key, by bisection."""
+        low, high = 0, self.n_keys
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.n_keys and self._key(low)[0] == key:
+            return low
+        return None
+
+    def place(self, index: int) -> Dict[str, Any]:
+        name_offset, name_length, country, latitude, longitude, population = _PLACE.unpack_from(
+            self._mm, self._places_off + index * _PLACE.size
+        )
+        start = self._strings_off + name_offset
+        return {
+            "name": self._mm[start:start + name_length].decode("utf-8"),
+            "country": country.decode("ascii").strip(),
+            "latitude": round(latitude, 4),
+            "longitude": round(longitude, 4),
+            "population": population,
+        }
+
+    def _bisect_length(self, low: int, high: int, length: int) -> int:
+        """First position in postings[low:high] whose key is at least `length` long."""
+        postings, key_lengths = self._postings, self._key_lengths
+        while low < high:
+            middle = (low + high) // 2
+            if key_lengths[postings[middle]] < length:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _population(self, place: int) -> int:
+        return _PLACE.unpack_from(self._mm, self._places_off + place * _PLACE.size)[5]
+
+    def _fuzzy(self, key: str) -> Optional[Tuple[int, int]]:
+        """Returns (key index, distance) of the closest key within the typo budget.
+
+        Single typos are tried first; the wider budget is only searched when
+        no key is one edit away.
+        """
+        if len(key) < FUZZY_MIN_LENGTH:
+            return None
+        limit = 1 if len(key) <= 5 else 2 if len(key) <= 10 else 3
+        trigrams = _trigrams(key)
+        for budget in sorted({1, limit}):
+            found = self._fuzzy_within(key, trigrams, budget)
+            if found is not None:
+                return found
+        return None
+
+    def _fuzzy_within(self, key: str, trigrams: set, limit: int) -> Optional[Tuple[int, int]]:
+        offsets, postings = self._trigram_offsets, self._postings
+        windows = []
+        for code in trigrams:
+            start, end = offsets[code], offsets[code + 1]
+            start = self._bisect_length(start, end, len(key) - limit)
+            end = self._bisect_length(start, end, len(key) + limit + 1)
+            windows.append((end - start, start, end))
+        # An edit changes at most four trigrams (three, or four for a swap), so
+        # a key within `limit` edits shares at least FUZZY_MIN_SHARED of any
+        # 4 * limit + FUZZY_MIN_SHARED query trigrams: only the rarest (shortest
+        # postings) need scanning
+        windows.sort()
+        scanned = windows[:4 * limit + FUZZY_MIN_SHARED]
+        shared = Counter()
+        for _, start, end in scanned:
+            shared.update(postings[start:end])
+        min_shared = max(1, len(scanned) - 4 * limit)
+        candidates = [index for index, count in shared.items() if count >= min_shared]
+        best, best_rank = None, None
+        for index in heapq.nlargest(FUZZY_CANDIDATES, candidates, key=shared.__getitem__):
+            candidate, _, place = self._key(index)
+            distance = _edit_distance(key, candidate, limit)
+            if distance > limit:
+                continue
+            rank = (distance, -self._population(place))
+            if best_rank is None or rank < best_rank:
+                best, best_rank = (index, distance), rank
+        return best
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """Resolves a place name, alias or misspelling.
+
+        Returns:
+            Optional[Dict[str, Any]]: name, country, latitude, longitude and
+            population of the place, its 'id' (index in the compiled file),
+            'match' ('exact', 'alias' or 'fuzzy'), the 'matched' key and the
+            edit 'distance'; None if nothing is close enough.
+        """
+        key = normalize_place_name(query)
+        if not key:
+            return None
+        index, distance = self._find(key), 0
+        if index is None:
+            found = self._fuzzy(key)
+            if found is None:
+                return None
+            index, distance = found
+        matched, kind, place = self._key(index)
+        result = self.place(place)
+        result.update(
+            id=place,
+            match="fuzzy" if distance else "exact" if kind == NAME else "alias",
+            matched=matched,
+            distance=distance,
+        )
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "places": self.n_places, "keys": self.n_keys, "bytes": len(self._mm)}
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Returns the process-wide gazetteer, compiling GAZETTEER_SOURCE if needed."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                stale = not os.path.exists(GAZETTEER_PATH) or (
+                    os.path.exists(GAZETTEER_SOURCE)
+                    and os.path.getmtime(GAZETTEER_SOURCE) > os.path.getmtime(GAZETTEER_PATH)
+                )
+                if stale:
+                    build_gazetteer(read_places(GAZETTEER_SOURCE), GAZETTEER_PATH)
+                _gazetteer = Gazetteer(GAZETTEER_PATH)
+    return _gazetteer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the city gazetteer.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="Compile a TSV or GeoNames file")
+    build.add_argument("source", nargs="?", default=GAZETTEER_SOURCE)
+    build.add_argument("-o", "--output", default=GAZETTEER_PATH)
+    lookup = subcommands.add_parser("lookup", help="Resolve a place name")
+    lookup.add_argument("query")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(json.dumps(build_gazetteer(read_places(args.source), args.output), indent=2))
+    else:
+        print(json.dumps(get_gazetteer().lookup(args.query), indent=2, ensure_ascii=False))
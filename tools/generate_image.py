@@ -1,19 +1,48 @@
 # @title Define the generate_image Tool
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
 import json
 import os
-import requests
-import datetime
 from dotenv import load_dotenv
+from tools import http_client
+from tools import image_cache
+from tools import image_server
+from tools import image_store
+from tools.downloads import async_download_to_file, download_to_file
+from tools.scheduler import RateLimitExceeded, penalize, slot, slot_async
+from tools.singleflight import single_flight
 
 # Load environment variables
 load_dotenv()
 
-def generate_image(prompt: str, size: str = "1024x1024", quality: str = "standard") -> Dict[str, Any]:
+VALID_SIZES = ["1024x1024", "1792x1024", "1024x1792"]
+VALID_QUALITIES = ["standard", "hd"]
+
+# Limits for generate_images: images per call and renders in flight per call
+IMAGE_VARIATIONS_MAX = int(os.getenv("IMAGE_VARIATIONS_MAX", "8"))
+IMAGE_VARIATIONS_CONCURRENCY = int(os.getenv("IMAGE_VARIATIONS_CONCURRENCY", "4"))
+
+
+def _normalize_image_args(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Treats prompts that differ only in surrounding or repeated whitespace as identical."""
+    prompt = arguments.get("prompt")
+    if isinstance(prompt, str):
+        prompt = " ".join(prompt.split())
+    return {
+        "prompt": prompt,
+        "size": arguments.get("size"),
+        "quality": arguments.get("quality"),
+        "force_new": bool(arguments.get("force_new")),
+    }
+
+@single_flight("generate_image", normalize=_normalize_image_args, mark_shared=True)
+def generate_image(prompt: str, size: str = "1024x1024", quality: str = "standard", force_new: bool = False) -> Dict[str, Any]:
     """Generates an image using OpenAI's DALL-E API.
     
     This tool creates images based on text descriptions using OpenAI's DALL-E model
     and returns a structured response that can be processed by the ADK framework.
+    Identical or near-identical earlier requests are answered from the local
+    render cache without calling DALL-E.
     
     Args:
         prompt (str): A detailed description of the image to generate.
@@ -22,6 +51,7 @@ def generate_image(prompt: str, size: str = "1024x1024", quality: str = "standar
                    Defaults to "1024x1024".
         quality (str): The quality of the image. Options: "standard", "hd".
                       Defaults to "standard".
+        force_new (bool): Render a new image even if a cached one matches. Defaults to False.
     
     Returns:
         Dict[str, Any]: A dictionary containing the image generation result with the following structure:
@@ -31,14 +61,21 @@ def generate_image(prompt: str, size: str = "1024x1024", quality: str = "standar
             - prompt (str): The original prompt used
             - size (str): The size of the generated image
             - quality (str): The quality setting used
+            - sha256 (str, optional): Checksum of the downloaded file
+            - image_id (str, optional): Id of the image in the image store (tools/image_store.py)
+            - image_link (str, optional): URL of the image on the image server when IMAGE_SERVER_URL is set
             - error_message (str, optional): Error description when status is 'error'
+            - cache_hit (bool, optional): True when an earlier render was reused
+            - cache_match (str, optional): 'exact' or 'similar' on a cache hit
+            - cached_prompt (str, optional): The prompt that produced the reused image
+            - coalesced (bool, optional): True when a concurrent identical call received the same image
     
     Example:
         >>> generate_image("A futuristic city with flying cars", "1024x1024", "standard")
         {
             'status': 'success',
             'image_url': 'https://oaidalleapiprodscus.blob.core.windows.net/...',
-            'local_path': '/Users/joshua/Desktop/agents/social_agent/generated_images/futuristic_city_20240119_143022.png',
+            'local_path': '/Users/joshua/Desktop/agents/social_agent/generated_images/3f/9c/3f9c2a71...png',
             'prompt': 'A futuristic city with flying cars',
             'size': '1024x1024',
             'quality': 'standard'
@@ -46,153 +83,374 @@ def generate_image(prompt: str, size: str = "1024x1024", quality: str = "standar
     """
     print(f"--- Tool: generate_image called with prompt: {prompt[:50]}... ---")  # Log tool execution
     
-    # Input validation
-    if not prompt or not isinstance(prompt, str):
-        return {
-            "status": "error",
-            "error_message": "Invalid prompt provided. Please provide a valid text description.",
-            "prompt": prompt,
-            "size": size,
-            "quality": quality
-        }
+    error, api_key = _validate_request(prompt, size, quality)
+    if error:
+        return error
     
-    if prompt.strip() == "":
-        return {
-            "status": "error",
-            "error_message": "Empty prompt provided. Please provide a descriptive text for image generation.",
-            "prompt": prompt,
-            "size": size,
-            "quality": quality
-        }
-    
-    # Validate size parameter
-    valid_sizes = ["1024x1024", "1792x1024", "1024x1792"]
-    if size not in valid_sizes:
-        return {
-            "status": "error",
-            "error_message": f"Invalid size '{size}'. Valid options: {', '.join(valid_sizes)}",
-            "prompt": prompt,
-            "size": size,
-            "quality": quality
-        }
-    
-    # Validate quality parameter
-    valid_qualities = ["standard", "hd"]
-    if quality not in valid_qualities:
-        return {
-            "status": "error",
-            "error_message": f"Invalid quality '{quality}'. Valid options: {', '.join(valid_qualities)}",
-            "prompt": prompt,
-            "size": size,
-            "quality": quality
-        }
-    
-    # Check for OpenAI API key
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return {
-            "status": "error",
-            "error_message": "OpenAI API key not found. Please set OPENAI_API_KEY environment variable.",
-            "prompt": prompt,
-            "size": size,
-            "quality": quality
-        }
+    cache = image_cache.get_image_cache()
+    if cache is not None and not force_new:
+        cached = _lookup_cached(cache, prompt, size, quality)
+        if cached:
+            return _cached_result(cached, prompt, size, quality)
     
     try:
-        # Try to import OpenAI client
+        # Reuse the process-wide OpenAI client and its connection pool
         try:
-            from openai import OpenAI
+            client = http_client.get_openai_client(api_key)
         except ImportError:
-            return {
-                "status": "error",
-                "error_message": "OpenAI library not installed. Please install it with: pip install openai",
-                "prompt": prompt,
-                "size": size,
-                "quality": quality
-            }
+            return _error_result("OpenAI library not installed. Please install it with: pip install openai", prompt, size, quality)
         
-        # Initialize OpenAI client
-        client = OpenAI(api_key=api_key)
-        
-        # Generate image using DALL-E
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size=size,
-            quality=quality,
-            n=1
-        )
+        # Generate image using DALL-E, within the shared OpenAI images rate limit
+        with slot("openai_images"):
+            response = client.images.generate(
+                model="dall-e-3",
+                prompt=prompt,
+                size=size,
+                quality=quality,
+                n=1
+            )
         
         # Extract image URL from response
         image_url = response.data[0].url
         
         # Download image locally
         try:
-            # Create a safe filename based on prompt and timestamp
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            # Clean prompt for filename (remove special characters)
-            safe_prompt = "".join(c for c in prompt[:30] if c.isalnum() or c in (' ', '_')).rstrip()
-            safe_prompt = safe_prompt.replace(' ', '_').lower()
-            filename = f"{safe_prompt}_{timestamp}.png"
-            
-            # Ensure the directory exists
-            images_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "generated_images")
-            os.makedirs(images_dir, exist_ok=True)
+            store = image_store.get_image_store()
             
-            local_path = os.path.join(images_dir, filename)
-            
-            # Download the image
-            image_response = requests.get(image_url)
-            image_response.raise_for_status()
-            
-            with open(local_path, 'wb') as f:
-                f.write(image_response.content)
+            # Stream the image to disk; a failed download leaves no partial file
+            download = download_to_file(image_url, store.incoming_path(), upstream="image_download")
+            entry = store.add(download["path"], prompt, size, quality, download["sha256"])
+            local_path = entry["path"]
             
             print(f"Image downloaded to: {local_path}")
             
-            return {
-                "status": "success",
-                "image_url": image_url,
-                "local_path": local_path,
-                "prompt": prompt,
-                "size": size,
-                "quality": quality
-            }
+            if cache is not None:
+                cache.store(prompt, size, quality, image_url, local_path)
+            return _success_result(image_url, local_path, prompt, size, quality, entry)
             
         except Exception as download_error:
             # If download fails, still return the URL
             print(f"Warning: Failed to download image locally: {download_error}")
-            return {
-                "status": "success",
-                "image_url": image_url,
-                "local_path": None,
-                "download_error": str(download_error),
-                "prompt": prompt,
-                "size": size,
-                "quality": quality
-            }
+            return _download_failed_result(image_url, download_error, prompt, size, quality)
         
     except Exception as e:
         # Handle any errors during image generation
-        error_message = str(e)
-        
-        # Provide more user-friendly error messages for common issues
-        if "API key" in error_message.lower():
-            error_message = "Invalid OpenAI API key. Please check your OPENAI_API_KEY environment variable."
-        elif "content policy" in error_message.lower():
-            error_message = "The prompt violates OpenAI's content policy. Please try a different description."
-        elif "rate limit" in error_message.lower():
-            error_message = "Rate limit exceeded. Please try again in a moment."
-        elif "insufficient" in error_message.lower() and "quota" in error_message.lower():
-            error_message = "OpenAI account quota exceeded. Please check your OpenAI account billing."
-        
+        _penalize_if_rate_limited(e)
+        return _error_result(f"Image generation failed: {_friendly_error_message(e)}", prompt, size, quality)
+
+@single_flight("generate_image", normalize=_normalize_image_args, mark_shared=True)
+async def generate_image_async(prompt: str, size: str = "1024x1024", quality: str = "standard", force_new: bool = False) -> Dict[str, Any]:
+    """Generates an image using OpenAI's DALL-E API without blocking the event loop.
+    
+    Async variant of generate_image for agents running on the ADK event loop. It
+    uses AsyncOpenAI and the pooled async HTTP client, so other sessions keep
+    running during the 10-20 second render and the download.
+    
+    Args:
+        prompt (str): A detailed description of the image to generate.
+        size (str): The size of the image. Options: "1024x1024", "1792x1024", "1024x1792".
+                   Defaults to "1024x1024".
+        quality (str): The quality of the image. Options: "standard", "hd".
+                      Defaults to "standard".
+        force_new (bool): Render a new image even if a cached one matches. Defaults to False.
+    
+    Returns:
+        Dict[str, Any]: The same structure returned by generate_image.
+    """
+    print(f"--- Tool: generate_image_async called with prompt: {prompt[:50]}... ---")  # Log tool execution
+    
+    return await _generate_image_async(prompt, size, quality, force_new)
+
+async def generate_images(
+    prompts: Optional[List[str]] = None,
+    prompt: Optional[str] = None,
+    n: int = 1,
+    size: str = "1024x1024",
+    quality: str = "standard",
+    force_new: bool = False,
+) -> Dict[str, Any]:
+    """Generates several images at once using OpenAI's DALL-E API.
+    
+    Use it for variations: either pass a list of different prompts, or one
+    prompt with n > 1 to get n different renders of it. Images are rendered
+    concurrently (at most IMAGE_VARIATIONS_CONCURRENCY at a time) and every
+    result comes back in one payload. A failed image doesn't fail the others.
+    
+    Args:
+        prompts (List[str], optional): Prompts to render, one image each.
+        prompt (str, optional): A single prompt to render n times (used when prompts is empty).
+        n (int): Number of renders of `prompt` (default: 1, max: IMAGE_VARIATIONS_MAX).
+        size (str): The size of every image. Options: "1024x1024", "1792x1024", "1024x1792".
+                   Defaults to "1024x1024".
+        quality (str): The quality of every image. Options: "standard", "hd".
+                      Defaults to "standard".
+        force_new (bool): Render new images even if cached ones match. Defaults to False.
+                          Repeats of the same prompt are always rendered fresh.
+    
+    Returns:
+        Dict[str, Any]: A dictionary with the following structure:
+            - status (str): 'success' if at least one image was generated, otherwise 'error'
+            - requested (int): Number of images requested
+            - succeeded (int): Number of images generated
+            - failed (int): Number of images that failed
+            - size (str): The size used
+            - quality (str): The quality setting used
+            - images (list): One entry per image, in request order, each with index, prompt,
+              status and either image_url/local_path or error_message
+            - error_message (str, optional): Error description when nothing could be requested
+    
+    Example:
+        >>> await generate_images(prompt="A lighthouse at dusk, watercolor", n=3)
+        {
+            'status': 'success',
+            'requested': 3,
+            'succeeded': 3,
+            'failed': 0,
+            'size': '1024x1024',
+            'quality': 'standard',
+            'images': [
+                {'index': 0, 'prompt': 'A lighthouse at dusk, watercolor', 'status': 'success',
+                 'image_url': 'https://...', 'local_path': '/path/to/generated_images/...png'},
+                ...
+            ]
+        }
+    """
+    print(f"--- Tool: generate_images called with {len(prompts or [])} prompts, n={n} ---")  # Log tool execution
+    
+    if isinstance(prompts, str):
+        prompts = [prompts]
+    if not prompts:
+        if not isinstance(n, int) or n < 1:
+            n = 1
+        prompts = [prompt] * min(n, IMAGE_VARIATIONS_MAX) if prompt else []
+    prompts = prompts[:IMAGE_VARIATIONS_MAX]
+    
+    if not prompts:
         return {
             "status": "error",
-            "error_message": f"Image generation failed: {error_message}",
-            "prompt": prompt,
+            "error_message": "No prompts provided. Pass a list of prompts, or a prompt and n.",
             "size": size,
             "quality": quality
         }
+    
+    semaphore = asyncio.Semaphore(IMAGE_VARIATIONS_CONCURRENCY)
+    seen = set()
+    
+    async def render(item_prompt: str, repeat: bool) -> Dict[str, Any]:
+        async with semaphore:
+            if repeat:
+                # A repeated prompt is a request for another variation: skip the cache
+                # and single-flight so it isn't answered with the same image
+                return await _generate_image_async(item_prompt, size, quality, force_new=True)
+            return await generate_image_async(item_prompt, size, quality, force_new)
+    
+    calls = []
+    for item_prompt in prompts:
+        key = _normalize_image_args({"prompt": item_prompt})["prompt"]
+        calls.append(render(item_prompt, key in seen))
+        seen.add(key)
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    
+    images = []
+    for index, (item_prompt, result) in enumerate(zip(prompts, results)):
+        if isinstance(result, Exception):
+            result = _error_result(f"Image generation failed: {str(result)}", item_prompt, size, quality)
+        item = {"index": index, "prompt": item_prompt}
+        item.update({key: value for key, value in result.items() if key not in ("prompt", "size", "quality")})
+        images.append(item)
+    
+    succeeded = sum(1 for item in images if item["status"] == "success")
+    return {
+        "status": "success" if succeeded else "error",
+        "requested": len(images),
+        "succeeded": succeeded,
+        "failed": len(images) - succeeded,
+        "size": size,
+        "quality": quality,
+        "images": images,
+        **({} if succeeded else {"error_message": "None of the images could be generated."}),
+    }
+
+async def _generate_image_async(prompt: str, size: str, quality: str, force_new: bool) -> Dict[str, Any]:
+    """Shared body of generate_image_async, without request coalescing."""
+    error, api_key = _validate_request(prompt, size, quality)
+    if error:
+        return error
+    
+    cache = image_cache.get_image_cache()
+    if cache is not None and not force_new:
+        cached = await asyncio.to_thread(_lookup_cached, cache, prompt, size, quality)
+        if cached:
+            return _cached_result(cached, prompt, size, quality)
+    
+    try:
+        try:
+            client = http_client.get_async_openai_client(api_key)
+        except ImportError:
+            return _error_result("OpenAI library not installed. Please install it with: pip install openai", prompt, size, quality)
+        
+        async with slot_async("openai_images"):
+            response = await client.images.generate(
+                model="dall-e-3",
+                prompt=prompt,
+                size=size,
+                quality=quality,
+                n=1
+            )
+        image_url = response.data[0].url
+        
+        try:
+            store = image_store.get_image_store()
+            
+            download = await async_download_to_file(image_url, store.incoming_path(), upstream="image_download")
+            entry = await asyncio.to_thread(store.add, download["path"], prompt, size, quality, download["sha256"])
+            local_path = entry["path"]
+            
+            print(f"Image downloaded to: {local_path}")
+            
+            if cache is not None:
+                await asyncio.to_thread(cache.store, prompt, size, quality, image_url, local_path)
+            return _success_result(image_url, local_path, prompt, size, quality, entry)
+            
+        except Exception as download_error:
+            print(f"Warning: Failed to download image locally: {download_error}")
+            return _download_failed_result(image_url, download_error, prompt, size, quality)
+        
+    except Exception as e:
+        _penalize_if_rate_limited(e)
+        return _error_result(f"Image generation failed: {_friendly_error_message(e)}", prompt, size, quality)
+
+def _error_result(error_message: str, prompt: str, size: str, quality: str) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "error_message": error_message,
+        "prompt": prompt,
+        "size": size,
+        "quality": quality
+    }
+
+def _success_result(image_url: str, local_path: str, prompt: str, size: str, quality: str, entry: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    result = {
+        "status": "success",
+        "image_url": image_url,
+        "local_path": local_path,
+        "prompt": prompt,
+        "size": size,
+        "quality": quality
+    }
+    if entry:
+        result["image_id"] = entry["id"]
+        result["sha256"] = entry["sha256"]
+        if entry.get("deduplicated"):
+            # The render matched an image already in the store; that earlier image is returned
+            result["deduplicated"] = True
+        _add_image_link(result)
+    return result
+
+def _add_image_link(result: Dict[str, Any]) -> None:
+    """Adds the image server URL for the stored image when IMAGE_SERVER_URL is set."""
+    link = image_server.image_link(result["image_id"])
+    if link:
+        result["image_link"] = link
+
+def _lookup_cached(cache: image_cache.ImageCache, prompt: str, size: str, quality: str) -> Optional[Dict[str, Any]]:
+    """Cache lookup that also marks the image as recently used in the store.
+
+    Images the store has since evicted count as a miss.
+    """
+    cached = cache.lookup(prompt, size, quality)
+    if cached is None:
+        return None
+    entry = image_store.get_image_store().get_by_path(cached["local_path"])
+    if entry is None:
+        return None
+    cached["image_id"] = entry["id"]
+    return cached
+
+def _cached_result(cached: Dict[str, Any], prompt: str, size: str, quality: str) -> Dict[str, Any]:
+    print(f"Reusing cached image ({cached['cache_match']} match): {cached['local_path']}")
+    result = _success_result(cached["image_url"], cached["local_path"], prompt, size, quality)
+    result.update(
+        image_id=cached["image_id"],
+        cache_hit=True,
+        cache_match=cached["cache_match"],
+        similarity=cached["similarity"],
+        cached_prompt=cached["cached_prompt"],
+    )
+    _add_image_link(result)
+    return result
+
+def _download_failed_result(image_url: str, download_error: Exception, prompt: str, size: str, quality: str) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "image_url": image_url,
+        "local_path": None,
+        "download_error": str(download_error),
+        "prompt": prompt,
+        "size": size,
+        "quality": quality
+    }
+
+def _validate_request(prompt: str, size: str, quality: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Validates generate_image arguments and the API key.
+    
+    Returns:
+        Tuple: (error result or None, OpenAI API key)
+    """
+    # Input validation
+    if not prompt or not isinstance(prompt, str):
+        return _error_result("Invalid prompt provided. Please provide a valid text description.", prompt, size, quality), None
+    
+    if prompt.strip() == "":
+        return _error_result("Empty prompt provided. Please provide a descriptive text for image generation.", prompt, size, quality), None
+    
+    # Validate size parameter
+    if size not in VALID_SIZES:
+        return _error_result(f"Invalid size '{size}'. Valid options: {', '.join(VALID_SIZES)}", prompt, size, quality), None
+    
+    # Validate quality parameter
+    if quality not in VALID_QUALITIES:
+        return _error_result(f"Invalid quality '{quality}'. Valid options: {', '.join(VALID_QUALITIES)}", prompt, size, quality), None
+    
+    # Check for OpenAI API key
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return _error_result("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.", prompt, size, quality), None
+    
+    return None, api_key
+
+def _retry_after_seconds(e: Exception) -> float:
+    """Reads Retry-After from an OpenAI error response, defaulting to 60 seconds."""
+    response = getattr(e, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return 60.0
+
+def _penalize_if_rate_limited(e: Exception) -> None:
+    """Pauses every image caller, not just this one, until OpenAI's rate-limit window resets."""
+    message = str(e).lower()
+    if getattr(e, "status_code", None) == 429 and not ("insufficient" in message and "quota" in message):
+        penalize("openai_images", _retry_after_seconds(e))
+
+def _friendly_error_message(e: Exception) -> str:
+    """Maps common OpenAI failures to user-friendly error messages."""
+    error_message = str(e)
+    status_code = getattr(e, "status_code", None)
+    
+    # Provide more user-friendly error messages for common issues
+    if "api key" in error_message.lower():
+        error_message = "Invalid OpenAI API key. Please check your OPENAI_API_KEY environment variable."
+    elif "content policy" in error_message.lower():
+        error_message = "The prompt violates OpenAI's content policy. Please try a different description."
+    elif "insufficient" in error_message.lower() and "quota" in error_message.lower():
+        error_message = "OpenAI account quota exceeded. Please check your OpenAI account billing."
+    elif isinstance(e, RateLimitExceeded):
+        error_message = f"Image generation is busy. Please try again in about {max(1, round(e.wait))} seconds."
+    elif status_code == 429:
+        error_message = "Rate limit exceeded. Please try again in a moment."
+    
+    return error_message
 
 # Example tool usage for testing
 if __name__ == "__main__":
@@ -1,18 +1,41 @@
 # @title Define the get_jokes Tool
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import json
-import random
+import threading
+from tools import joke_corpus
 
-def get_jokes(category: str = "general", count: int = 1) -> Dict[str, Any]:
+# Session state key holding one shuffle bag per category
+JOKE_BAGS_STATE_KEY = "joke_bags"
+
+# Session state key holding the search results a session was already given
+JOKE_SEARCH_SEEN_STATE_KEY = "joke_search_seen"
+JOKE_SEARCH_SEEN_LIMIT = 256
+# Search hits considered per requested joke, so repeated searches can skip jokes already told
+JOKE_SEARCH_POOL = 8
+
+# Words that describe the request rather than the topic ("a funny joke about cats")
+SEARCH_FILLER_TERMS = frozenset(
+    "joke pun humor humour funny about something anything some tell give one another more related kind please".split()
+)
+
+# Bags for calls made without a session (e.g., scripts), shared by the process
+_process_bags: Dict[str, Dict[str, int]] = {}
+_process_bags_lock = threading.Lock()
+
+def get_jokes(category: str = "general", count: int = 1, tool_context=None) -> Dict[str, Any]:
     """Retrieves jokes from a specified category.
     
-    This tool fetches jokes from various categories and returns
-    a structured response that can be processed by the ADK framework.
+    This tool fetches jokes from the joke corpus (tools/joke_corpus.py) and returns
+    a structured response that can be processed by the ADK framework. Jokes are
+    drawn from a per-session shuffle bag, so a session hears every joke in a
+    category before any of them repeats.
     
     Args:
         category (str): The category of jokes (e.g., "programming", "dad", "science", "general").
                        Defaults to "general" if not specified.
         count (int): Number of jokes to return (1-5). Defaults to 1.
+        tool_context (ToolContext, optional): Injected by ADK; its session state holds
+                                              the shuffle bags.
     
     Returns:
         Dict[str, Any]: A dictionary containing the jokes with the following structure:
@@ -21,6 +44,7 @@ def get_jokes(category: str = "general", count: int = 1) -> Dict[str, Any]:
             - error_message (str, optional): Error description when status is 'error'
             - category (str): The category requested
             - count (int): Number of jokes returned
+            - remaining (int, optional): Jokes in the category this session hasn't heard yet
     
     Example:
         >>> get_jokes("programming", 2)
@@ -31,7 +55,8 @@ def get_jokes(category: str = "general", count: int = 1) -> Dict[str, Any]:
                 {'joke': 'How many programmers does it take to change a light bulb?', 'punchline': 'None, that\'s a hardware problem!'}
             ],
             'category': 'programming',
-            'count': 2
+            'count': 2,
+            'remaining': 5
         }
     """
     print(f"--- Tool: get_jokes called for category: {category}, count: {count} ---")  # Log tool execution
@@ -53,81 +78,171 @@ def get_jokes(category: str = "general", count: int = 1) -> Dict[str, Any]:
             "count": count
         }
     
-    category_normalized = category.lower().replace(" ", "")
-    
-    # Mock jokes database organized by category
-    mock_jokes_db = {
-        "programming": [
-            {"joke": "Why do programmers prefer dark mode?", "punchline": "Because light attracts bugs!"},
-            {"joke": "How many programmers does it take to change a light bulb?", "punchline": "None, that's a hardware problem!"},
-            {"joke": "Why do Java developers wear glasses?", "punchline": "Because they can't C#!"},
-            {"joke": "A SQL query goes into a bar, walks up to two tables and asks...", "punchline": "Can I join you?"},
-            {"joke": "Why did the programmer quit his job?", "punchline": "Because he didn't get arrays!"},
-            {"joke": "What's a programmer's favorite hangout place?", "punchline": "Foo Bar!"},
-            {"joke": "Why do programmers always mix up Halloween and Christmas?", "punchline": "Because Oct 31 equals Dec 25!"}
-        ],
-        "dad": [
-            {"joke": "I'm reading a book about anti-gravity.", "punchline": "It's impossible to put down!"},
-            {"joke": "Did you hear about the mathematician who's afraid of negative numbers?", "punchline": "He'll stop at nothing to avoid them!"},
-            {"joke": "Why don't scientists trust atoms?", "punchline": "Because they make up everything!"},
-            {"joke": "I told my wife she was drawing her eyebrows too high.", "punchline": "She looked surprised!"},
-            {"joke": "What do you call a fake noodle?", "punchline": "An impasta!"},
-            {"joke": "Why did the scarecrow win an award?", "punchline": "He was outstanding in his field!"},
-            {"joke": "I used to hate facial hair...", "punchline": "But then it grew on me!"}
-        ],
-        "science": [
-            {"joke": "Two atoms are walking down the street. One says, 'I think I lost an electron!'", "punchline": "The other asks, 'Are you sure?' The first replies, 'Yes, I'm positive!'"},
-            {"joke": "What did the biologist wear to impress his date?", "punchline": "Designer genes!"},
-            {"joke": "Why can't you trust an atom?", "punchline": "Because they make up everything!"},
-            {"joke": "What do you call an educated tube?", "punchline": "A graduated cylinder!"},
-            {"joke": "Why did the physics teacher break up with the biology teacher?", "punchline": "There was no chemistry!"},
-            {"joke": "What's the fastest way to determine the sex of a chromosome?", "punchline": "Pull down its genes!"},
-            {"joke": "I have a new theory on inertia...", "punchline": "But it doesn't seem to be gaining momentum!"}
-        ],
-        "general": [
-            {"joke": "Why don't eggs tell jokes?", "punchline": "They'd crack each other up!"},
-            {"joke": "What do you call a sleeping bull?", "punchline": "A bulldozer!"},
-            {"joke": "Why did the math book look so sad?", "punchline": "Because it was full of problems!"},
-            {"joke": "What do you call a bear with no teeth?", "punchline": "A gummy bear!"},
-            {"joke": "Why don't skeletons fight each other?", "punchline": "They don't have the guts!"},
-            {"joke": "What's orange and sounds like a parrot?", "punchline": "A carrot!"},
-            {"joke": "Why did the cookie go to the doctor?", "punchline": "Because it felt crumbly!"}
-        ],
-        "office": [
-            {"joke": "Why did the employee get fired from the calendar factory?", "punchline": "He took a day off!"},
-            {"joke": "What do you call a person who's happy on Monday?", "punchline": "Retired!"},
-            {"joke": "Why don't meetings ever start on time?", "punchline": "Because punctuality is a deadline issue!"},
-            {"joke": "What's the best thing about Switzerland at work?", "punchline": "I don't know, but their flag is a big plus!"},
-            {"joke": "Why did the PowerPoint cross the road?", "punchline": "To get to the other slide!"},
-            {"joke": "What do you call a printer that can sing?", "punchline": "A Dell!"},
-            {"joke": "Why do accountants make good comedians?", "punchline": "They know how to work the numbers!"}
-        ]
-    }
+    corpus = joke_corpus.get_joke_corpus()
+    span = corpus.span(category)
     
     # Check if category exists
-    if category_normalized not in mock_jokes_db:
-        available_categories = list(mock_jokes_db.keys())
+    if span is None:
         return {
             "status": "error",
-            "error_message": f"Sorry, I don't have jokes for the category '{category}'. Available categories: {', '.join(available_categories)}",
+            "error_message": f"Sorry, I don't have jokes for the category '{category}'. Available categories: {', '.join(corpus.categories())}",
             "category": category,
             "count": count
         }
     
-    # Get jokes from the category
-    category_jokes = mock_jokes_db[category_normalized]
-    selected_jokes = random.sample(category_jokes, min(count, len(category_jokes)))
+    selected_jokes, remaining = _draw_from_category(corpus, category, count, tool_context)
     
     return {
         "status": "success",
         "jokes": selected_jokes,
         "category": category,
-        "count": len(selected_jokes)
+        "count": len(selected_jokes),
+        "remaining": remaining
+    }
+
+def search_jokes(query: str, count: int = 1, tool_context=None) -> Dict[str, Any]:
+    """Finds jokes about a topic by keyword.
+    
+    Ranks every joke's text and punchline against the query with BM25 over the
+    corpus' inverted index (tools/joke_corpus.py). A query that names a category
+    ("dad jokes", "office humor"), or finds no matching jokes but mentions a
+    category, is answered from that category like get_jokes.
+    
+    Args:
+        query (str): What the jokes should be about (e.g., "cats", "databases", "coffee").
+        count (int): Number of jokes to return (1-5). Defaults to 1.
+        tool_context (ToolContext, optional): Injected by ADK; its session state remembers
+                                              which jokes were already told.
+    
+    Returns:
+        Dict[str, Any]: A dictionary containing the jokes with the following structure:
+            - status (str): Either 'success' or 'error'
+            - query (str): The query searched
+            - match (str, optional): 'search' for keyword matches, 'category' for a category fallback
+            - jokes (List[Dict], optional): Joke objects with joke, punchline and category
+            - count (int): Number of jokes returned
+            - total_matches (int, optional): Number of jokes matching the query ('search' only)
+            - category (str, optional): The category used ('category' only)
+            - error_message (str, optional): Error description when status is 'error'
+    
+    Example:
+        >>> search_jokes("atoms", 1)
+        {
+            'status': 'success',
+            'query': 'atoms',
+            'match': 'search',
+            'jokes': [{'joke': "Why can't you trust an atom?", 'punchline': 'Because they make up everything!', 'category': 'science'}],
+            'count': 1,
+            'total_matches': 3
+        }
+    """
+    print(f"--- Tool: search_jokes called for query: {query}, count: {count} ---")  # Log tool execution
+    
+    # Input validation
+    if not isinstance(query, str) or not query.strip():
+        return {
+            "status": "error",
+            "error_message": "Invalid query provided. Please describe what the joke should be about.",
+            "query": query,
+            "count": count
+        }
+    
+    if not isinstance(count, int) or count < 1 or count > 5:
+        return {
+            "status": "error",
+            "error_message": "Invalid count. Please provide a number between 1 and 5.",
+            "query": query,
+            "count": count
+        }
+    
+    corpus = joke_corpus.get_joke_corpus()
+    terms = [term for term in joke_corpus.tokenize(query) if term not in SEARCH_FILLER_TERMS]
+    categories = [term for term in terms if corpus.span(term) is not None]
+    
+    # "dad jokes", "programming": a category, not a topic
+    if not terms or (len(terms) == 1 and categories):
+        return _category_result(corpus, query, categories[0] if categories else "general", count, tool_context)
+    
+    hits, total = corpus.search(" ".join(terms), limit=count * JOKE_SEARCH_POOL)
+    if not hits:
+        if categories:
+            return _category_result(corpus, query, categories[0], count, tool_context)
+        return {
+            "status": "error",
+            "error_message": f"Sorry, I couldn't find jokes about '{query}'. Available categories: {', '.join(corpus.categories())}",
+            "query": query,
+            "count": count
+        }
+    
+    # Best-scoring jokes this session hasn't been told yet, then the best of the rest
+    seen = set(tool_context.state.get(JOKE_SEARCH_SEEN_STATE_KEY) or []) if tool_context is not None else set()
+    ranked = [index for index, _ in hits]
+    picked = ([index for index in ranked if index not in seen] + [index for index in ranked if index in seen])[:count]
+    if tool_context is not None:
+        told = [index for index in tool_context.state.get(JOKE_SEARCH_SEEN_STATE_KEY) or [] if index not in picked]
+        tool_context.state[JOKE_SEARCH_SEEN_STATE_KEY] = (told + picked)[-JOKE_SEARCH_SEEN_LIMIT:]
+    
+    jokes = [dict(corpus.joke(index), category=corpus.category_of(index)) for index in picked]
+    return {
+        "status": "success",
+        "query": query,
+        "match": "search",
+        "jokes": jokes,
+        "count": len(jokes),
+        "total_matches": total
+    }
+
+def _category_result(corpus: "joke_corpus.JokeCorpus", query: str, category: str, count: int, tool_context) -> Dict[str, Any]:
+    """search_jokes result answered from a category's shuffle bag."""
+    jokes, remaining = _draw_from_category(corpus, category, count, tool_context)
+    return {
+        "status": "success",
+        "query": query,
+        "match": "category",
+        "category": category,
+        "jokes": [dict(joke, category=category) for joke in jokes],
+        "count": len(jokes),
+        "remaining": remaining
     }
 
+def _draw_from_category(corpus: "joke_corpus.JokeCorpus", category: str, count: int, tool_context) -> Tuple[List[Dict[str, str]], int]:
+    """Draws jokes from this session's bag for a category (which must exist).
+
+    Returns the jokes and how many the session hasn't heard yet.
+    """
+    first, size = corpus.span(category)
+    key = joke_corpus.normalize_category(category)
+    if tool_context is not None:
+        bags = tool_context.state.get(JOKE_BAGS_STATE_KEY) or {}
+        bag, indices = _draw_jokes(bags.get(key), size, count)
+        tool_context.state[JOKE_BAGS_STATE_KEY] = {**bags, key: bag}
+    else:
+        with _process_bags_lock:
+            bag, indices = _draw_jokes(_process_bags.get(key), size, count)
+            _process_bags[key] = bag
+    return [corpus.joke(first + index) for index in indices], size - bag["drawn"]
+
+def _draw_jokes(bag: Optional[Dict[str, int]], size: int, count: int) -> Tuple[Dict[str, int], List[int]]:
+    """Draws up to `count` distinct jokes from a shuffle bag, reshuffling when it runs out.
+
+    Returns the updated bag and the jokes' indices within the category.
+    """
+    indices = []
+    reshuffled = False
+    for _ in range(min(count, size)):
+        index, bag, restarted = joke_corpus.draw(bag, size)
+        reshuffled = reshuffled or restarted
+        # After a reshuffle, skip jokes already picked for this response
+        while reshuffled and index in indices:
+            index, bag, _ = joke_corpus.draw(bag, size)
+        indices.append(index)
+    return bag, indices
+
 # Example tool usage for testing
 if __name__ == "__main__":
     print("Testing get_jokes tool:")
     print(json.dumps(get_jokes("programming", 2), indent=2))
     print(json.dumps(get_jokes("dad", 1), indent=2))
-    print(json.dumps(get_jokes("invalid", 1), indent=2))
\ No newline at end of file
+    print(json.dumps(get_jokes("invalid", 1), indent=2))
+    print(json.dumps(search_jokes("a joke about atoms", 2), indent=2))
+    print(json.dumps(search_jokes("dad jokes", 1), indent=2))
\ No newline at end of file
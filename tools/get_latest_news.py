@@ -1,10 +1,64 @@
 # @title Define the get_news Tool
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
 import json
+import httpx
 import requests
 import os
+import re
 from datetime import datetime
+from urllib.parse import urlsplit
+from tools.cache import CachePolicy, cached_tool
+from tools.singleflight import single_flight
+from tools.scheduler import RateLimitExceeded
+from tools import http_client
+from tools import news_archive
 
+# News API endpoint (override to point at a proxy or a local stand-in server)
+NEWS_API_BASE_URL = os.getenv("NEWS_API_BASE_URL", "https://newsapi.org/v2/everything")
+
+# Fan-out limits for get_news_many
+NEWS_MANY_CONCURRENCY = int(os.getenv("NEWS_MANY_CONCURRENCY", "4"))
+NEWS_MANY_MAX_TOPICS = 10
+
+# Articles whose estimated shingle Jaccard similarity reaches this are near-duplicates
+NEWS_NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEWS_NEAR_DUPLICATE_THRESHOLD", "0.6"))
+# ...and their headlines' word-pair Jaccard similarity reaches this too, so that
+# "OpenAI releases new model" and "Google releases new model" stay apart
+NEWS_NEAR_DUPLICATE_TITLE_THRESHOLD = float(os.getenv("NEWS_NEAR_DUPLICATE_TITLE_THRESHOLD", "0.6"))
+MINHASH_SHINGLE_SIZE = 3
+MINHASH_BINS = 32
+MINHASH_BAND_ROWS = 2
+_EMPTY_BIN = 1 << 64
+
+
+def _normalize_news_args(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalizes get_news arguments so equivalent requests share a cache entry."""
+    topic = arguments.get("topic")
+    if isinstance(topic, str):
+        topic = " ".join(topic.lower().split())
+    max_articles = arguments.get("max_articles")
+    if not isinstance(max_articles, int) or max_articles < 1 or max_articles > 10:
+        max_articles = 5  # Same default get_news falls back to
+    return {"topic": topic, "max_articles": max_articles}
+
+
+def _is_cacheable_news(result: Any) -> bool:
+    """Caches successful results, but not archived articles served while NewsAPI is down."""
+    return isinstance(result, dict) and result.get("status") == "success" and not result.get("stale")
+
+
+NEWS_CACHE_POLICY = CachePolicy(
+    name="get_news",
+    ttl=300,
+    max_entries=256,
+    stale_ttl=900,
+    normalize=_normalize_news_args,
+    cache_if=_is_cacheable_news,
+)
+
+@cached_tool(NEWS_CACHE_POLICY)
+@single_flight("get_news", normalize=_normalize_news_args)
 def get_news(topic: str, max_articles: int = 5) -> Dict[str, Any]:
     """Retrieves news articles for a specified topic using News API.
     
@@ -22,6 +76,11 @@ def get_news(topic: str, max_articles: int = 5) -> Dict[str, Any]:
             - error_message (str, optional): Error description when status is 'error'
             - topic (str): The original topic requested
             - total_results (int, optional): Total number of articles found
+            - served_from (str, optional): 'archive' when answered from the local news archive
+            - stale (bool, optional): True when NewsAPI was unreachable and archived articles were returned
+            - near_duplicates_collapsed (int, optional): Syndicated copies folded into another article's
+              'alternate_sources' list
+            - tokens_saved_estimate (int, optional): Approximate LLM tokens saved by collapsing them
     
     Example:
         >>> get_news("artificial intelligence")
@@ -41,13 +100,323 @@ def get_news(topic: str, max_articles: int = 5) -> Dict[str, Any]:
     """
     print(f"--- Tool: get_news called for topic: {topic} ---")  # Log tool execution
     
+    error, max_articles, params = _prepare_request(topic, max_articles)
+    if error:
+        return error
+    
+    # Answer recently fetched topics locally, otherwise only ask for newer articles
+    archive = news_archive.get_archive()
+    if archive is not None:
+        local_result = _archive_lookup(archive, topic, max_articles, params)
+        if local_result:
+            return local_result
+    
+    try:
+        # Make API request
+        response = http_client.get(NEWS_API_BASE_URL, params=params, upstream="newsapi")
+        response.raise_for_status()
+        
+        data = response.json()
+        if archive is not None:
+            return _archive_merge(archive, data, topic, max_articles)
+        return _format_response(data, topic, max_articles)
+        
+    except RateLimitExceeded as e:
+        return _archive_fallback(archive, topic, max_articles) or _rate_limited_result(e, topic)
+    except requests.exceptions.RequestException as e:
+        return _archive_fallback(archive, topic, max_articles) or {
+            "status": "error",
+            "error_message": f"Network error: {str(e)}",
+            "topic": topic
+        }
+    except json.JSONDecodeError as e:
+        return {
+            "status": "error",
+            "error_message": f"Invalid response format: {str(e)}",
+            "topic": topic
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": f"Unexpected error: {str(e)}",
+            "topic": topic
+        }
+
+@cached_tool(NEWS_CACHE_POLICY)
+@single_flight("get_news", normalize=_normalize_news_args)
+async def get_news_async(topic: str, max_articles: int = 5) -> Dict[str, Any]:
+    """Retrieves news articles for a specified topic using News API without blocking.
+    
+    Async variant of get_news for agents running on the ADK event loop. It uses
+    the pooled async HTTP client, so other sessions keep running while NewsAPI
+    responds. Results share the get_news cache.
+    
+    Args:
+        topic (str): The topic to search for news (e.g., "technology", "climate change", "AI").
+        max_articles (int): Maximum number of articles to return (default: 5).
+    
+    Returns:
+        Dict[str, Any]: The same structure returned by get_news.
+    """
+    print(f"--- Tool: get_news_async called for topic: {topic} ---")  # Log tool execution
+    
+    error, max_articles, params = _prepare_request(topic, max_articles)
+    if error:
+        return error
+    
+    # SQLite calls run in a worker thread to keep the event loop free
+    archive = news_archive.get_archive()
+    if archive is not None:
+        local_result = await asyncio.to_thread(_archive_lookup, archive, topic, max_articles, params)
+        if local_result:
+            return local_result
+    
+    try:
+        response = await http_client.async_get(NEWS_API_BASE_URL, params=params, upstream="newsapi")
+        response.raise_for_status()
+        
+        data = response.json()
+        if archive is not None:
+            return await asyncio.to_thread(_archive_merge, archive, data, topic, max_articles)
+        return _format_response(data, topic, max_articles)
+        
+    except RateLimitExceeded as e:
+        fallback = await asyncio.to_thread(_archive_fallback, archive, topic, max_articles)
+        return fallback or _rate_limited_result(e, topic)
+    except httpx.HTTPError as e:
+        fallback = await asyncio.to_thread(_archive_fallback, archive, topic, max_articles)
+        return fallback or {
+            "status": "error",
+            "error_message": f"Network error: {str(e)}",
+            "topic": topic
+        }
+    except json.JSONDecodeError as e:
+        return {
+            "status": "error",
+            "error_message": f"Invalid response format: {str(e)}",
+            "topic": topic
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": f"Unexpected error: {str(e)}",
+            "topic": topic
+        }
+
+async def get_news_many(topics: List[str], max_articles: int = 5) -> Dict[str, Any]:
+    """Retrieves news for several topics in one call.
+    
+    Fetches every topic concurrently (capped at NEWS_MANY_CONCURRENCY requests in
+    flight), removes articles that appear under more than one topic (same URL or
+    same headline), and returns a single merged list where each article lists the
+    topics it matched.
+    
+    Args:
+        topics (List[str]): The topics to search for (e.g., ["AI", "climate", "chips"]).
+                            Up to 10 topics; duplicates are ignored.
+        max_articles (int): Maximum number of articles per topic (default: 5).
+    
+    Returns:
+        Dict[str, Any]: A dictionary containing the merged news with the following structure:
+            - status (str): 'success' if at least one topic succeeded, otherwise 'error'
+            - topics (list): The topics that were searched
+            - total_results (int): Number of unique articles returned
+            - duplicates_removed (int): Articles dropped because another topic already had them
+            - per_topic (dict): Per-topic status, article count and error message if any
+            - articles (list): Unique articles, each with a 'topics' list
+            - error_message (str, optional): Error description when status is 'error'
+    
+    Example:
+        >>> await get_news_many(["AI", "chips"], 3)
+        {
+            'status': 'success',
+            'topics': ['AI', 'chips'],
+            'total_results': 5,
+            'duplicates_removed': 1,
+            'per_topic': {'AI': {'status': 'success', 'articles': 3, 'unique': 3}, ...},
+            'articles': [{'title': '...', 'url': '...', 'topics': ['AI', 'chips'], ...}]
+        }
+    """
+    print(f"--- Tool: get_news_many called for topics: {topics} ---")  # Log tool execution
+    
+    # Input validation
+    if isinstance(topics, str):
+        topics = [topics]
+    if not isinstance(topics, list) or not topics:
+        return {
+            "status": "error",
+            "error_message": "Invalid topics provided. Please provide a list of topics.",
+            "topics": topics
+        }
+    
+    unique_topics = []
+    seen_topics = set()
+    for topic in topics:
+        if not isinstance(topic, str) or not topic.strip():
+            continue
+        key = " ".join(topic.lower().split())
+        if key not in seen_topics:
+            seen_topics.add(key)
+            unique_topics.append(topic.strip())
+    unique_topics = unique_topics[:NEWS_MANY_MAX_TOPICS]
+    
+    if not unique_topics:
+        return {
+            "status": "error",
+            "error_message": "No valid topics provided. Please provide at least one topic.",
+            "topics": topics
+        }
+    
+    semaphore = asyncio.Semaphore(NEWS_MANY_CONCURRENCY)
+    
+    async def fetch(topic: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await get_news_async(topic, max_articles)
+    
+    results = await asyncio.gather(*(fetch(topic) for topic in unique_topics))
+    
+    merged_articles = []
+    by_url = {}
+    by_title = {}
+    duplicates_removed = 0
+    per_topic = {}
+    
+    for topic, result in zip(unique_topics, results):
+        if result.get("status") != "success":
+            per_topic[topic] = {"status": "error", "error_message": result.get("error_message", "Unknown error")}
+            continue
+        
+        unique_count = 0
+        for article in result.get("articles", []):
+            url_key = _url_key(article.get("url"))
+            title_key = _title_key(article.get("title"))
+            existing = (url_key and by_url.get(url_key)) or (title_key and by_title.get(title_key))
+            
+            if existing is not None:
+                duplicates_removed += 1
+                if topic not in existing["topics"]:
+                    existing["topics"].append(topic)
+                continue
+            
+            merged = dict(article, topics=[topic])
+            merged_articles.append(merged)
+            unique_count += 1
+            if url_key:
+                by_url[url_key] = merged
+            if title_key:
+                by_title[title_key] = merged
+        
+        per_topic[topic] = {"status": "success", "articles": len(result.get("articles", [])), "unique": unique_count}
+    
+    merged_articles, collapsed, tokens_saved = _collapse_near_duplicates(merged_articles)
+    duplicates_removed += collapsed
+    
+    if all(entry["status"] == "error" for entry in per_topic.values()):
+        return {
+            "status": "error",
+            "error_message": "News could not be retrieved for any of the requested topics.",
+            "topics": unique_topics,
+            "per_topic": per_topic
+        }
+    
+    return {
+        "status": "success",
+        "topics": unique_topics,
+        "total_results": len(merged_articles),
+        "duplicates_removed": duplicates_removed,
+        "tokens_saved_estimate": tokens_saved,
+        "per_topic": per_topic,
+        "articles": merged_articles
+    }
+
+def _archive_lookup(archive: "news_archive.NewsArchive", topic: str, max_articles: int, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Answers a recently fetched topic from the archive.
+    
+    When the topic isn't fresh, narrows `params` so NewsAPI only returns
+    articles published after the newest one already stored.
+    """
+    state = archive.topic_state(topic)
+    if state is None:
+        return None
+    
+    if archive.is_fresh(topic, state):
+        articles = archive.search(topic, max_articles)
+        if articles:
+            result = _format_response({"status": "ok", "totalResults": archive.count(topic), "articles": articles}, topic, max_articles)
+            result["served_from"] = "archive"
+            return result
+    
+    if state["latest_published_at"]:
+        params["from"] = state["latest_published_at"]
+    return None
+
+def _archive_merge(archive: "news_archive.NewsArchive", data: Dict[str, Any], topic: str, max_articles: int) -> Dict[str, Any]:
+    """Stores new articles and tops the result up with archived ones for the topic."""
+    if data.get("status") != "ok":
+        return _format_response(data, topic, max_articles)
+    
+    fresh_articles = data.get("articles", [])
+    archive.store(topic, fresh_articles)
+    if len(fresh_articles) >= max_articles:
+        return _format_response(data, topic, max_articles)
+    
+    seen_urls = {article.get("url") for article in fresh_articles}
+    archived = [article for article in archive.search(topic, max_articles) if article["url"] not in seen_urls]
+    articles = sorted(fresh_articles + archived, key=lambda article: article.get("publishedAt") or "", reverse=True)
+    total_available = max(data.get("totalResults", 0), archive.count(topic))
+    return _format_response({"status": "ok", "totalResults": total_available, "articles": articles}, topic, max_articles)
+
+def _archive_fallback(archive: Optional["news_archive.NewsArchive"], topic: str, max_articles: int) -> Optional[Dict[str, Any]]:
+    """Serves archived articles when NewsAPI can't be reached."""
+    if archive is None:
+        return None
+    articles = archive.search(topic, max_articles)
+    if not articles:
+        return None
+    result = _format_response({"status": "ok", "totalResults": archive.count(topic), "articles": articles}, topic, max_articles)
+    result["served_from"] = "archive"
+    result["stale"] = True
+    result["warning"] = "News API is unavailable right now; showing archived articles."
+    return result
+
+def _url_key(url: Optional[str]) -> Optional[str]:
+    """Normalizes an article URL for duplicate detection (ignores scheme, query and fragment)."""
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{parts.path.rstrip('/')}" or None
+
+def _title_key(title: Optional[str]) -> Optional[str]:
+    """Normalizes a headline for duplicate detection, dropping a trailing " - Outlet" suffix."""
+    if not title or title == "No title available":
+        return None
+    title = re.sub(r"\s+[-|–]\s+[^-|–]+$", "", title)
+    key = " ".join(re.findall(r"[a-z0-9]+", title.lower()))
+    return key or None
+
+def _rate_limited_result(error: RateLimitExceeded, topic: str) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "error_message": f"News API request limit reached. Please try again in about {max(1, round(error.wait / 60))} minute(s).",
+        "topic": topic
+    }
+
+def _prepare_request(topic: str, max_articles: int) -> Tuple[Optional[Dict[str, Any]], int, Dict[str, Any]]:
+    """Validates get_news arguments and builds the News API query parameters.
+    
+    Returns:
+        Tuple: (error result or None, effective max_articles, request params)
+    """
     # Input validation
     if not topic or not isinstance(topic, str):
         return {
             "status": "error",
             "error_message": "Invalid topic provided. Please provide a valid topic.",
             "topic": topic
-        }
+        }, max_articles, {}
     
     if max_articles < 1 or max_articles > 10:
         max_articles = 5  # Default to 5 if invalid
@@ -60,10 +429,8 @@ def get_news(topic: str, max_articles: int = 5) -> Dict[str, Any]:
             "status": "error",
             "error_message": "News API key not found. Please set NEWS_API_KEY in your .env file.",
             "topic": topic
-        }
+        }, max_articles, {}
     
-    # News API configuration
-    base_url = "https://newsapi.org/v2/everything"
     params = {
         'q': topic,
         'apiKey': api_key,
@@ -72,65 +439,153 @@ def get_news(topic: str, max_articles: int = 5) -> Dict[str, Any]:
         'sortBy': 'publishedAt',
         'searchIn': 'title,description'
     }
-    
-    try:
-        # Make API request
-        response = requests.get(base_url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Check if request was successful
-        if data.get('status') != 'ok':
-            return {
-                "status": "error",
-                "error_message": f"News API error: {data.get('message', 'Unknown error')}",
-                "topic": topic
-            }
-        
-        articles = data.get('articles', [])
-        total_results = data.get('totalResults', 0)
-        
-        # Process and format articles
-        formatted_articles = []
-        for article in articles[:max_articles]:
-            formatted_article = {
-                "title": article.get('title', 'No title available'),
-                "description": article.get('description', 'No description available'),
-                "url": article.get('url', ''),
-                "published_at": article.get('publishedAt', ''),
-                "source": article.get('source', {}).get('name', 'Unknown source'),
-                "author": article.get('author', 'Unknown author'),
-                "content": article.get('content', '')[:200] + '...' if article.get('content') else ''
-            }
-            formatted_articles.append(formatted_article)
-        
-        return {
-            "status": "success",
-            "topic": topic,
-            "total_results": len(formatted_articles),
-            "total_available": total_results,
-            "articles": formatted_articles
-        }
-        
-    except requests.exceptions.RequestException as e:
-        return {
-            "status": "error",
-            "error_message": f"Network error: {str(e)}",
-            "topic": topic
-        }
-    except json.JSONDecodeError as e:
+    return None, max_articles, params
+
+def _format_response(data: Dict[str, Any], topic: str, max_articles: int) -> Dict[str, Any]:
+    """Converts a News API payload into the get_news result structure."""
+    # Check if request was successful
+    if data.get('status') != 'ok':
         return {
             "status": "error",
-            "error_message": f"Invalid response format: {str(e)}",
+            "error_message": f"News API error: {data.get('message', 'Unknown error')}",
             "topic": topic
         }
-    except Exception as e:
-        return {
-            "status": "error",
-            "error_message": f"Unexpected error: {str(e)}",
-            "topic": topic
+    
+    articles = data.get('articles', [])
+    total_results = data.get('totalResults', 0)
+    
+    # Process and format articles
+    formatted_articles = []
+    for article in articles:
+        formatted_article = {
+            "title": article.get('title', 'No title available'),
+            "description": article.get('description', 'No description available'),
+            "url": article.get('url', ''),
+            "published_at": article.get('publishedAt', ''),
+            "source": article.get('source', {}).get('name', 'Unknown source'),
+            "author": article.get('author', 'Unknown author'),
+            "content": article.get('content', '')[:200] + '...' if article.get('content') else ''
         }
+        formatted_articles.append(formatted_article)
+    
+    # Collapse syndicated copies of the same story before trimming to max_articles
+    formatted_articles, collapsed, tokens_saved = _collapse_near_duplicates(formatted_articles)
+    formatted_articles = formatted_articles[:max_articles]
+    
+    result = {
+        "status": "success",
+        "topic": topic,
+        "total_results": len(formatted_articles),
+        "total_available": total_results,
+        "articles": formatted_articles
+    }
+    if collapsed:
+        result["near_duplicates_collapsed"] = collapsed
+        result["tokens_saved_estimate"] = tokens_saved
+    return result
+
+def _shingles(text: str, size: int) -> set:
+    """Runs of `size` consecutive words in `text` (the whole text when shorter)."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) > size:
+        return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return {" ".join(words)}
+
+def _minhash_signature(text: str) -> List[int]:
+    """Computes a one-permutation MinHash signature over word shingles of `text`.
+    
+    Each shingle is hashed once; the hash picks one of MINHASH_BINS bins and the
+    bin keeps its minimum value. Empty bins hold _EMPTY_BIN.
+    """
+    signature = [_EMPTY_BIN] * MINHASH_BINS
+    for shingle in _shingles(text, MINHASH_SHINGLE_SIZE):
+        # Built-in hashing is stable within a process, which is all a per-request comparison needs
+        value = hash(shingle) & 0xFFFFFFFFFFFFFFFF
+        bin_index, bin_value = value % MINHASH_BINS, value // MINHASH_BINS
+        if bin_value < signature[bin_index]:
+            signature[bin_index] = bin_value
+    return signature
+
+def _estimated_jaccard(a: List[int], b: List[int]) -> float:
+    """Estimates shingle-set Jaccard similarity from two signatures, ignoring bins empty in both."""
+    compared = matches = 0
+    for x, y in zip(a, b):
+        if x == _EMPTY_BIN and y == _EMPTY_BIN:
+            continue
+        compared += 1
+        matches += x == y
+    return matches / compared if compared else 0.0
+
+def _collapse_near_duplicates(articles: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Collapses near-duplicate articles into one representative each.
+    
+    Signatures are MinHashes over the headline (minus any " - Outlet" suffix)
+    and description. Banding the signatures (LSH) yields candidate pairs, so
+    only likely matches are compared; pairs whose estimated Jaccard similarity
+    reaches NEWS_NEAR_DUPLICATE_THRESHOLD, and whose headlines share enough
+    word pairs (NEWS_NEAR_DUPLICATE_TITLE_THRESHOLD), are clustered; a long shared
+    description alone doesn't make two stories the same. The first article of
+    each cluster is kept (results are newest first) and the others are listed
+    under its 'alternate_sources'.
+    
+    Returns:
+        Tuple: (collapsed articles, number of articles removed, estimated tokens saved)
+    """
+    if len(articles) < 2:
+        return articles, 0, 0
+    
+    signatures, title_shingles = [], []
+    for article in articles:
+        title = re.sub(r"\s+[-|–]\s+[^-|–]+$", "", article.get("title") or "")
+        signatures.append(_minhash_signature(f"{title} {article.get('description') or ''}"))
+        title_shingles.append(_shingles(title, 2))
+    
+    def similar(i: int, j: int) -> bool:
+        if _estimated_jaccard(signatures[i], signatures[j]) < NEWS_NEAR_DUPLICATE_THRESHOLD:
+            return False
+        union = title_shingles[i] | title_shingles[j]
+        return len(title_shingles[i] & title_shingles[j]) >= NEWS_NEAR_DUPLICATE_TITLE_THRESHOLD * len(union)
+    
+    parent = list(range(len(articles)))
+    
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    buckets: Dict[Tuple[int, ...], List[int]] = {}
+    for i, signature in enumerate(signatures):
+        for start in range(0, MINHASH_BINS, MINHASH_BAND_ROWS):
+            band = tuple(signature[start:start + MINHASH_BAND_ROWS])
+            if all(value == _EMPTY_BIN for value in band):
+                continue
+            bucket = buckets.setdefault((start,) + band, [])
+            for j in bucket:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j and similar(i, j):
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+            bucket.append(i)
+    
+    representatives: Dict[int, Dict[str, Any]] = {}
+    collapsed_articles = []
+    removed_chars = 0
+    for i, article in enumerate(articles):
+        root = find(i)
+        if root not in representatives:
+            representatives[root] = article
+            collapsed_articles.append(article)
+            continue
+        representative = representatives[root]
+        alternate = {"source": article.get("source"), "url": article.get("url")}
+        representative.setdefault("alternate_sources", []).append(alternate)
+        for topic in article.get("topics", []):
+            if topic not in representative.setdefault("topics", []):
+                representative["topics"].append(topic)
+        removed_chars += len(json.dumps(article)) - len(json.dumps(alternate))
+    
+    # Rough estimate: about 4 characters of JSON per LLM token
+    return collapsed_articles, len(articles) - len(collapsed_articles), max(removed_chars, 0) // 4
 
 # Example tool usage for testing
 if __name__ == "__main__":
@@ -1,23 +1,55 @@
 # @title Define the get_weather Tool
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import json
+import os
+import requests
+from tools import weather_providers
+from tools.cache import CachePolicy, cached_tool
+from tools.gazetteer import get_gazetteer, normalize_place_name
+from tools.scheduler import RateLimitExceeded
+from tools.weather_table import SORT_KEYS, WeatherTable, parse_filter, parse_units
 
+# Fan-out limits for get_weather_many
+WEATHER_MANY_CONCURRENCY = int(os.getenv("WEATHER_MANY_CONCURRENCY", "8"))
+WEATHER_MANY_MAX_CITIES = 50
+
+def _normalize_weather_args(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Keys the cache by resolved place, so "NYC" and "New York" share an entry."""
+    city = arguments.get("city")
+    if isinstance(city, str):
+        place = get_gazetteer().lookup(city)
+        city = f"{place['name']}|{place['country']}" if place else normalize_place_name(city)
+    return {"city": city}
+
+
+WEATHER_CACHE_POLICY = CachePolicy(
+    name="get_weather",
+    ttl=600,
+    max_entries=512,
+    stale_ttl=1800,
+    normalize=_normalize_weather_args,
+)
+
+@cached_tool(WEATHER_CACHE_POLICY)
 def get_weather(city: str) -> Dict[str, Any]:
     """Retrieves the current weather report for a specified city.
     
-    This tool fetches weather information for a given city and returns
+    This tool fetches weather information for a given city from the provider
+    selected by WEATHER_PROVIDER (tools/weather_providers.py) and returns
     a structured response that can be processed by the ADK framework.
     
     Args:
         city (str): The name of the city (e.g., "New York", "London", "Tokyo").
-                   The city name will be normalized for lookup.
+                   Aliases ("NYC") and small misspellings ("Tokio") are resolved
+                   through the city gazetteer (tools/gazetteer.py).
     
     Returns:
         Dict[str, Any]: A dictionary containing the weather information with the following structure:
             - status (str): Either 'success' or 'error'
             - report (str, optional): Weather details when status is 'success'
             - error_message (str, optional): Error description when status is 'error'
-            - city (str): The original city name requested
+            - city (str): The resolved place name when status is 'success', otherwise the city requested
             - temperature (str, optional): Temperature information when available
             - conditions (str, optional): Weather conditions when available
     
@@ -25,7 +57,7 @@ def get_weather(city: str) -> Dict[str, Any]:
         >>> get_weather("New York")
         {
             'status': 'success',
-            'report': 'The weather in New York is sunny with a temperature of 25°C.',
+            'report': 'Current conditions in New York: sunny, 25°C.',
             'city': 'New York',
             'temperature': '25°C',
             'conditions': 'sunny'
@@ -41,59 +73,195 @@ def get_weather(city: str) -> Dict[str, Any]:
             "city": city
         }
     
-    city_normalized = city.lower().replace(" ", "")  # Basic normalization
+    place = get_gazetteer().lookup(city)
+    if place is None:
+        return {
+            "status": "error",
+            "error_message": f"Sorry, I couldn't find a place called '{city}'. Please check the spelling or try a nearby city.",
+            "city": city
+        }
 
-    # Mock weather database with more detailed information
-    mock_weather_db = {
-        "newyork": {
-            "status": "success",
-            "report": "The weather in New York is sunny with a temperature of 25°C.",
-            "city": "New York",
-            "temperature": "25°C",
-            "conditions": "sunny"
-        },
-        "london": {
-            "status": "success", 
-            "report": "It's cloudy in London with a temperature of 15°C.",
-            "city": "London",
-            "temperature": "15°C",
-            "conditions": "cloudy"
-        },
-        "tokyo": {
-            "status": "success",
-            "report": "Tokyo is experiencing light rain and a temperature of 18°C.",
-            "city": "Tokyo", 
-            "temperature": "18°C",
-            "conditions": "light rain"
-        },
-        "paris": {
-            "status": "success",
-            "report": "Paris has partly cloudy skies with a temperature of 22°C.",
-            "city": "Paris",
-            "temperature": "22°C", 
-            "conditions": "partly cloudy"
-        },
-        "sydney": {
-            "status": "success",
-            "report": "Sydney is clear and sunny with a temperature of 28°C.",
-            "city": "Sydney",
-            "temperature": "28°C",
-            "conditions": "clear and sunny"
+    try:
+        observation = weather_providers.current_weather(place)
+    except RateLimitExceeded:
+        return {
+            "status": "error",
+            "error_message": "The weather service is busy right now. Please try again in a minute.",
+            "city": city
+        }
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        return {
+            "status": "error",
+            "error_message": f"Weather service error: {str(e)}",
+            "city": city
         }
-    }
 
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
+    if observation is None:
         return {
             "status": "error", 
-            "error_message": f"Sorry, I don't have weather information for '{city}'. Please try another city.",
+            "error_message": f"Sorry, I don't have weather information for '{place['name']}'. Please try another city.",
             "city": city
         }
+    return _format_report(place, observation)
+
+def _format_report(place: Dict[str, Any], observation: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds the tool result for a place from a provider observation."""
+    temperature = f"{observation['temperature_c']:g}°C"
+    conditions = observation["conditions"]
+    return {
+        "status": "success",
+        # Works for any provider's wording ("light rain", "thunderstorms with hail")
+        "report": f"Current conditions in {place['name']}: {conditions}, {temperature}.",
+        "city": place["name"],
+        "temperature": temperature,
+        "conditions": conditions
+    }
+
+def get_weather_many(
+    cities: List[str],
+    sort_by: str = "warmest",
+    filter: str = "",
+    units: str = "C",
+    limit: int = 0,
+) -> Dict[str, Any]:
+    """Retrieves, ranks and filters the current weather for several cities in one call.
+    
+    Use this instead of calling get_weather once per city for questions like
+    "which of these cities is warmest?" or "where is it not raining?". The
+    observations are loaded into a columnar table (tools/weather_table.py), so
+    sorting, filtering, unit conversion and the summary are computed locally.
+    
+    Args:
+        cities (List[str]): The city names (e.g., ["Tokyo", "Paris", "NYC"]). Up to 50
+                            cities; aliases and misspellings are resolved as in get_weather,
+                            and names resolving to the same place are merged.
+        sort_by (str): 'warmest' (default), 'coldest', 'name' or 'population'.
+        filter (str): Optional conditions joined with "and", e.g. "temperature > 20",
+                      "conditions = rain/snow", "not rain", "country = JP".
+                      Temperatures are in `units` unless suffixed with C or F.
+        units (str): 'C' (default) or 'F'.
+        limit (int): Return only the top N ranked cities (default: 0, all of them).
+    
+    Returns:
+        Dict[str, Any]: A dictionary containing the ranked weather with the following structure:
+            - status (str): 'success' if any city has weather data, otherwise 'error'
+            - sort_by (str), filter (str), units (str): The ranking that was applied
+            - requested (int): Number of unique places asked for
+            - matched (int): Number of cities passing the filter
+            - summary (dict): warmest, coldest, max/min/mean_temperature and counts per
+                              condition group over the matching cities
+            - results (list): Ranked cities, each with rank, city, country, temperature
+                              (number in `units`) and conditions
+            - not_found (list, optional): Names that couldn't be resolved to a place
+            - unavailable (list, optional): Places without weather data, with the reason
+            - error_message (str, optional): Error description when status is 'error'
+    
+    Example:
+        >>> get_weather_many(["Tokyo", "Sydney", "London"], sort_by="warmest", filter="temperature > 16")
+        {
+            'status': 'success',
+            'sort_by': 'warmest',
+            'filter': 'temperature > 16',
+            'units': 'C',
+            'requested': 3,
+            'matched': 2,
+            'summary': {'warmest': 'Sydney', 'coldest': 'Tokyo', 'max_temperature': 28.0, ...},
+            'results': [{'rank': 1, 'city': 'Sydney', 'country': 'AU', 'temperature': 28.0, 'conditions': 'clear and sunny'}, ...]
+        }
+    """
+    print(f"--- Tool: get_weather_many called for cities: {cities} sort_by={sort_by} filter={filter!r} ---")  # Log tool execution
+    
+    # Input validation
+    if isinstance(cities, str):
+        cities = cities.split(",")
+    if not isinstance(cities, list) or not cities:
+        return {
+            "status": "error",
+            "error_message": "Invalid cities provided. Please provide a list of city names.",
+            "cities": cities
+        }
+    sort_by = (sort_by or "warmest").strip().lower()
+    try:
+        units = parse_units(units)
+        predicates = parse_filter(filter, units)
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort_by '{sort_by}'. Use one of: {', '.join(SORT_KEYS)}.")
+        try:
+            limit = int(limit or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid limit '{limit}'. Use a whole number of cities, or 0 for all of them.")
+    except ValueError as e:
+        return {
+            "status": "error",
+            "error_message": str(e),
+            "cities": cities
+        }
+    
+    gazetteer = get_gazetteer()
+    places, seen, not_found = [], set(), []
+    for city in cities:
+        if not isinstance(city, str) or not city.strip():
+            continue
+        place = gazetteer.lookup(city)
+        if place is None:
+            not_found.append(city.strip())
+        elif place["id"] not in seen:
+            seen.add(place["id"])
+            places.append(place)
+    places = places[:WEATHER_MANY_MAX_CITIES]
+    
+    rows, unavailable = [], []
+    if places:
+        with ThreadPoolExecutor(max_workers=min(WEATHER_MANY_CONCURRENCY, len(places))) as pool:
+            for place, (observation, error) in zip(places, pool.map(_observe, places)):
+                if observation is None:
+                    unavailable.append({"city": place["name"], "reason": error or "no weather data"})
+                else:
+                    rows.append((place, observation))
+    
+    if not rows:
+        return {
+            "status": "error",
+            "error_message": "Weather could not be retrieved for any of the requested cities.",
+            "not_found": not_found,
+            "unavailable": unavailable
+        }
+    
+    table = WeatherTable.from_observations(rows)
+    matching = table.take(table.mask(predicates))
+    ranked = matching.take(matching.order(sort_by))
+    if limit > 0:
+        ranked = ranked.take(slice(0, limit))
+    
+    result = {
+        "status": "success",
+        "sort_by": sort_by,
+        "filter": filter,
+        "units": units,
+        "requested": len(places) + len(not_found),
+        "matched": len(matching),
+        "summary": matching.summary(units),
+        "results": ranked.records(units)
+    }
+    if not_found:
+        result["not_found"] = not_found
+    if unavailable:
+        result["unavailable"] = unavailable
+    return result
+
+def _observe(place: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(observation, error) for one place; errors are reported per city rather than raised."""
+    try:
+        return weather_providers.current_weather(place), None
+    except RateLimitExceeded:
+        return None, "weather service busy"
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        return None, f"weather service error: {str(e)}"
 
 # Example tool usage for testing
 if __name__ == "__main__":
     print("Testing get_weather tool:")
     print(json.dumps(get_weather("New York"), indent=2))
     print(json.dumps(get_weather("Paris"), indent=2))
-    print(json.dumps(get_weather("Invalid City"), indent=2))
\ No newline at end of file
+    print(json.dumps(get_weather("Invalid City"), indent=2))
+    print(json.dumps(get_weather_many(["Tokyo", "Sydney", "London", "NYC", "Paris"], filter="not rain"), indent=2))
\ No newline at end of file
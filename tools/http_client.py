@@ -0,0 +1,314 @@
+"""
+Shared HTTP Client
+Owns the keep-alive connection pools used by every tool: a pooled
+requests.Session for plain HTTP calls, a process-wide OpenAI client, and
+per-event-loop httpx.AsyncClient / AsyncOpenAI clients for the async tools.
+"""
+
+from typing import Any, Dict, Optional
+from contextlib import nullcontext
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from tools.scheduler import penalize, slot, slot_async
+
+# Load environment variables
+load_dotenv()
+
+# Connection pool and timeout configuration
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # Number of hosts kept pooled
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))  # Keep-alive connections per host
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_openai_clients: Dict[str, Any] = {}
+_counters = {"requests": 0, "retries": 0, "failures": 0}
+
+# Async clients are bound to the event loop that created them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_async_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+def default_timeout() -> tuple:
+    """Returns the (connect, read) timeout tuple used when a caller doesn't pass one."""
+    return (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+
+def _retry_after_seconds(retry_after: Optional[str]) -> Optional[float]:
+    """Parses a numeric Retry-After header, or returns None."""
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Computes a full-jitter exponential backoff delay for the given retry attempt.
+
+    A numeric Retry-After header from the server takes precedence, capped at
+    HTTP_BACKOFF_MAX.
+    """
+    seconds = _retry_after_seconds(retry_after)
+    if seconds is not None:
+        return min(seconds, HTTP_BACKOFF_MAX)
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _penalize_on_429(upstream: Optional[str], status_code: int, retry_after: Optional[str], delay: float) -> None:
+    """Tells the scheduler to pause an upstream that answered 429 Too Many Requests.
+
+    The pause is the server's full Retry-After, not the capped retry delay, so
+    other callers don't hit the upstream again before its window resets.
+    """
+    if upstream and status_code == 429:
+        seconds = _retry_after_seconds(retry_after)
+        penalize(upstream, seconds if seconds is not None else delay)
+
+
+def get_session() -> requests.Session:
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                # Retries are handled in request() so they can use jittered backoff
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    max_retries=0,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def request(method: str, url: str, retry: Optional[bool] = None, upstream: Optional[str] = None, **kwargs) -> requests.Response:
+    """Sends a request through the pooled session with timeouts and retries.
+
+    Connection errors, timeouts and retryable status codes (429, 5xx) are retried
+    up to HTTP_MAX_RETRIES times with jittered exponential backoff. Only idempotent
+    methods are retried unless `retry` is set explicitly.
+
+    When `upstream` is given, every attempt waits for a slot from the shared
+    scheduler (see tools/scheduler.py) and a 429 pauses that upstream.
+
+    Args:
+        method (str): HTTP method (e.g., "GET").
+        url (str): The URL to request.
+        retry (bool, optional): Override whether the request may be retried.
+        upstream (str, optional): Scheduler upstream name (e.g., "newsapi").
+        **kwargs: Passed through to requests.Session.request.
+
+    Returns:
+        requests.Response: The final response. Callers still call raise_for_status().
+
+    Raises:
+        requests.exceptions.RequestException: If every attempt failed.
+        tools.scheduler.RateLimitExceeded: If the upstream's queue is too long.
+    """
+    method = method.upper()
+    kwargs.setdefault("timeout", default_timeout())
+    retries_allowed = HTTP_MAX_RETRIES if (retry if retry is not None else method in IDEMPOTENT_METHODS) else 0
+    session = get_session()
+
+    attempt = 0
+    while True:
+        with _lock:
+            _counters["requests"] += 1
+        try:
+            with slot(upstream) if upstream else nullcontext():
+                response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= retries_allowed:
+                with _lock:
+                    _counters["failures"] += 1
+                raise
+            delay = backoff_delay(attempt)
+        else:
+            retry_after = response.headers.get("Retry-After")
+            delay = backoff_delay(attempt, retry_after)
+            _penalize_on_429(upstream, response.status_code, retry_after, delay)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries_allowed:
+                return response
+            response.close()
+
+        attempt += 1
+        with _lock:
+            _counters["retries"] += 1
+        time.sleep(delay)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """Sends a GET request through the pooled session."""
+    return request("GET", url, **kwargs)
+
+
+def _httpx_timeout() -> httpx.Timeout:
+    return httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the pooled httpx.AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=_httpx_timeout(),
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_CONNECTIONS * HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=HTTP_POOL_MAXSIZE,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def _send(client: httpx.AsyncClient, method: str, url: str, stream: bool, kwargs: Dict[str, Any]) -> httpx.Response:
+    if stream:
+        return await client.send(client.build_request(method, url, **kwargs), stream=True)
+    return await client.request(method, url, **kwargs)
+
+
+async def async_request(
+    method: str, url: str, retry: Optional[bool] = None, upstream: Optional[str] = None, stream: bool = False, **kwargs
+) -> httpx.Response:
+    """Async counterpart of request() using the loop's pooled httpx.AsyncClient.
+
+    With `stream=True` the body is not read; iterate it with aiter_bytes() and
+    call aclose() when done.
+
+    Raises:
+        httpx.HTTPError: If every attempt failed.
+        tools.scheduler.RateLimitExceeded: If the upstream's queue is too long.
+    """
+    method = method.upper()
+    retries_allowed = HTTP_MAX_RETRIES if (retry if retry is not None else method in IDEMPOTENT_METHODS) else 0
+    client = get_async_client()
+
+    attempt = 0
+    while True:
+        with _lock:
+            _counters["requests"] += 1
+        try:
+            if upstream:
+                async with slot_async(upstream):
+                    response = await _send(client, method, url, stream, kwargs)
+            else:
+                response = await _send(client, method, url, stream, kwargs)
+        except (httpx.ConnectError, httpx.TimeoutException):
+            if attempt >= retries_allowed:
+                with _lock:
+                    _counters["failures"] += 1
+                raise
+            delay = backoff_delay(attempt)
+        else:
+            retry_after = response.headers.get("Retry-After")
+            delay = backoff_delay(attempt, retry_after)
+            _penalize_on_429(upstream, response.status_code, retry_after, delay)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries_allowed:
+                return response
+            await response.aclose()
+
+        attempt += 1
+        with _lock:
+            _counters["retries"] += 1
+        await asyncio.sleep(delay)
+
+
+async def async_get(url: str, **kwargs) -> httpx.Response:
+    """Sends a GET request through the loop's pooled async client."""
+    return await async_request("GET", url, **kwargs)
+
+
+def get_openai_client(api_key: str):
+    """Returns a process-wide OpenAI client for the given API key.
+
+    The client keeps its own keep-alive pool, so reusing it avoids a new TCP and
+    TLS handshake per call. OpenAI's SDK retries with jittered backoff itself.
+
+    Raises:
+        ImportError: If the openai package is not installed.
+    """
+    client = _openai_clients.get(api_key)
+    if client is None:
+        from openai import OpenAI
+
+        with _lock:
+            client = _openai_clients.get(api_key)
+            if client is None:
+                client = OpenAI(
+                    api_key=api_key,
+                    timeout=_httpx_timeout(),
+                    max_retries=HTTP_MAX_RETRIES,
+                )
+                _openai_clients[api_key] = client
+    return client
+
+
+def get_async_openai_client(api_key: str):
+    """Returns the AsyncOpenAI client for the given API key and running event loop.
+
+    Raises:
+        ImportError: If the openai package is not installed.
+    """
+    from openai import AsyncOpenAI
+
+    clients = _async_openai_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(api_key)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=api_key,
+            timeout=_httpx_timeout(),
+            max_retries=HTTP_MAX_RETRIES,
+        )
+        clients[api_key] = client
+    return client
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Reports request counts and how often pooled connections were reused."""
+    with _lock:
+        stats = dict(_counters)
+
+    connections_opened = 0
+    pooled_requests = 0
+    hosts = 0
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                hosts += 1
+                connections_opened += pool.num_connections
+                pooled_requests += pool.num_requests
+
+    stats["pooled_hosts"] = hosts
+    stats["connections_opened"] = connections_opened
+    stats["connection_reuse_rate"] = (
+        round(1 - connections_opened / pooled_requests, 4) if pooled_requests else 0.0
+    )
+    stats["openai_clients"] = len(_openai_clients)
+    stats["async_clients"] = len(_async_clients)
+    return stats
@@ -0,0 +1,195 @@
+"""
+Image Render Cache
+Remembers which local file each (prompt, size, quality) render produced so
+generate_image can reuse it instead of paying for another DALL-E call.
+Entries are keyed by a hash of the normalized prompt; reworded prompts are
+matched through a token-set Jaccard index over the cached prompts.
+"""
+
+from typing import Any, Dict, Optional, Set
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "true").lower() == "true"
+IMAGE_CACHE_PATH = os.getenv(
+    "IMAGE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "image_cache.sqlite3"),
+)
+# Prompts whose content-word sets have at least this Jaccard similarity share a render
+IMAGE_CACHE_SIMILARITY = float(os.getenv("IMAGE_CACHE_SIMILARITY", "0.8"))
+
+# Words that don't change what gets drawn
+_STOPWORDS = {
+    "a", "an", "the", "of", "with", "and", "in", "on", "at", "to", "for", "is", "are",
+    "image", "picture", "photo", "please", "create", "generate", "make", "draw", "me",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_renders (
+    key TEXT PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    normalized_prompt TEXT NOT NULL,
+    size TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    image_url TEXT,
+    local_path TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercases a prompt and strips punctuation and repeated whitespace."""
+    return " ".join(re.findall(r"\w+", prompt.lower()))
+
+
+def prompt_tokens(prompt: str) -> Set[str]:
+    """Content words of a prompt, used for near-duplicate matching."""
+    return {token for token in normalize_prompt(prompt).split() if token not in _STOPWORDS}
+
+
+def render_key(prompt: str, size: str, quality: str) -> str:
+    """Content address of a render request."""
+    return hashlib.sha256(f"{normalize_prompt(prompt)}\x00{size}\x00{quality}".encode("utf-8")).hexdigest()
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ImageCache:
+    """SQLite index of past renders with an in-memory token index for fuzzy lookups."""
+
+    def __init__(self, path: str, similarity: float):
+        self.path = path
+        self.similarity = similarity
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        # key -> token set, and token -> keys for every (size, quality) variant
+        self._tokens: Dict[str, Set[str]] = {}
+        self._postings: Dict[tuple, Set[str]] = {}
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            for row in self._conn.execute("SELECT key, prompt, size, quality FROM image_renders"):
+                self._index(row["key"], row["prompt"], row["size"], row["quality"])
+
+    def _index(self, key: str, prompt: str, size: str, quality: str) -> None:
+        tokens = prompt_tokens(prompt)
+        self._tokens[key] = tokens
+        for token in tokens:
+            self._postings.setdefault((size, quality, token), set()).add(key)
+
+    def _unindex(self, key: str, size: str, quality: str) -> None:
+        for token in self._tokens.pop(key, ()):
+            keys = self._postings.get((size, quality, token))
+            if keys is not None:
+                keys.discard(key)
+
+    def _best_near_match(self, prompt: str, size: str, quality: str) -> tuple:
+        """Returns (key, similarity) of the most similar cached prompt, or (None, 0.0)."""
+        tokens = prompt_tokens(prompt)
+        candidates: Set[str] = set()
+        for token in tokens:
+            candidates |= self._postings.get((size, quality, token), set())
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            score = _jaccard(tokens, self._tokens[key])
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key, best_score
+
+    def lookup(self, prompt: str, size: str, quality: str) -> Optional[Dict[str, Any]]:
+        """Returns a cached render for the prompt, or None.
+
+        The result carries 'cache_match' ('exact' or 'similar'), 'similarity'
+        and the 'cached_prompt' that produced the image. Entries whose file
+        has been deleted are dropped.
+        """
+        key = render_key(prompt, size, quality)
+        with self._lock:
+            match, similarity = ("exact", 1.0) if key in self._tokens else ("similar", 0.0)
+            if match == "similar":
+                key, similarity = self._best_near_match(prompt, size, quality)
+                if key is None or similarity < self.similarity:
+                    self.misses += 1
+                    return None
+            row = self._conn.execute("SELECT * FROM image_renders WHERE key = ?", (key,)).fetchone()
+            if row is None or not os.path.exists(row["local_path"]):
+                with self._conn:
+                    self._conn.execute("DELETE FROM image_renders WHERE key = ?", (key,))
+                self._unindex(key, size, quality)
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE image_renders SET hits = hits + 1 WHERE key = ?", (key,))
+            if match == "exact":
+                self.hits += 1
+            else:
+                self.near_hits += 1
+        return {
+            "image_url": row["image_url"],
+            "local_path": row["local_path"],
+            "cached_prompt": row["prompt"],
+            "cache_match": match,
+            "similarity": round(similarity, 3),
+        }
+
+    def store(self, prompt: str, size: str, quality: str, image_url: Optional[str], local_path: str) -> None:
+        """Records the file a render was saved to."""
+        key = render_key(prompt, size, quality)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_renders "
+                "(key, prompt, normalized_prompt, size, quality, image_url, local_path, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, prompt, normalize_prompt(prompt), size, quality, image_url, local_path, time.time()),
+            )
+            self._unindex(key, size, quality)
+            self._index(key, prompt, size, quality)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "path": self.path,
+                "entries": len(self._tokens),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache: Optional[ImageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> Optional[ImageCache]:
+    """Returns the process-wide render cache, or None when IMAGE_CACHE_ENABLED is false."""
+    global _cache
+    if not IMAGE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ImageCache(IMAGE_CACHE_PATH, IMAGE_CACHE_SIMILARITY)
+    return _cache
@@ -0,0 +1,346 @@
+"""
+Image Generation Jobs
+Runs generate_image in a bounded background worker pool so the image agent
+can answer right away with a job id. Job state is kept in SQLite, so queued
+and interrupted jobs are picked up again after a restart.
+"""
+
+from typing import Any, Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+from tools import image_store
+from tools.generate_image import _validate_request, generate_image
+
+# Load environment variables
+load_dotenv()
+
+IMAGE_JOBS_PATH = os.getenv(
+    "IMAGE_JOBS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "image_jobs.sqlite3"),
+)
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "2"))
+# Submissions are refused once this many jobs are queued or running
+IMAGE_JOB_MAX_PENDING = int(os.getenv("IMAGE_JOB_MAX_PENDING", "20"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_jobs (
+    id TEXT PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    size TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    force_new INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error_message TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS image_jobs_status ON image_jobs (status, created_at);
+"""
+
+
+class ImageJobQueue:
+    """SQLite-backed job table plus the worker pool that drains it."""
+
+    def __init__(self, path: str, workers: int, max_pending: int):
+        self.path = path
+        self.max_pending = max_pending
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-job")
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(image_jobs)")}
+            if "force_new" not in columns:
+                self._conn.execute("ALTER TABLE image_jobs ADD COLUMN force_new INTEGER NOT NULL DEFAULT 0")
+            # Jobs that were mid-render when the process stopped start over
+            self._conn.execute(
+                "UPDATE image_jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (QUEUED, time.time(), RUNNING),
+            )
+            pending = [row["id"] for row in self._conn.execute(
+                "SELECT id FROM image_jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            )]
+        for job_id in pending:
+            self._schedule(job_id)
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE image_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _schedule(self, job_id: str) -> None:
+        # Workers inherit the submitter's context (e.g., its scheduler priority)
+        future = self._executor.submit(contextvars.copy_context().run, self._run, job_id)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def _forget(self, job_id: str) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id: str) -> None:
+        job = self.get(job_id)
+        if job is None or job["status"] != QUEUED:
+            return
+        self._update(job_id, status=RUNNING)
+
+        try:
+            result = generate_image(job["prompt"], job["size"], job["quality"], force_new=bool(job["force_new"]))
+        except Exception as e:
+            result = {"status": "error", "error_message": f"Image generation failed: {str(e)}"}
+
+        # A render can't be aborted once sent, so a cancel during it discards the output.
+        # Only an image this job added for itself is deleted: a cache hit or a render
+        # identical to a stored image is someone else's earlier image, and a coalesced
+        # render was also handed to a concurrent identical call.
+        job = self.get(job_id)
+        if job is not None and job["cancel_requested"]:
+            owned = not (result.get("cache_hit") or result.get("deduplicated") or result.get("coalesced"))
+            if result.get("image_id") and owned:
+                image_store.get_image_store().remove(result["image_id"])
+            self._update(job_id, status=CANCELLED)
+        elif result.get("status") == "success":
+            self._update(job_id, status=SUCCEEDED, result=json.dumps(result))
+        else:
+            self._update(job_id, status=FAILED, error_message=result.get("error_message", "Unknown error"))
+
+    def submit(self, prompt: str, size: str, quality: str, force_new: bool = False) -> Dict[str, Any]:
+        """Records a new job and hands it to the worker pool. Returns the job row."""
+        now = time.time()
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock, self._conn:
+            pending = self._conn.execute(
+                "SELECT COUNT(*) FROM image_jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                raise OverflowError(f"{pending} image jobs are already pending")
+            self._conn.execute(
+                "INSERT INTO image_jobs (id, prompt, size, quality, force_new, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, prompt, size, quality, int(force_new), QUEUED, now, now),
+            )
+        self._schedule(job_id)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM image_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def position(self, job_id: str) -> int:
+        """Number of queued jobs ahead of this one."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM image_jobs WHERE status = ? AND created_at < "
+                "(SELECT created_at FROM image_jobs WHERE id = ?)",
+                (QUEUED, job_id),
+            ).fetchone()[0]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancels a queued job now, or flags a running job so its output is discarded."""
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES:
+            return job
+        with self._lock:
+            future = self._futures.get(job_id)
+        if job["status"] == QUEUED and (future is None or future.cancel()):
+            self._update(job_id, status=CANCELLED, cancel_requested=1)
+        else:
+            self._update(job_id, cancel_requested=1)
+        return self.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM image_jobs GROUP BY status").fetchall())
+        return {"path": self.path, "jobs": counts}
+
+
+_queue: Optional[ImageJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> ImageJobQueue:
+    """Returns the process-wide job queue, resuming unfinished jobs on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = ImageJobQueue(IMAGE_JOBS_PATH, IMAGE_JOB_WORKERS, IMAGE_JOB_MAX_PENDING)
+    return _queue
+
+
+def _job_summary(job: Dict[str, Any]) -> Dict[str, Any]:
+    summary = {
+        "status": "success",
+        "job_id": job["id"],
+        "job_status": job["status"],
+        "prompt": job["prompt"],
+        "size": job["size"],
+        "quality": job["quality"],
+    }
+    if job["cancel_requested"] and job["status"] == RUNNING:
+        summary["cancel_requested"] = True
+    if job["status"] == SUCCEEDED and job["result"]:
+        for key in ("image_url", "local_path", "image_id", "image_link", "download_error", "cache_hit", "cached_prompt"):
+            if key in job["result"]:
+                summary[key] = job["result"][key]
+    if job["status"] == FAILED:
+        summary["job_error"] = job["error_message"]
+    return summary
+
+
+def _unknown_job(job_id: str) -> Dict[str, Any]:
+    return {"status": "error", "error_message": f"No image job found with id '{job_id}'.", "job_id": job_id}
+
+
+def submit_image_job(prompt: str, size: str = "1024x1024", quality: str = "standard", force_new: bool = False) -> Dict[str, Any]:
+    """Starts generating an image in the background and returns a job id immediately.
+
+    The image is rendered with OpenAI's DALL-E API and downloaded locally by a
+    background worker. If the same or a very similar prompt was rendered
+    before, the job reuses that image and finishes almost immediately. Use
+    get_image_job_status to check on it and cancel_image_job to abort it.
+
+    Args:
+        prompt (str): A detailed description of the image to generate.
+        size (str): The size of the image. Options: "1024x1024", "1792x1024", "1024x1792".
+                   Defaults to "1024x1024".
+        quality (str): The quality of the image. Options: "standard", "hd".
+                      Defaults to "standard".
+        force_new (bool): Render a new image even if a cached one matches (use when the
+                          user asks for a different take). Defaults to False.
+
+    Returns:
+        Dict[str, Any]: A dictionary with the following structure:
+            - status (str): Either 'success' or 'error'
+            - job_id (str, optional): Id to pass to get_image_job_status and cancel_image_job
+            - job_status (str, optional): 'queued' right after submission
+            - queue_position (int, optional): Jobs waiting ahead of this one
+            - error_message (str, optional): Error description when status is 'error'
+
+    Example:
+        >>> submit_image_job("A futuristic city with flying cars")
+        {
+            'status': 'success',
+            'job_id': '3f9c2a71b0de',
+            'job_status': 'queued',
+            'queue_position': 0,
+            'prompt': 'A futuristic city with flying cars',
+            'size': '1024x1024',
+            'quality': 'standard'
+        }
+    """
+    print(f"--- Tool: submit_image_job called with prompt: {str(prompt)[:50]}... ---")  # Log tool execution
+
+    # Reject bad arguments now rather than in a failed job later
+    error, _ = _validate_request(prompt, size, quality)
+    if error:
+        return error
+
+    queue = get_job_queue()
+    try:
+        job = queue.submit(prompt, size, quality, force_new=force_new)
+    except OverflowError:
+        return {
+            "status": "error",
+            "error_message": "Too many images are already being generated. Please try again shortly.",
+            "prompt": prompt,
+        }
+
+    summary = _job_summary(job)
+    summary["queue_position"] = queue.position(job["id"])
+    return summary
+
+
+def get_image_job_status(job_id: str) -> Dict[str, Any]:
+    """Checks on a background image job started with submit_image_job.
+
+    Args:
+        job_id (str): The id returned by submit_image_job.
+
+    Returns:
+        Dict[str, Any]: A dictionary with the following structure:
+            - status (str): 'success' if the job was found, otherwise 'error'
+            - job_id (str): The job id
+            - job_status (str, optional): 'queued', 'running', 'succeeded', 'failed' or 'cancelled'
+            - queue_position (int, optional): Jobs waiting ahead of this one while queued
+            - image_url (str, optional): URL of the image once succeeded
+            - local_path (str, optional): Local file path of the image once succeeded
+            - image_id (str, optional): Id of the image in the image store
+            - image_link (str, optional): URL of the image on the image server, if configured
+            - cache_hit (bool, optional): True when an earlier render was reused
+            - cached_prompt (str, optional): The prompt that produced the reused image
+            - job_error (str, optional): Why the job failed
+            - error_message (str, optional): Error description when status is 'error'
+
+    Example:
+        >>> get_image_job_status("3f9c2a71b0de")
+        {
+            'status': 'success',
+            'job_id': '3f9c2a71b0de',
+            'job_status': 'succeeded',
+            'image_url': 'https://oaidalleapiprodscus.blob.core.windows.net/...',
+            'local_path': '/path/to/generated_images/3f/9c/3f9c2a71...png',
+            ...
+        }
+    """
+    print(f"--- Tool: get_image_job_status called for job: {job_id} ---")  # Log tool execution
+
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None:
+        return _unknown_job(job_id)
+
+    summary = _job_summary(job)
+    if job["status"] == QUEUED:
+        summary["queue_position"] = queue.position(job_id)
+    return summary
+
+
+def cancel_image_job(job_id: str) -> Dict[str, Any]:
+    """Cancels a background image job started with submit_image_job.
+
+    Queued jobs are cancelled immediately. A job that is already rendering
+    can't be stopped at OpenAI, but its image is discarded when it finishes.
+
+    Args:
+        job_id (str): The id returned by submit_image_job.
+
+    Returns:
+        Dict[str, Any]: The same structure returned by get_image_job_status.
+        A finished job is returned unchanged.
+    """
+    print(f"--- Tool: cancel_image_job called for job: {job_id} ---")  # Log tool execution
+
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        return _unknown_job(job_id)
+    return _job_summary(job)
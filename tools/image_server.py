@@ -0,0 +1,197 @@
+"""
+Generated Image Server
+A small static HTTP endpoint for the image store. Images are served from
+/images/<image_id> or /images/<sha256>.png with zero-copy sendfile transfers,
+strong ETags taken from the stored SHA-256, If-None-Match (304) and
+single-range (206) support. Stored images never change, so responses carry
+long-lived immutable cache headers.
+
+Usage: python -m tools.image_server [--host 127.0.0.1] [--port 8090]
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+import argparse
+import mimetypes
+import os
+import re
+import threading
+from dotenv import load_dotenv
+
+from tools import image_store
+
+# Load environment variables
+load_dotenv()
+
+IMAGE_SERVER_HOST = os.getenv("IMAGE_SERVER_HOST", "127.0.0.1")
+IMAGE_SERVER_PORT = int(os.getenv("IMAGE_SERVER_PORT", "8090"))
+# Public base URL of the server; when set, generate_image results include an image link
+IMAGE_SERVER_URL = os.getenv("IMAGE_SERVER_URL", "").rstrip("/")
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_IMAGE_PATH = re.compile(r"^/images/([0-9a-zA-Z]+)(\.[a-z]+)?$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def image_link(image_id: str) -> Optional[str]:
+    """URL the image server serves an image at, or None when IMAGE_SERVER_URL is unset."""
+    if not IMAGE_SERVER_URL:
+        return None
+    return f"{IMAGE_SERVER_URL}/images/{image_id}"
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parses a single 'bytes=' range into inclusive (start, end) offsets.
+
+    Returns None for a header that should be ignored (malformed or multiple
+    ranges, which are answered with the whole file) and raises ValueError for
+    a range that can't be satisfied.
+    """
+    match = _RANGE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+
+class ImageRequestHandler(BaseHTTPRequestHandler):
+    """Serves stored images by id or hash."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "ImageServer/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _lookup(self) -> Optional[Dict[str, Any]]:
+        match = _IMAGE_PATH.match(self.path.split("?", 1)[0])
+        if match is None:
+            return None
+        key = match.group(1).lower()
+        store = self.server.store
+        return store.get_by_hash(key) if len(key) == 64 else store.get(key)
+
+    def _send_empty(self, status: int, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            # A 304's Content-Length would describe the cached image, not this empty reply
+            self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve(self, send_body: bool) -> None:
+        entry = self._lookup()
+        if entry is None:
+            self._send_empty(404)
+            return
+
+        etag = f'"{entry["sha256"]}"'
+        cache_headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL}
+        if _etag_matches(self.headers.get("If-None-Match", ""), etag):
+            self._send_empty(304, cache_headers)
+            return
+
+        try:
+            f = open(entry["path"], "rb")
+        except FileNotFoundError:
+            # Evicted between the lookup and the open
+            self._send_empty(404)
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            byte_range = None
+            range_header = self.headers.get("Range")
+            if_range = self.headers.get("If-Range")
+            if range_header and (if_range is None or if_range.strip() == etag):
+                try:
+                    byte_range = parse_range(range_header, size)
+                except ValueError:
+                    self._send_empty(416, {"Content-Range": f"bytes */{size}"})
+                    return
+
+            start, end = byte_range or (0, size - 1)
+            length = max(0, end - start + 1)
+            self.send_response(206 if byte_range else 200)
+            self.send_header("Content-Type", mimetypes.guess_type(entry["path"])[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            for name, value in cache_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if send_body and length:
+                self.send_file_range(f, start, length)
+
+    def send_file_range(self, f, offset: int, count: int) -> None:
+        """Copies bytes from the file to the socket in the kernel.
+
+        socket.sendfile() loops over os.sendfile() until `count` bytes are
+        sent, and falls back to plain reads where sendfile isn't available.
+        """
+        self.connection.sendfile(f, offset, count)
+
+
+class ImageServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        store: Optional[image_store.ImageStore] = None,
+        handler=ImageRequestHandler,
+        verbose: bool = False,
+    ):
+        super().__init__(address, handler)
+        self.store = store or image_store.get_image_store()
+        self.verbose = verbose
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ImageServer":
+        """Serves requests from a daemon thread and returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve generated images over HTTP.")
+    parser.add_argument("--host", default=IMAGE_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=IMAGE_SERVER_PORT)
+    args = parser.parse_args()
+
+    server = ImageServer((args.host, args.port), verbose=True)
+    print(f"Serving {server.store.root} at {server.base_url}/images/<image_id>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
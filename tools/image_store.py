@@ -0,0 +1,272 @@
+"""
+Generated Image Store
+Keeps downloaded images in hash-sharded subdirectories of generated_images/
+(ab/cd/<sha256>.png) with a SQLite manifest of prompt, size, quality,
+checksum, byte size and access times. Images are found by id or hash with a
+single indexed lookup, and a disk quota is enforced by evicting the least
+recently used images.
+
+Usage: python -m tools.image_store rebuild [--dir generated_images]
+       python -m tools.image_store stats
+"""
+
+from typing import Any, Dict, Optional
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+IMAGE_STORE_DIR = os.getenv(
+    "GENERATED_IMAGES_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "generated_images"),
+)
+# Least recently used images are evicted once the store grows past this size
+IMAGE_STORE_MAX_BYTES = int(os.getenv("IMAGE_STORE_MAX_BYTES", str(1024 ** 3)))
+
+MANIFEST_NAME = "manifest.sqlite3"
+INCOMING_DIR = ".incoming"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL UNIQUE,
+    prompt TEXT,
+    size TEXT,
+    quality TEXT,
+    bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_last_accessed ON images (last_accessed_at);
+"""
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _prompt_from_filename(filename: str) -> Optional[str]:
+    """Recovers the (truncated) prompt from legacy '<prompt>_<YYYYmmdd>_<HHMMSS>[_id].png' names."""
+    stem = os.path.splitext(filename)[0]
+    match = re.match(r"(.+?)_\d{8}_\d{6}(?:_[0-9a-f]{6})?$", stem)
+    return match.group(1).replace("_", " ") if match else None
+
+
+class ImageStore:
+    """Hash-sharded image directory with a SQLite manifest and an LRU disk quota."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(self.root, INCOMING_DIR), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.root, MANIFEST_NAME), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self.evictions = 0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Lookups touch last_accessed_at; don't fsync on every one (WAL keeps the file consistent)
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM images").fetchone()[0]
+
+    def shard_path(self, sha256: str, extension: str = ".png") -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}{extension}")
+
+    def incoming_path(self, extension: str = ".png") -> str:
+        """A unique path inside the store for a download that add() will then move into place."""
+        return os.path.join(self.root, INCOMING_DIR, f"{uuid.uuid4().hex}{extension}")
+
+    def add(
+        self,
+        path: str,
+        prompt: Optional[str] = None,
+        size: Optional[str] = None,
+        quality: Optional[str] = None,
+        sha256: Optional[str] = None,
+        copy: bool = False,
+    ) -> Dict[str, Any]:
+        """Moves (or with `copy`, copies) a file into its shard and records it. Returns the manifest entry.
+
+        When the content is already stored, the existing entry is returned,
+        marked "deduplicated": True, and a moved file is removed.
+        """
+        sha256 = sha256 or _sha256_file(path)
+        destination = self.shard_path(sha256, os.path.splitext(path)[1].lower() or ".png")
+        now = time.time()
+        with self._lock:
+            existing = self._conn.execute("SELECT * FROM images WHERE sha256 = ?", (sha256,)).fetchone()
+            if existing is not None and os.path.exists(existing["path"]):
+                if not copy and os.path.abspath(path) != existing["path"]:
+                    os.remove(path)
+                with self._conn:
+                    self._conn.execute("UPDATE images SET last_accessed_at = ? WHERE id = ?", (now, existing["id"]))
+                return dict(existing, last_accessed_at=now, deduplicated=True)
+
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            if copy and os.path.abspath(path) != destination:
+                # Copy next to the store first so a partial copy never sits at the shard path
+                incoming = self.incoming_path(os.path.splitext(destination)[1])
+                shutil.copyfile(path, incoming)
+                path = incoming
+            os.replace(path, destination)
+            size_bytes = os.path.getsize(destination)
+            image_id = existing["id"] if existing is not None else uuid.uuid4().hex[:12]
+            with self._conn:
+                if existing is not None:
+                    self._total_bytes -= existing["bytes"]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO images "
+                    "(id, sha256, path, prompt, size, quality, bytes, created_at, last_accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (image_id, sha256, destination, prompt, size, quality, size_bytes, now, now),
+                )
+            self._total_bytes += size_bytes
+            self._evict(keep=image_id)
+            row = self._conn.execute("SELECT * FROM images WHERE id = ?", (image_id,)).fetchone()
+        return dict(row)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Deletes least recently used images until the store fits its quota (lock held)."""
+        while self._total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT id, path, bytes FROM images WHERE id != ? ORDER BY last_accessed_at LIMIT 1",
+                (keep or "",),
+            ).fetchone()
+            if row is None:
+                break
+            if os.path.exists(row["path"]):
+                os.remove(row["path"])
+            with self._conn:
+                self._conn.execute("DELETE FROM images WHERE id = ?", (row["id"],))
+            self._total_bytes -= row["bytes"]
+            self.evictions += 1
+
+    def remove(self, image_id: str) -> bool:
+        """Drops an image's manifest entry and deletes its file.
+
+        Returns:
+            bool: Whether the entry existed.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT id, path, bytes FROM images WHERE id = ?", (image_id,)).fetchone()
+            if row is None:
+                return False
+            with self._conn:
+                self._conn.execute("DELETE FROM images WHERE id = ?", (image_id,))
+            self._total_bytes -= row["bytes"]
+            if os.path.exists(row["path"]):
+                os.remove(row["path"])
+        return True
+
+    def _get(self, column: str, value: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT * FROM images WHERE {column} = ?", (value,)).fetchone()
+            if row is None:
+                return None
+            if not os.path.exists(row["path"]):
+                with self._conn:
+                    self._conn.execute("DELETE FROM images WHERE id = ?", (row["id"],))
+                self._total_bytes -= row["bytes"]
+                return None
+            now = time.time()
+            with self._conn:
+                self._conn.execute("UPDATE images SET last_accessed_at = ? WHERE id = ?", (now, row["id"]))
+        return dict(row, last_accessed_at=now)
+
+    def get(self, image_id: str) -> Optional[Dict[str, Any]]:
+        """Looks up an image by id and marks it as recently used."""
+        return self._get("id", image_id)
+
+    def get_by_hash(self, sha256: str) -> Optional[Dict[str, Any]]:
+        return self._get("sha256", sha256.lower())
+
+    def get_by_path(self, path: str) -> Optional[Dict[str, Any]]:
+        return self._get("path", os.path.abspath(path))
+
+    def rebuild(self) -> Dict[str, int]:
+        """Re-indexes the directory: adds untracked images and drops entries whose
+        files are gone. Safe to run repeatedly.
+
+        Images already in a shard directory are indexed where they are. Legacy
+        images elsewhere (e.g. the flat generated_images/*.png files checked into
+        the repository) are copied into their shard and left in place.
+        """
+        with self._lock, self._conn:
+            missing = [
+                row["id"] for row in self._conn.execute("SELECT id, path FROM images")
+                if not os.path.exists(row["path"])
+            ]
+            self._conn.executemany("DELETE FROM images WHERE id = ?", [(image_id,) for image_id in missing])
+            tracked = {row["path"] for row in self._conn.execute("SELECT path FROM images")}
+
+        # List first: add() moves files into shard directories the walk would revisit
+        untracked = []
+        for directory, subdirectories, filenames in os.walk(self.root):
+            subdirectories[:] = [name for name in subdirectories if name != INCOMING_DIR]
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if filename.lower().endswith(IMAGE_EXTENSIONS) and path not in tracked:
+                    untracked.append(path)
+        added = 0
+        for path in untracked:
+            entry = self.add(path, prompt=_prompt_from_filename(os.path.basename(path)), copy=True)
+            added += not entry.get("deduplicated")
+
+        with self._lock:
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM images").fetchone()[0]
+            self._evict()
+        return {"added": added, "removed_missing": len(missing)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            images = self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+            return {
+                "root": self.root,
+                "images": images,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+_store: Optional[ImageStore] = None
+_store_lock = threading.Lock()
+
+
+def get_image_store() -> ImageStore:
+    """Returns the process-wide image store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ImageStore(IMAGE_STORE_DIR, IMAGE_STORE_MAX_BYTES)
+    return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the generated image store.")
+    parser.add_argument("command", choices=["rebuild", "stats"])
+    parser.add_argument("--dir", default=IMAGE_STORE_DIR, help="Store directory (default: GENERATED_IMAGES_DIR)")
+    args = parser.parse_args()
+
+    store = ImageStore(args.dir, IMAGE_STORE_MAX_BYTES)
+    if args.command == "rebuild":
+        print(json.dumps(store.rebuild(), indent=2))
+    print(json.dumps(store.stats(), indent=2))
@@ -0,0 +1,464 @@
+"""
+Joke Corpus
+Jokes are compiled once into a compact binary file that is memory-mapped, so
+corpora of millions of jokes open instantly and are never held as Python
+objects:
+
+- a category table (name, first joke, joke count), sorted by name; the
+  jokes of a category are contiguous, so it is the category-to-offset index
+- a fixed-size joke table (string offset, joke length, punchline length)
+- the UTF-8 joke and punchline text
+- an inverted index over joke and punchline words: a sorted term table,
+  postings (joke ids and term frequencies) and joke lengths, read as NumPy
+  views of the mapping so BM25 scoring is vectorized per query term
+
+Sessions draw jokes through shuffle bags: a seeded pseudo-random
+permutation of a category plus a position, so no joke repeats until the
+category is exhausted, and the bag state is three integers however large
+the category is.
+
+Usage: python -m tools.joke_corpus build [source] [-o data/jokes.bin]
+       python -m tools.joke_corpus stats
+       python -m tools.joke_corpus search "cats"
+
+The source is a TSV of category, joke and punchline (see data/jokes.tsv).
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import array
+import bisect
+import json
+import math
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+import tempfile
+import threading
+from dotenv import load_dotenv
+
+import numpy as np
+
+# Load environment variables
+load_dotenv()
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+JOKES_SOURCE = os.getenv("JOKES_SOURCE", os.path.join(_DATA_DIR, "jokes.tsv"))
+# Compiled from JOKES_SOURCE on first use, and again whenever the source is newer
+JOKES_PATH = os.getenv("JOKES_PATH", os.path.join(_DATA_DIR, "jokes.bin"))
+
+MAGIC = b"JOK2"
+
+# magic, n_categories, n_jokes, n_terms, n_postings, average joke length in
+# terms, then section offsets: categories, jokes, terms, posting joke ids,
+# posting term frequencies, joke lengths, strings
+_HEADER = struct.Struct("<4sIIIId7Q")
+_HEADER_SIZE = 128
+_CATEGORY = struct.Struct("<IHxxII")  # name offset, name length, first joke, joke count
+_JOKE = struct.Struct("<QHH")  # text offset, joke length, punchline length
+_TERM = struct.Struct("<QHxxII")  # term offset, term length, document frequency, first posting
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Terms in more than this share of jokes (and at least COMMON_TERM_MIN_JOKES)
+# only re-rank jokes found through the query's rarer terms
+COMMON_TERM_FRACTION = 0.05
+COMMON_TERM_MIN_JOKES = 1000
+# A query made only of common terms scores an evenly spaced sample of at most
+# this many postings of its rarest term
+COMMON_TERM_SAMPLE = 20000
+
+_TOKEN = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can did do does for from had has have he her him his how i if in into is it "
+    "its me my no not of on or our she so than that the their them then there they this to too was we were "
+    "what when where which who why will with you your".split()
+)
+
+_MASK64 = (1 << 64) - 1
+_FEISTEL_ROUNDS = 4
+
+
+def normalize_category(category: str) -> str:
+    """Lowercases and drops spaces, so "Office Humor" and "officehumor" match."""
+    return category.lower().replace(" ", "")
+
+
+def _stem(token: str) -> str:
+    """Folds simple English plurals: cats -> cat, boxes -> box, puppies -> puppy."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("sses", "xes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Index terms of a text: casefolded words without stopwords, plurals folded."""
+    words = _TOKEN.findall(text.casefold().replace("'", "").replace("\u2019", ""))
+    return [_stem(word) for word in words if word not in STOPWORDS]
+
+
+def read_jokes(path: str) -> Iterator[Tuple[str, str, str]]:
+    """Yields (category, joke, punchline) from a TSV file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            category, joke, punchline = line.rstrip("\n").split("\t")[:3]
+            yield category, joke, punchline
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def build_corpus(jokes: Iterable[Tuple[str, str, str]], path: str) -> Dict[str, int]:
+    """Compiles jokes into the binary corpus format at `path` (written atomically).
+
+    Jokes keep their source order within a category.
+
+    Returns:
+        Dict[str, int]: categories, jokes, index terms, postings and bytes written.
+    """
+    by_category: Dict[str, List[Tuple[bytes, bytes]]] = {}
+    for category, joke, punchline in jokes:
+        by_category.setdefault(normalize_category(category), []).append(
+            (joke.encode("utf-8")[:0xFFFF], punchline.encode("utf-8")[:0xFFFF])
+        )
+
+    strings = bytearray()
+    category_records = bytearray()
+    joke_records = bytearray()
+    joke_lengths = array.array("H")
+    postings: Dict[str, Tuple[array.array, array.array]] = {}
+    first = 0
+    for category in sorted(by_category):
+        encoded = category.encode("utf-8")
+        category_records += _CATEGORY.pack(len(strings), len(encoded), first, len(by_category[category]))
+        strings += encoded
+        for joke_id, (joke, punchline) in enumerate(by_category[category], start=first):
+            joke_records += _JOKE.pack(len(strings), len(joke), len(punchline))
+            strings += joke
+            strings += punchline
+            terms = tokenize(joke.decode("utf-8", "ignore") + " " + punchline.decode("utf-8", "ignore"))
+            joke_lengths.append(min(len(terms), 0xFFFF))
+            for term, frequency in Counter(terms).items():
+                ids, frequencies = postings.setdefault(term, (array.array("I"), array.array("B")))
+                ids.append(joke_id)
+                frequencies.append(min(frequency, 0xFF))
+        first += len(by_category[category])
+
+    # Terms sorted by text; each term's postings are contiguous and in joke order
+    term_records = bytearray()
+    posting_ids = array.array("I")
+    posting_frequencies = array.array("B")
+    for term in sorted(postings):
+        encoded = term.encode("utf-8")
+        ids, frequencies = postings[term]
+        term_records += _TERM.pack(len(strings), len(encoded), len(ids), len(posting_ids))
+        strings += encoded
+        posting_ids.extend(ids)
+        posting_frequencies.extend(frequencies)
+    average_length = sum(joke_lengths) / len(joke_lengths) if joke_lengths else 0.0
+
+    sections = [
+        category_records, joke_records, term_records,
+        _le(posting_ids), posting_frequencies.tobytes(), _le(joke_lengths), strings,
+    ]
+    offsets, end = [], _HEADER_SIZE
+    for section in sections:
+        end = _align(end)
+        offsets.append(end)
+        end += len(section)
+    header = _HEADER.pack(MAGIC, len(by_category), first, len(postings), len(posting_ids), average_length, *offsets)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.ljust(_HEADER_SIZE, b"\0"))
+            for offset, section in zip(offsets, sections):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(section)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return {"categories": len(by_category), "jokes": first, "terms": len(postings), "postings": len(posting_ids), "bytes": end}
+
+
+def _le(values: array.array) -> bytes:
+    """Integer array as little-endian bytes (the on-disk byte order)."""
+    if sys.byteorder != "little":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class JokeCorpus:
+    """Read-only view of a compiled joke corpus."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic, n_categories, self.n_jokes, self.n_terms, n_postings, self._average_length,
+            categories_off, self._jokes_off, self._terms_off, ids_off, frequencies_off, lengths_off, self._strings_off,
+        ) = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a joke corpus file")
+        # The category table is tiny; keep it as a dict of name -> (first joke, count)
+        self._categories: Dict[str, Tuple[int, int]] = {}
+        for index in range(n_categories):
+            name_offset, name_length, first, count = _CATEGORY.unpack_from(self._mm, categories_off + index * _CATEGORY.size)
+            start = self._strings_off + name_offset
+            self._categories[self._mm[start:start + name_length].decode("utf-8")] = (first, count)
+        self._category_starts = sorted((first, name) for name, (first, _) in self._categories.items())
+        # Zero-copy views of the index sections
+        self._posting_ids = np.frombuffer(self._mm, dtype="<u4", count=n_postings, offset=ids_off)
+        self._posting_frequencies = np.frombuffer(self._mm, dtype=np.uint8, count=n_postings, offset=frequencies_off)
+        self._joke_lengths = np.frombuffer(self._mm, dtype="<u2", count=self.n_jokes, offset=lengths_off)
+
+    def categories(self) -> List[str]:
+        return list(self._categories)
+
+    def span(self, category: str) -> Optional[Tuple[int, int]]:
+        """(first joke index, joke count) of a category, or None if it doesn't exist."""
+        return self._categories.get(normalize_category(category))
+
+    def category_of(self, index: int) -> str:
+        """Category of the joke at `index`."""
+        position = bisect.bisect_right(self._category_starts, (index, "\uffff")) - 1
+        return self._category_starts[position][1]
+
+    def joke(self, index: int) -> Dict[str, str]:
+        offset, joke_length, punchline_length = _JOKE.unpack_from(self._mm, self._jokes_off + index * _JOKE.size)
+        start = self._strings_off + offset
+        middle = start + joke_length
+        return {
+            "joke": self._mm[start:middle].decode("utf-8"),
+            "punchline": self._mm[middle:middle + punchline_length].decode("utf-8"),
+        }
+
+    def _term(self, index: int) -> Tuple[str, int, int]:
+        """Returns (term, document frequency, first posting) of a term table entry."""
+        offset, length, frequency, first = _TERM.unpack_from(self._mm, self._terms_off + index * _TERM.size)
+        start = self._strings_off + offset
+        return self._mm[start:start + length].decode("utf-8"), frequency, first
+
+    def _find_term(self, term: str) -> Optional[Tuple[int, int]]:
+        """(document frequency, first posting) of a term, by bisection."""
+        low, high = 0, self.n_terms
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(middle)[0] < term:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.n_terms:
+            found, frequency, first = self._term(low)
+            if found == term:
+                return frequency, first
+        return None
+
+    def _bm25(self, idf: float, frequencies: np.ndarray, joke_ids: np.ndarray) -> np.ndarray:
+        """BM25 weight of one term in each of the given jokes."""
+        tf = frequencies.astype(np.float32)
+        lengths = self._joke_lengths[joke_ids].astype(np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(self._average_length, 1e-9))
+        return idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+    def search(self, query: str, limit: int = 10) -> Tuple[List[Tuple[int, float]], int]:
+        """Ranks jokes against a free-text query with BM25.
+
+        Terms are scored rarest first. Once the current top `limit` scores
+        beat the most the remaining terms could add, those terms only add to
+        the scores of candidates that can still make the top, instead of
+        bringing in their whole postings (MaxScore pruning, which leaves the
+        ranking unchanged). Very common terms never bring in postings when
+        the query has a rarer term: they only re-rank its matches. A query of
+        only very common terms is scored over a sample of the rarest one's
+        postings, which keeps its cost bounded on large corpora.
+
+        Returns:
+            Tuple[List[Tuple[int, float]], int]: up to `limit` (joke index, score)
+            pairs, best first, and the number of jokes matching any query term
+            (a lower bound when common terms were pruned).
+        """
+        terms = []
+        for term in set(tokenize(query)):
+            found = self._find_term(term)
+            if found is not None:
+                frequency, first = found
+                terms.append((frequency, first, math.log(1 + (self.n_jokes - frequency + 0.5) / (frequency + 0.5))))
+        if not terms:
+            return [], 0
+        terms.sort()
+        cutoff = max(COMMON_TERM_FRACTION * self.n_jokes, COMMON_TERM_MIN_JOKES)
+        common_only = terms[0][0] > cutoff
+        # Terms that bring in their postings; the rest only re-rank
+        generating = sum(1 for frequency, _, _ in terms if frequency <= cutoff) or 1
+        # A term's weight in any joke is below idf * (k1 + 1)
+        remaining_bound = [sum(idf * (BM25_K1 + 1) for _, _, idf in terms[position:]) for position in range(len(terms))]
+
+        matched = np.empty(0, dtype=np.uint32)
+        scores = np.empty(0, dtype=np.float64)
+        total = 0
+        for position, (frequency, first, idf) in enumerate(terms):
+            term_ids = self._posting_ids[first:first + frequency]
+            frequencies = self._posting_frequencies[first:first + frequency]
+            total = max(total, frequency)
+            if common_only and frequency > COMMON_TERM_SAMPLE and position == 0:
+                step = -(-frequency // COMMON_TERM_SAMPLE)
+                term_ids, frequencies = term_ids[::step], frequencies[::step]
+            threshold = np.partition(scores, len(scores) - limit)[len(scores) - limit] if len(scores) > limit else 0.0
+            if position >= generating or remaining_bound[position] < threshold:
+                # Candidates that can't reach the threshold even with every remaining term are dropped
+                keep = scores + remaining_bound[position] >= threshold
+                matched, scores = matched[keep], scores[keep]
+                # Postings are in joke order, so candidates are found by binary search
+                found_at = np.minimum(np.searchsorted(term_ids, matched), frequency - 1)
+                hit = term_ids[found_at] == matched
+                scores[hit] += self._bm25(idf, frequencies[found_at[hit]], matched[hit])
+                continue
+
+            weights = self._bm25(idf, frequencies, term_ids)
+            if not len(matched):
+                matched, scores = term_ids, weights.astype(np.float64)
+            elif len(matched) + frequency > self.n_jokes // 8:
+                # Large unions are cheaper through a dense score array (weights are always positive)
+                dense = np.zeros(self.n_jokes)
+                dense[matched] = scores
+                dense[term_ids] += weights
+                matched = np.flatnonzero(dense)
+                scores = dense[matched]
+            else:
+                # A joke's score is the sum of its terms' weights
+                matched, inverse = np.unique(np.concatenate((matched, term_ids)), return_inverse=True)
+                scores = np.bincount(inverse, weights=np.concatenate((scores, weights)))
+            total = max(total, len(matched))
+
+        top = np.argpartition(-scores, limit - 1)[:limit] if len(scores) > limit else np.arange(len(scores))
+        # Best score first; ties go to the earlier joke
+        top = top[np.lexsort((matched[top], -scores[top]))]
+        return [(int(matched[i]), round(float(scores[i]), 4)) for i in top], total
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "jokes": self.n_jokes,
+            "terms": self.n_terms,
+            "categories": {name: count for name, (_, count) in self._categories.items()},
+            "bytes": len(self._mm),
+        }
+
+
+def _mix(value: int) -> int:
+    """splitmix64 finalizer: a fast, well-distributed 64-bit hash."""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+def shuffled_index(position: int, size: int, seed: int) -> int:
+    """The element at `position` of a seeded pseudo-random permutation of range(size).
+
+    A small Feistel network permutes the smallest even-bit-width domain that
+    covers `size`; values past the end are walked through the permutation
+    again until they land inside it, which keeps it a bijection.
+    """
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    value = position
+    while True:
+        left, right = value >> half_bits, value & mask
+        for round_number in range(_FEISTEL_ROUNDS):
+            left, right = right, left ^ (_mix(seed ^ (round_number << 56) ^ right) & mask)
+        value = (left << half_bits) | right
+        if value < size:
+            return value
+
+
+def new_bag(size: int) -> Dict[str, int]:
+    """A fresh shuffle bag over `size` items; plain ints, so it can live in session state."""
+    return {"size": size, "seed": random.getrandbits(62), "drawn": 0}
+
+
+def draw(bag: Optional[Dict[str, int]], size: int) -> Tuple[int, Dict[str, int], bool]:
+    """Draws the next item of a shuffle bag.
+
+    A missing bag, or one for a different size (the corpus was rebuilt), is
+    replaced, and an exhausted bag is reshuffled.
+
+    Returns:
+        Tuple[int, Dict[str, int], bool]: the item's index in range(size), the
+        updated bag and whether the bag was (re)started by this draw.
+    """
+    restarted = bag is None or bag.get("size") != size or bag.get("drawn", 0) >= size
+    bag = new_bag(size) if restarted else dict(bag)
+    index = shuffled_index(bag["drawn"], size, bag["seed"])
+    bag["drawn"] += 1
+    return index, bag, restarted
+
+
+def _magic(path: str) -> bytes:
+    """Format tag of a compiled file, so files from an older format are rebuilt."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC))
+
+
+_corpus: Optional[JokeCorpus] = None
+_corpus_lock = threading.Lock()
+
+
+def get_joke_corpus() -> JokeCorpus:
+    """Returns the process-wide joke corpus, compiling JOKES_SOURCE if needed."""
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                stale = not os.path.exists(JOKES_PATH) or (
+                    os.path.exists(JOKES_SOURCE)
+                    and os.path.getmtime(JOKES_SOURCE) > os.path.getmtime(JOKES_PATH)
+                ) or _magic(JOKES_PATH) != MAGIC
+                if stale:
+                    build_corpus(read_jokes(JOKES_SOURCE), JOKES_PATH)
+                _corpus = JokeCorpus(JOKES_PATH)
+    return _corpus
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the joke corpus.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="Compile a TSV of category, joke, punchline")
+    build.add_argument("source", nargs="?", default=JOKES_SOURCE)
+    build.add_argument("-o", "--output", default=JOKES_PATH)
+    subcommands.add_parser("stats", help="Show the compiled corpus")
+    search = subcommands.add_parser("search", help="Rank jokes against a query")
+    search.add_argument("query")
+    search.add_argument("-n", "--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(json.dumps(build_corpus(read_jokes(args.source), args.output), indent=2))
+    elif args.command == "stats":
+        print(json.dumps(get_joke_corpus().stats(), indent=2))
+    else:
+        corpus = get_joke_corpus()
+        hits, total = corpus.search(args.query, args.limit)
+        print(json.dumps(
+            {"matches": total, "jokes": [dict(corpus.joke(index), category=corpus.category_of(index), score=score) for index, score in hits]},
+            indent=2, ensure_ascii=False,
+        ))
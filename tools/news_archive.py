@@ -0,0 +1,202 @@
+"""
+Local News Archive
+Persistent SQLite store for every article get_news downloads, with an FTS5
+index over title, description and content. get_news uses it to ask NewsAPI
+only for articles newer than what is already stored, to answer recently
+fetched topics locally, and as a fallback when NewsAPI is slow or down.
+"""
+
+from typing import Any, Dict, List, Optional
+import os
+import re
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+NEWS_ARCHIVE_ENABLED = os.getenv("NEWS_ARCHIVE_ENABLED", "true").lower() == "true"
+NEWS_ARCHIVE_PATH = os.getenv(
+    "NEWS_ARCHIVE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "news_archive.sqlite3"),
+)
+# Topics fetched from NewsAPI within this many seconds are answered from the archive
+NEWS_ARCHIVE_FRESH_SECONDS = float(os.getenv("NEWS_ARCHIVE_FRESH_SECONDS", "900"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    description TEXT,
+    content TEXT,
+    source TEXT,
+    author TEXT,
+    published_at TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_published_at ON articles (published_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, description, content, content='articles', content_rowid='id'
+);
+
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, description, content)
+    VALUES (new.id, new.title, new.description, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, description, content)
+    VALUES ('delete', old.id, old.title, old.description, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, description, content)
+    VALUES ('delete', old.id, old.title, old.description, old.content);
+    INSERT INTO articles_fts (rowid, title, description, content)
+    VALUES (new.id, new.title, new.description, new.content);
+END;
+
+CREATE TABLE IF NOT EXISTS topic_fetches (
+    topic TEXT PRIMARY KEY,
+    last_fetched_at REAL NOT NULL,
+    latest_published_at TEXT
+);
+"""
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+def _fts_query(topic: str) -> Optional[str]:
+    """Turns a free-text topic into an FTS5 query that requires every term."""
+    terms = re.findall(r"\w+", topic.lower())
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms)
+
+
+class NewsArchive:
+    """Thread-safe wrapper around the SQLite article store."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def topic_state(self, topic: str) -> Optional[Dict[str, Any]]:
+        """Returns when a topic was last fetched and its newest stored publishedAt."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_fetched_at, latest_published_at FROM topic_fetches WHERE topic = ?",
+                (normalize_topic(topic),),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def is_fresh(self, topic: str, state: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether a topic was fetched within NEWS_ARCHIVE_FRESH_SECONDS (pass its topic_state to skip the lookup)."""
+        if state is None:
+            state = self.topic_state(topic)
+        return bool(state) and time.time() - state["last_fetched_at"] <= NEWS_ARCHIVE_FRESH_SECONDS
+
+    def store(self, topic: str, articles: List[Dict[str, Any]]) -> int:
+        """Upserts NewsAPI articles and records the fetch. Returns the number of new articles."""
+        now = time.time()
+        rows = [
+            (
+                article.get("url"),
+                article.get("title"),
+                article.get("description"),
+                article.get("content"),
+                (article.get("source") or {}).get("name"),
+                article.get("author"),
+                article.get("publishedAt"),
+                now,
+            )
+            for article in articles
+            if article.get("url")
+        ]
+        latest = max((row[6] for row in rows if row[6]), default=None)
+
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO articles "
+                "(url, title, description, content, source, author, published_at, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            inserted = self._conn.total_changes - before
+            self._conn.execute(
+                "INSERT INTO topic_fetches (topic, last_fetched_at, latest_published_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(topic) DO UPDATE SET last_fetched_at = excluded.last_fetched_at, "
+                "latest_published_at = MAX(COALESCE(topic_fetches.latest_published_at, ''), "
+                "COALESCE(excluded.latest_published_at, ''))",
+                (normalize_topic(topic), now, latest),
+            )
+        return inserted
+
+    def search(self, topic: str, limit: int) -> List[Dict[str, Any]]:
+        """Returns the newest stored articles matching a topic, in NewsAPI article shape."""
+        query = _fts_query(topic)
+        if query is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT a.* FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid "
+                "WHERE articles_fts MATCH ? ORDER BY a.published_at DESC LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        return [
+            {
+                "title": row["title"],
+                "description": row["description"],
+                "url": row["url"],
+                "publishedAt": row["published_at"],
+                "source": {"name": row["source"]},
+                "author": row["author"],
+                "content": row["content"],
+            }
+            for row in rows
+        ]
+
+    def count(self, topic: str) -> int:
+        query = _fts_query(topic)
+        if query is None:
+            return 0
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM articles_fts WHERE articles_fts MATCH ?", (query,)
+            ).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            articles = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            topics = self._conn.execute("SELECT COUNT(*) FROM topic_fetches").fetchone()[0]
+        return {"path": self.path, "articles": articles, "topics": topics}
+
+
+_archive: Optional[NewsArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> Optional[NewsArchive]:
+    """Returns the process-wide archive, or None when NEWS_ARCHIVE_ENABLED is false."""
+    global _archive
+    if not NEWS_ARCHIVE_ENABLED:
+        return None
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = NewsArchive(NEWS_ARCHIVE_PATH)
+    return _archive
@@ -0,0 +1,218 @@
+"""
+Tool Result Shaping
+Trims tool results before they become LLM input on the next model turn:
+per-agent field projection, a token budget, and lower-priority fields
+dropped first. Agents attach `shape_tool_result` as their
+after_tool_callback; tools can also call `shape_result` directly.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import copy
+import json
+import math
+import os
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Default budget for profiles that don't set their own
+TOOL_RESULT_MAX_TOKENS = int(os.getenv("TOOL_RESULT_MAX_TOKENS", "1500"))
+TOOL_RESULT_SHAPING_ENABLED = os.getenv("TOOL_RESULT_SHAPING_ENABLED", "true").lower() == "true"
+
+# Fields that are never projected away
+ALWAYS_KEEP = ("status", "error_message")
+
+
+def estimate_tokens(value: Any) -> int:
+    """Estimates LLM tokens for a JSON-serializable value (about 4 characters per token)."""
+    return math.ceil(len(json.dumps(value, ensure_ascii=False, default=str)) / 4)
+
+
+class ShapingProfile:
+    """How a tool result is shaped for one consuming agent.
+
+    Args:
+        fields (List[str], optional): Top-level keys to keep. None keeps all keys.
+        items_key (str, optional): Key of the list of records (e.g., "articles").
+        item_fields (List[str], optional): Keys to keep on each record. None keeps all keys.
+        trim_order (List[str]): Record keys to drop, lowest priority first, while the
+                                result is over budget.
+        max_tokens (int, optional): Token budget. Defaults to TOOL_RESULT_MAX_TOKENS.
+        max_string_chars (int): Strings on records are truncated to this length as a
+                                last resort before records themselves are dropped.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[List[str]] = None,
+        items_key: Optional[str] = None,
+        item_fields: Optional[List[str]] = None,
+        trim_order: Optional[List[str]] = None,
+        max_tokens: Optional[int] = None,
+        max_string_chars: int = 160,
+    ):
+        self.fields = fields
+        self.items_key = items_key
+        self.item_fields = item_fields
+        self.trim_order = trim_order or []
+        self.max_tokens = max_tokens or TOOL_RESULT_MAX_TOKENS
+        self.max_string_chars = max_string_chars
+
+
+_NEWS_ITEM_FIELDS = ["title", "description", "url", "source", "published_at", "topics", "alternate_sources"]
+_NEWS_TRIM_ORDER = ["alternate_sources", "published_at", "topics", "description"]
+
+# Profiles keyed by (tool name, agent name); "*" matches any agent
+PROFILES: Dict[Tuple[str, str], ShapingProfile] = {
+    ("get_news_async", "social_media_agent_v1"): ShapingProfile(
+        items_key="articles",
+        item_fields=_NEWS_ITEM_FIELDS,
+        trim_order=_NEWS_TRIM_ORDER,
+        max_tokens=1200,
+    ),
+    ("get_news_many", "social_media_agent_v1"): ShapingProfile(
+        items_key="articles",
+        item_fields=_NEWS_ITEM_FIELDS,
+        trim_order=_NEWS_TRIM_ORDER,
+        max_tokens=2400,
+    ),
+    # The image agent already knows the prompt, size and quality it asked for
+    ("generate_image_async", "*"): ShapingProfile(
+        fields=["image_url", "local_path", "image_id", "image_link", "download_error", "cache_hit", "cached_prompt"],
+        max_tokens=300,
+    ),
+    ("generate_images", "*"): ShapingProfile(
+        fields=["requested", "succeeded", "failed", "size", "quality"],
+        items_key="images",
+        item_fields=["index", "prompt", "status", "local_path", "image_id", "image_link", "image_url", "download_error", "error_message", "cache_hit"],
+        trim_order=["cache_hit", "image_url", "prompt"],
+        max_tokens=1200,
+    ),
+    # Job tools: the agent needs the id and progress, not the echoed arguments
+    ("submit_image_job", "*"): ShapingProfile(
+        fields=["job_id", "job_status", "queue_position"],
+        max_tokens=200,
+    ),
+    ("get_image_job_status", "*"): ShapingProfile(
+        fields=[
+            "job_id", "job_status", "queue_position", "cancel_requested",
+            "image_url", "local_path", "image_id", "image_link", "download_error", "cache_hit", "cached_prompt", "job_error",
+        ],
+        max_tokens=300,
+    ),
+    ("cancel_image_job", "*"): ShapingProfile(
+        fields=["job_id", "job_status", "cancel_requested"],
+        max_tokens=200,
+    ),
+    # The report sentence already contains the temperature and conditions
+    ("get_weather", "*"): ShapingProfile(
+        fields=["report", "city"],
+        max_tokens=200,
+    ),
+    # Ranked rows are already compact; drop the country first, then trailing ranks
+    ("get_weather_many", "*"): ShapingProfile(
+        fields=["sort_by", "filter", "units", "requested", "matched", "summary", "not_found", "unavailable"],
+        items_key="results",
+        trim_order=["country"],
+        max_tokens=1200,
+    ),
+}
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def register_profile(tool_name: str, agent_name: str, profile: ShapingProfile) -> None:
+    """Registers (or replaces) the shaping profile for a tool and consuming agent."""
+    PROFILES[(tool_name, agent_name)] = profile
+
+
+def get_profile(tool_name: str, agent_name: Optional[str] = None) -> Optional[ShapingProfile]:
+    return PROFILES.get((tool_name, agent_name or "*")) or PROFILES.get((tool_name, "*"))
+
+
+def _project(record: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return record
+    return {key: value for key, value in record.items() if key in fields or key in ALWAYS_KEEP}
+
+
+def _truncate(value: Any, max_chars: int) -> Any:
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars].rstrip() + "..."
+    return value
+
+
+def shape_result(tool_name: str, result: Dict[str, Any], agent_name: Optional[str] = None) -> Dict[str, Any]:
+    """Shapes a tool result for the consuming agent and records its token cost.
+
+    Steps, stopping as soon as the result fits the profile's budget:
+        1. Project top-level keys and record keys
+        2. Drop record keys in the profile's trim_order
+        3. Truncate long strings on records
+        4. Drop trailing records (at least one is kept)
+
+    Error results and tools without a profile are returned unchanged.
+    """
+    tokens_before = estimate_tokens(result)
+    profile = get_profile(tool_name, agent_name)
+    if not TOOL_RESULT_SHAPING_ENABLED or profile is None or not isinstance(result, dict) or result.get("status") == "error":
+        _record(tool_name, tokens_before, tokens_before)
+        print(f"--- Tool result: {tool_name} ~{tokens_before} tokens ---")  # Log token cost
+        return result
+
+    keep = None if profile.fields is None else profile.fields + ([profile.items_key] if profile.items_key else [])
+    shaped = _project(copy.deepcopy(result), keep)
+    items = shaped.get(profile.items_key) if profile.items_key else None
+    if isinstance(items, list):
+        items = [_project(item, profile.item_fields) if isinstance(item, dict) else item for item in items]
+        shaped[profile.items_key] = items
+
+        for field in profile.trim_order:
+            if estimate_tokens(shaped) <= profile.max_tokens:
+                break
+            for item in items:
+                if isinstance(item, dict):
+                    item.pop(field, None)
+
+        if estimate_tokens(shaped) > profile.max_tokens:
+            for item in items:
+                if isinstance(item, dict):
+                    for key in item:
+                        item[key] = _truncate(item[key], profile.max_string_chars)
+
+        while len(items) > 1 and estimate_tokens(shaped) > profile.max_tokens:
+            items.pop()
+            shaped["items_dropped_for_budget"] = shaped.get("items_dropped_for_budget", 0) + 1
+
+    tokens_after = estimate_tokens(shaped)
+    _record(tool_name, tokens_before, tokens_after)
+    print(f"--- Tool result: {tool_name} ~{tokens_after} tokens (was ~{tokens_before}) ---")  # Log token cost
+    return shaped
+
+
+def shape_tool_result(tool, args: Dict[str, Any], tool_context, tool_response: Any) -> Optional[Dict[str, Any]]:
+    """ADK after_tool_callback that shapes results for the calling agent.
+
+    Returns the shaped result, or None to keep the original response.
+    """
+    if not isinstance(tool_response, dict):
+        return None
+    shaped = shape_result(tool.name, tool_response, getattr(tool_context, "agent_name", None))
+    return shaped if shaped is not tool_response else None
+
+
+def _record(tool_name: str, tokens_before: int, tokens_after: int) -> None:
+    with _stats_lock:
+        stats = _stats.setdefault(tool_name, {"calls": 0, "tokens_before": 0, "tokens_after": 0})
+        stats["calls"] += 1
+        stats["tokens_before"] += tokens_before
+        stats["tokens_after"] += tokens_after
+
+
+def shaping_stats() -> Dict[str, Dict[str, int]]:
+    """Returns per-tool call counts and estimated tokens before and after shaping."""
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
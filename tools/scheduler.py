@@ -0,0 +1,361 @@
+"""
+Upstream Scheduler
+One in-process gate for every upstream call (Gemini, NewsAPI, OpenAI):
+per-upstream token buckets and concurrency caps, with priority classes so
+interactive traffic is served before batch jobs. Works from threads and
+coroutines alike and records queue-wait time per upstream.
+"""
+
+from typing import Any, Dict, Optional
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Priority classes (lower is served first)
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Priority of the current request; runners set it once and it follows the call chain
+_current_priority: contextvars.ContextVar = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+def set_priority(priority: int) -> contextvars.Token:
+    """Sets the priority class for upstream calls made from the current context."""
+    return _current_priority.set(priority)
+
+
+def get_priority() -> int:
+    return _current_priority.get()
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to queue longer than its upstream's max_wait."""
+
+    def __init__(self, upstream: str, wait: float):
+        super().__init__(f"{upstream} rate limit reached; next slot in about {wait:.0f}s")
+        self.upstream = upstream
+        self.wait = wait
+
+
+class UpstreamLimits:
+    """Limits for one upstream.
+
+    Args:
+        rate (float): Token bucket refill rate in calls per second.
+        burst (int): Bucket capacity (calls that can start back to back).
+        max_concurrency (int): Calls allowed in flight at once.
+        max_wait (float): Reject instead of queueing when the estimated wait is longer.
+    """
+
+    def __init__(self, rate: float, burst: int, max_concurrency: int, max_wait: float = 30.0):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_wait = max_wait
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+_newsapi_per_day = _env_float("SCHEDULER_NEWSAPI_PER_DAY", 100)
+_openai_images_per_minute = _env_float("SCHEDULER_OPENAI_IMAGES_PER_MINUTE", 5)
+
+DEFAULT_LIMITS: Dict[str, UpstreamLimits] = {
+    "gemini": UpstreamLimits(
+        rate=_env_float("SCHEDULER_GEMINI_RPM", 60) / 60,
+        burst=int(_env_float("SCHEDULER_GEMINI_BURST", 10)),
+        max_concurrency=int(_env_float("SCHEDULER_GEMINI_CONCURRENCY", 8)),
+        max_wait=60,
+    ),
+    # The bucket holds a full day of quota and refills at the daily rate
+    "newsapi": UpstreamLimits(
+        rate=_newsapi_per_day / 86400,
+        burst=int(_newsapi_per_day),
+        max_concurrency=int(_env_float("SCHEDULER_NEWSAPI_CONCURRENCY", 4)),
+        max_wait=10,
+    ),
+    "openai_images": UpstreamLimits(
+        rate=_openai_images_per_minute / 60,
+        burst=int(_openai_images_per_minute),
+        max_concurrency=int(_env_float("SCHEDULER_OPENAI_IMAGES_CONCURRENCY", 3)),
+        max_wait=90,
+    ),
+    "image_download": UpstreamLimits(rate=50, burst=50, max_concurrency=8),
+    "open_meteo": UpstreamLimits(
+        rate=_env_float("SCHEDULER_OPEN_METEO_RPM", 600) / 60,
+        burst=int(_env_float("SCHEDULER_OPEN_METEO_BURST", 20)),
+        max_concurrency=int(_env_float("SCHEDULER_OPEN_METEO_CONCURRENCY", 8)),
+        max_wait=10,
+    ),
+}
+
+# Upstreams without configured limits are effectively unthrottled but still measured
+_UNLIMITED = UpstreamLimits(rate=1e6, burst=1000000, max_concurrency=1000000)
+
+WAIT_SAMPLES = 1000
+MAX_POLL_SECONDS = 0.5
+
+
+class _Waiter:
+    """A queued acquire() call, woken either through an Event or an asyncio future."""
+
+    __slots__ = ("event", "loop", "future", "granted", "cancelled")
+
+    def __init__(self, event=None, loop=None, future=None):
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.granted = False
+        self.cancelled = False
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _Upstream:
+    def __init__(self, name: str, limits: UpstreamLimits):
+        self.name = name
+        self.limits = limits
+        self.tokens = float(limits.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.active = 0
+        self.queue = []
+        self.granted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.rejected = 0
+        self.penalties = 0
+        self.waits = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITY_NAMES}
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.limits.burst, self.tokens + (now - self.updated) * self.limits.rate)
+        self.updated = now
+
+    def token_delay(self, now: float, needed: float = 1.0) -> float:
+        """Seconds until `needed` tokens are available."""
+        blocked = max(0.0, self.blocked_until - now)
+        deficit = max(0.0, needed - self.tokens)
+        # The bucket keeps refilling while blocked
+        return max(blocked, deficit / self.limits.rate)
+
+
+class UpstreamScheduler:
+    """Priority-aware token bucket and concurrency gate shared by all upstream calls."""
+
+    def __init__(self, limits: Optional[Dict[str, UpstreamLimits]] = None):
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._upstreams: Dict[str, _Upstream] = {}
+        for name, upstream_limits in (limits or {}).items():
+            self.configure(name, upstream_limits)
+
+    def configure(self, name: str, limits: UpstreamLimits) -> None:
+        """Sets (or replaces) the limits for an upstream."""
+        with self._lock:
+            self._upstreams[name] = _Upstream(name, limits)
+
+    def _get(self, name: str) -> _Upstream:
+        upstream = self._upstreams.get(name)
+        if upstream is None:
+            upstream = self._upstreams[name] = _Upstream(name, _UNLIMITED)
+        return upstream
+
+    def _enqueue(self, name: str, waiter: _Waiter, priority: int) -> _Upstream:
+        """Queues a waiter (lock held), rejecting it if the wait would exceed max_wait."""
+        upstream = self._get(name)
+        now = time.monotonic()
+        upstream.refill(now)
+        ahead = sum(1 for entry in upstream.queue if entry[0] <= priority and not entry[2].cancelled)
+        estimated_wait = upstream.token_delay(now, needed=ahead + 1)
+        if estimated_wait > upstream.limits.max_wait:
+            upstream.rejected += 1
+            raise RateLimitExceeded(name, estimated_wait)
+        heapq.heappush(upstream.queue, (priority, next(self._sequence), waiter))
+        self._dispatch(upstream)
+        return upstream
+
+    def _dispatch(self, upstream: _Upstream) -> None:
+        """Grants slots to queued waiters in priority order (lock held)."""
+        now = time.monotonic()
+        upstream.refill(now)
+        while (
+            upstream.queue
+            and upstream.active < upstream.limits.max_concurrency
+            and now >= upstream.blocked_until
+            and upstream.tokens >= 1
+        ):
+            priority, _, waiter = heapq.heappop(upstream.queue)
+            if waiter.cancelled:
+                continue
+            upstream.tokens -= 1
+            upstream.active += 1
+            upstream.granted[priority] = upstream.granted.get(priority, 0) + 1
+            waiter.granted = True
+            waiter.wake()
+
+    def _poll_delay(self, upstream: _Upstream) -> float:
+        """How long a waiter should sleep before re-dispatching if nobody wakes it."""
+        with self._lock:
+            now = time.monotonic()
+            upstream.refill(now)
+            delay = upstream.token_delay(now)
+            if delay == 0 and upstream.active >= upstream.limits.max_concurrency:
+                # The next release grants a slot directly; this is only a safety net
+                return MAX_POLL_SECONDS
+            return max(0.001, delay)
+
+    def _record_wait(self, upstream: _Upstream, priority: int, waited: float) -> None:
+        with self._lock:
+            upstream.waits.setdefault(priority, deque(maxlen=WAIT_SAMPLES)).append(waited)
+
+    def acquire(self, name: str, priority: Optional[int] = None) -> float:
+        """Blocks until a slot is granted. Returns the time spent queued.
+
+        Raises:
+            RateLimitExceeded: If the estimated wait exceeds the upstream's max_wait.
+        """
+        priority = get_priority() if priority is None else priority
+        start = time.monotonic()
+        waiter = _Waiter(event=threading.Event())
+        with self._lock:
+            upstream = self._enqueue(name, waiter, priority)
+
+        while not waiter.granted:
+            waiter.event.wait(self._poll_delay(upstream))
+            with self._lock:
+                self._dispatch(upstream)
+
+        waited = time.monotonic() - start
+        self._record_wait(upstream, priority, waited)
+        return waited
+
+    async def acquire_async(self, name: str, priority: Optional[int] = None) -> float:
+        """Async counterpart of acquire(); waits without blocking the event loop."""
+        priority = get_priority() if priority is None else priority
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop=loop, future=loop.create_future())
+        with self._lock:
+            upstream = self._enqueue(name, waiter, priority)
+
+        try:
+            while not waiter.granted:
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), self._poll_delay(upstream))
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    self._dispatch(upstream)
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.cancelled = True
+                granted = waiter.granted
+            if granted:
+                self.release(name)
+            raise
+
+        waited = time.monotonic() - start
+        self._record_wait(upstream, priority, waited)
+        return waited
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            upstream = self._get(name)
+            upstream.active = max(0, upstream.active - 1)
+            self._dispatch(upstream)
+
+    def penalize(self, name: str, retry_after: float) -> None:
+        """Pauses an upstream for `retry_after` seconds after it answered 429.
+
+        The bucket keeps its tokens: for a daily quota (newsapi), draining it would
+        block calls for hours instead of for the Retry-After the upstream asked for.
+        """
+        with self._lock:
+            upstream = self._get(name)
+            upstream.blocked_until = max(upstream.blocked_until, time.monotonic() + retry_after)
+            upstream.penalties += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            report = {}
+            for name, upstream in self._upstreams.items():
+                upstream.refill(time.monotonic())
+                waits = {}
+                for priority, samples in upstream.waits.items():
+                    if not samples:
+                        continue
+                    ordered = sorted(samples)
+                    waits[PRIORITY_NAMES.get(priority, str(priority))] = {
+                        "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 2),
+                        "max_ms": round(ordered[-1] * 1000, 2),
+                    }
+                report[name] = {
+                    "active": upstream.active,
+                    "queued": sum(1 for entry in upstream.queue if not entry[2].cancelled),
+                    "tokens": round(upstream.tokens, 2),
+                    "granted": {PRIORITY_NAMES.get(p, str(p)): count for p, count in upstream.granted.items()},
+                    "rejected": upstream.rejected,
+                    "penalties": upstream.penalties,
+                    "queue_wait": waits,
+                }
+            return report
+
+
+_scheduler = UpstreamScheduler(DEFAULT_LIMITS)
+
+
+def get_scheduler() -> UpstreamScheduler:
+    return _scheduler
+
+
+@contextmanager
+def slot(name: str, priority: Optional[int] = None):
+    """Holds a slot on an upstream for the duration of a sync call."""
+    _scheduler.acquire(name, priority)
+    try:
+        yield
+    finally:
+        _scheduler.release(name)
+
+
+@asynccontextmanager
+async def slot_async(name: str, priority: Optional[int] = None):
+    """Holds a slot on an upstream for the duration of an async call."""
+    await _scheduler.acquire_async(name, priority)
+    try:
+        yield
+    finally:
+        _scheduler.release(name)
+
+
+def penalize(name: str, retry_after: float) -> None:
+    _scheduler.penalize(name, retry_after)
+
+
+def configure_upstream(name: str, limits: UpstreamLimits) -> None:
+    _scheduler.configure(name, limits)
+
+
+def scheduler_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns per-upstream queue, grant and queue-wait statistics."""
+    return _scheduler.stats()
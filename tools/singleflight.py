@@ -0,0 +1,176 @@
+"""
+Request Coalescing (single-flight)
+Concurrent identical tool calls wait on one upstream request and share its
+result. Works across threads and coroutines: sync and async variants of a
+tool can join the same in-flight call when they use the same group name.
+"""
+
+from typing import Any, Callable, Dict, Hashable, Optional
+import asyncio
+import concurrent.futures
+import copy
+import functools
+import inspect
+import threading
+
+from tools.cache import make_key
+
+# Registry of every group created through @single_flight, keyed by name
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+class _Call:
+    """An in-flight upstream call that other callers can wait on."""
+
+    def __init__(self):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.thread_id = threading.get_ident()
+        self.followers = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key.
+
+    With `mark_shared`, dict results that reached more than one caller come
+    back with "coalesced": True for the leader and every follower, so callers
+    that clean up after themselves know the result isn't theirs alone.
+    """
+
+    def __init__(self, name: str, mark_shared: bool = False):
+        self.name = name
+        self.mark_shared = mark_shared
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join_or_lead(self, key: Hashable, allow_same_thread: bool) -> tuple:
+        """Returns (call, is_leader)."""
+        with self._lock:
+            call = self._calls.get(key)
+            # A sync caller can't block on a call led from its own thread (that would
+            # deadlock the event loop or re-enter itself), so it runs independently
+            if call is not None and (allow_same_thread or call.thread_id != threading.get_ident()):
+                self.coalesced += 1
+                call.followers += 1
+                return call, False
+            call = _Call()
+            if key not in self._calls:
+                self._calls[key] = call
+            self.leaders += 1
+            return call, True
+
+    def _finish(self, key: Hashable, call: _Call) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def _shared(self, result: Any) -> Any:
+        if self.mark_shared and isinstance(result, dict):
+            return {**result, "coalesced": True}
+        return result
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Runs `fn` unless an identical call is in flight, in which case waits for it."""
+        call, is_leader = self._join_or_lead(key, allow_same_thread=False)
+        if not is_leader:
+            try:
+                return self._shared(copy.deepcopy(call.future.result()))
+            except concurrent.futures.CancelledError:
+                return self.do(key, fn)  # The leader was cancelled; try again
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.future.set_exception(e)
+            raise
+        else:
+            call.future.set_result(result)
+        finally:
+            self._finish(key, call)
+        # Nobody joins a finished call, so the follower count is final
+        return self._shared(result) if call.followers else result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Async counterpart of do(); `fn` returns an awaitable."""
+        call, is_leader = self._join_or_lead(key, allow_same_thread=True)
+        if not is_leader:
+            try:
+                # Shield so a cancelled follower doesn't cancel the shared call
+                result = await asyncio.shield(asyncio.wrap_future(call.future))
+                return self._shared(copy.deepcopy(result))
+            except asyncio.CancelledError:
+                if call.future.cancelled():
+                    return await self.do_async(key, fn)  # The leader was cancelled; try again
+                raise
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.future.cancel()
+            raise
+        except BaseException as e:
+            call.future.set_exception(e)
+            raise
+        else:
+            call.future.set_result(result)
+        finally:
+            self._finish(key, call)
+        return self._shared(result) if call.followers else result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return {
+                "in_flight": len(self._calls),
+                "upstream_calls": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_rate": round(self.coalesced / total, 4) if total else 0.0,
+            }
+
+
+def single_flight(
+    name: str,
+    normalize: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    mark_shared: bool = False,
+) -> Callable:
+    """Decorator that coalesces concurrent identical calls to a tool.
+
+    Keys are built from the bound arguments, optionally passed through
+    `normalize` (same contract as CachePolicy.normalize). Sync and async
+    functions decorated with the same `name` share in-flight calls.
+    `mark_shared` is passed to SingleFlight.
+    """
+    def decorator(func: Callable) -> Callable:
+        group = _groups.setdefault(name, SingleFlight(name, mark_shared))
+        signature = inspect.signature(func)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    key = make_key(signature, normalize, args, kwargs)
+                except TypeError:
+                    return await func(*args, **kwargs)
+                return await group.do_async(key, lambda: func(*args, **kwargs))
+
+            async_wrapper.single_flight = group
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = make_key(signature, normalize, args, kwargs)
+            except TypeError:
+                return func(*args, **kwargs)
+            return group.do(key, lambda: func(*args, **kwargs))
+
+        wrapper.single_flight = group
+        return wrapper
+
+    return decorator
+
+
+def single_flight_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns upstream and coalesced call counts for every single-flight group."""
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,248 @@
+"""
+Template Answers
+Opt-in zero-LLM path for requests whose answer is fully determined by one
+tool call ("weather in Paris", "tell me two dad jokes"). Otherwise such a
+turn pays a model call to pick the tool and another to rephrase a result
+that is already a finished sentence. Agents attach `answer_from_template` as
+their before_model_callback; when the user's message matches a known
+pattern for one of the agent's tools:
+
+1. the agent's first model call is answered with the tool call the model
+   would have made, and ADK runs the tool as usual (tool callbacks, result
+   shaping, events);
+2. the next model call is answered by rendering the tool result with a local
+   template instead of asking the model to rephrase it. Error results go to
+   the model, which can explain them or ask the user to rephrase.
+
+The session records the same events as a model-driven turn (function call,
+function response, final text), so the ADK web UI and session history are
+unchanged; template responses carry custom_metadata {"template_answer": tool}.
+Anything that doesn't match goes to the model as before.
+
+Enable with TEMPLATE_ANSWERS_ENABLED=true. template_stats() reports the share
+of user turns answered this way.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import os
+import re
+import threading
+from dotenv import load_dotenv
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from tools import joke_corpus
+from tools.gazetteer import get_gazetteer
+
+# Load environment variables
+load_dotenv()
+
+TEMPLATE_ANSWERS_ENABLED = os.getenv("TEMPLATE_ANSWERS_ENABLED", "false").lower() == "true"
+
+# Invocation-scoped state key ("temp:" is never persisted) for a templated tool call in flight
+TEMPLATE_STATE_KEY = "temp:template_answer"
+# User turns remembered for de-duplicating stats (several agents can see one turn)
+_RECENT_TURNS = 4096
+
+_WEATHER_PATTERNS = [
+    re.compile(
+        r"^(?:(?:what(?:'s| is)|whats|how(?:'s| is)) (?:the )?(?:current )?(?:weather|temperature|temp)(?: like)?"
+        r"|(?:current )?(?:weather|temperature|temp)(?: report| check)?"
+        r"|(?:tell me|give me|show me|get|check) the (?:current )?(?:weather|temperature))"
+        r" (?:in|for|at) (?P<city>.+)$"
+    ),
+    re.compile(r"^(?:weather|temperature|temp) (?P<city>[a-z].*)$"),
+]
+# Cities followed by these are questions the template can't answer (several cities, forecasts, units)
+_WEATHER_REJECT = re.compile(r"\b(and|or|vs|versus|tomorrow|tonight|week|weekend|forecast|fahrenheit|celsius)\b|[,;&/]")
+_TRAILING = re.compile(r"(?:\s+(?:please|pls|today|right now|now|currently|at the moment))+$")
+
+_JOKE_PREFIXES = (
+    "please ", "tell me ", "give me ", "can you tell me ", "could you tell me ", "can i have ", "can i hear ",
+    "i want ", "i need ", "i'd like ", "hit me with ", "share ", "got ", "do you have ", "do you know ", "any ",
+)
+_JOKE_PATTERN = re.compile(
+    r"^(?:(?P<count>a|an|one|two|three|four|five|[1-5]|some|a few) )?(?:(?P<category>[a-z]+) )?"
+    r"(?:jokes?|puns?)(?: about (?P<topic>.+))?$"
+)
+_JOKE_COUNTS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "some": 3, "a few": 3}
+# Words in "a good joke" that don't name a category
+_JOKE_FILLER = frozenset("good funny random quick short new great best silly little another".split())
+
+
+def _clean(text: str) -> str:
+    text = re.sub(r"\s+", " ", text.strip().lower()).strip(" ?!.")
+    return _TRAILING.sub("", text).strip(" ?!.,")
+
+
+def match_weather(text: str) -> Optional[Dict[str, Any]]:
+    """get_weather arguments for "what's the weather in Paris?" and similar, or None.
+
+    Only exact or alias gazetteer matches are templated, so "temperature of the
+    sun", "weather in Paris compared to London" and typos the gazetteer would
+    guess at ("weather in Tokio") still go to the model.
+    """
+    text = _clean(text)
+    for pattern in _WEATHER_PATTERNS:
+        match = pattern.match(text)
+        if match and not _WEATHER_REJECT.search(match.group("city")):
+            place = get_gazetteer().lookup(match.group("city"))
+            if place is not None and place["match"] != "fuzzy":
+                return {"city": place["name"]}
+    return None
+
+
+def match_jokes(text: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(tool, arguments) for "tell me two dad jokes", "a joke about cats" and similar, or None."""
+    text = _clean(text)
+    if text in ("make me laugh", "joke", "jokes"):
+        return "get_jokes", {"category": "general", "count": 1}
+    for prefix in _JOKE_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+    match = _JOKE_PATTERN.match(text)
+    if match is None:
+        return None
+    count = _JOKE_COUNTS.get(match.group("count") or "a") or int(match.group("count"))
+    category = match.group("category")
+    if category in _JOKE_FILLER:
+        category = None
+    if match.group("topic"):
+        return ("search_jokes", {"query": match.group("topic"), "count": count}) if category is None else None
+    if category is not None and joke_corpus.get_joke_corpus().span(category) is None:
+        return None
+    return "get_jokes", {"category": category or "general", "count": count}
+
+
+def _render_weather(result: Dict[str, Any]) -> Optional[str]:
+    return result.get("report")
+
+
+def _render_jokes(result: Dict[str, Any]) -> Optional[str]:
+    jokes = result.get("jokes") or []
+    if not jokes:
+        return None
+    if result.get("match") == "search":
+        intro = f"Here's a joke about {result['query']}:" if len(jokes) == 1 else f"Here are {len(jokes)} jokes about {result['query']}:"
+    else:
+        kind = "" if result.get("category") in (None, "general") else f"{result['category']} "
+        article = "an" if kind[:1] in ("a", "e", "i", "o", "u") else "a"
+        intro = f"Here's {article} {kind}joke:" if len(jokes) == 1 else f"Here are {len(jokes)} {kind}jokes:"
+    return "\n\n".join([intro] + [f"{joke['joke']}\n{joke['punchline']}" for joke in jokes])
+
+
+def _jokes_arguments(text: str, tool: str) -> Optional[Dict[str, Any]]:
+    matched = match_jokes(text)
+    return matched[1] if matched is not None and matched[0] == tool else None
+
+
+# Tool name -> (match the user's message to arguments, render the tool result or None to ask the model)
+TEMPLATES: Dict[str, Tuple[Callable[[str], Optional[Dict[str, Any]]], Callable[[Dict[str, Any]], Optional[str]]]] = {
+    "get_weather": (match_weather, _render_weather),
+    "get_jokes": (lambda text: _jokes_arguments(text, "get_jokes"), _render_jokes),
+    "search_jokes": (lambda text: _jokes_arguments(text, "search_jokes"), _render_jokes),
+}
+
+
+_stats_lock = threading.Lock()
+_turns: "OrderedDict[str, bool]" = OrderedDict()
+_counts = {"turns": 0, "served": 0}
+
+
+def _record_turn(invocation_id: str, served: bool = False) -> None:
+    """Counts a user turn once, however many agents see it."""
+    with _stats_lock:
+        if invocation_id not in _turns:
+            _turns[invocation_id] = False
+            _counts["turns"] += 1
+            if len(_turns) > _RECENT_TURNS:
+                _turns.popitem(last=False)
+        if served and not _turns[invocation_id]:
+            _turns[invocation_id] = True
+            _counts["served"] += 1
+
+
+def template_stats() -> Dict[str, Any]:
+    """User turns seen, turns answered from a template, and the fraction served.
+
+    A turn counts as served once its tool result is rendered; templated tool
+    calls whose result went back to the model don't count.
+    """
+    with _stats_lock:
+        turns, served = _counts["turns"], _counts["served"]
+    return {
+        "enabled": TEMPLATE_ANSWERS_ENABLED,
+        "turns": turns,
+        "served": served,
+        "served_fraction": round(served / turns, 3) if turns else 0.0,
+    }
+
+
+def _text(content: Optional[types.Content]) -> str:
+    if content is None or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text).strip()
+
+
+def _first_call(llm_request: LlmRequest, text: str) -> bool:
+    """Whether the agent hasn't acted on the user's message yet.
+
+    Other agents' events (e.g. the coordinator's transfer) follow the message
+    as user-role context text; the agent's own turns are model content or
+    function responses.
+    """
+    for content in reversed(llm_request.contents):
+        if content.role != "user" or any(part.function_response for part in content.parts or []):
+            return False
+        if _text(content) == text:
+            return True
+    return False
+
+
+def _response(part: types.Part, tool: str) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[part]), custom_metadata={"template_answer": tool})
+
+
+def answer_from_template(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """ADK before_model_callback that answers matching requests without the model.
+
+    Returns:
+        Optional[LlmResponse]: The tool call or the rendered answer, or None to call the model.
+    """
+    if not TEMPLATE_ANSWERS_ENABLED:
+        return None
+    _record_turn(callback_context.invocation_id)
+    pending = callback_context.state.get(TEMPLATE_STATE_KEY)
+    last = llm_request.contents[-1] if llm_request.contents else None
+
+    # Second call: the templated tool has run; render its result (errors go to the model)
+    if pending and pending.get("agent") == callback_context.agent_name and last is not None:
+        for part in last.parts or []:
+            response = part.function_response
+            if response is not None and response.name == pending["tool"]:
+                callback_context.state[TEMPLATE_STATE_KEY] = None
+                result = response.response or {}
+                answer = None if result.get("status") == "error" else TEMPLATES[pending["tool"]][1](result)
+                if not answer:
+                    return None
+                _record_turn(callback_context.invocation_id, served=True)
+                return _response(types.Part(text=answer), pending["tool"])
+        return None
+
+    # First call for a new user message: make the tool call the model would have made
+    text = _text(callback_context.user_content)
+    if not text or not _first_call(llm_request, text):
+        return None
+    for tool, (match, _) in TEMPLATES.items():
+        if tool not in llm_request.tools_dict:
+            continue
+        arguments = match(text)
+        if arguments is not None:
+            callback_context.state[TEMPLATE_STATE_KEY] = {"agent": callback_context.agent_name, "tool": tool}
+            print(f"--- Template: {tool}({arguments}) ---")  # Log templated answer
+            return _response(types.Part(function_call=types.FunctionCall(name=tool, args=arguments)), tool)
+    return None
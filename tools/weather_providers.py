@@ -0,0 +1,219 @@
+"""
+Weather Providers
+Backends behind get_weather: the built-in mock and an Open-Meteo compatible
+HTTP API. Observations are cached per geohash cell and time bucket, so nearby
+places and repeated questions within a bucket share one upstream call, and
+the latency of every provider call is recorded.
+"""
+
+from typing import Any, Dict, Hashable, Optional
+from abc import ABC, abstractmethod
+from collections import deque
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from tools import http_client
+from tools.cache import CachePolicy, ToolCache
+from tools.singleflight import SingleFlight
+
+# Load environment variables
+load_dotenv()
+
+# "mock" or "open_meteo"
+WEATHER_PROVIDER = os.getenv("WEATHER_PROVIDER", "mock")
+OPEN_METEO_BASE_URL = os.getenv("OPEN_METEO_BASE_URL", "https://api.open-meteo.com/v1/forecast")
+# Geohash length of a cache cell: 5 characters is roughly 5 x 5 km
+WEATHER_CELL_PRECISION = int(os.getenv("WEATHER_CELL_PRECISION", "5"))
+WEATHER_BUCKET_SECONDS = int(os.getenv("WEATHER_BUCKET_SECONDS", "600"))
+LATENCY_SAMPLES = 1000
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# WMO weather interpretation codes used by Open-Meteo
+WMO_CONDITIONS = {
+    0: "clear", 1: "mainly clear", 2: "partly cloudy", 3: "overcast",
+    45: "foggy", 48: "foggy",
+    51: "light drizzle", 53: "drizzle", 55: "heavy drizzle", 56: "freezing drizzle", 57: "freezing drizzle",
+    61: "light rain", 63: "rain", 65: "heavy rain", 66: "freezing rain", 67: "freezing rain",
+    71: "light snow", 73: "snow", 75: "heavy snow", 77: "snow grains",
+    80: "rain showers", 81: "rain showers", 82: "violent rain showers", 85: "snow showers", 86: "snow showers",
+    95: "thunderstorms", 96: "thunderstorms with hail", 99: "thunderstorms with hail",
+}
+
+
+def geohash(latitude: float, longitude: float, precision: int) -> str:
+    """Standard base-32 geohash of a coordinate."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+class WeatherProvider(ABC):
+    """Interface for weather backends."""
+
+    name = "base"
+
+    @abstractmethod
+    def observe(self, place: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Current weather at a gazetteer place.
+
+        Returns:
+            Optional[Dict[str, Any]]: temperature_c (float), conditions (str) and
+            weather_code (WMO code, int), or None if the provider has no data
+            for the place.
+
+        Raises:
+            Exception: If the upstream call failed.
+        """
+
+
+class MockWeatherProvider(WeatherProvider):
+    """Fixed observations for a handful of cities, keyed by (name, country)."""
+
+    name = "mock"
+
+    OBSERVATIONS = {
+        ("New York", "US"): {"temperature_c": 25, "conditions": "sunny", "weather_code": 0},
+        ("London", "GB"): {"temperature_c": 15, "conditions": "cloudy", "weather_code": 3},
+        ("Tokyo", "JP"): {"temperature_c": 18, "conditions": "light rain", "weather_code": 61},
+        ("Paris", "FR"): {"temperature_c": 22, "conditions": "partly cloudy", "weather_code": 2},
+        ("Sydney", "AU"): {"temperature_c": 28, "conditions": "clear and sunny", "weather_code": 0},
+    }
+
+    def observe(self, place: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        observation = self.OBSERVATIONS.get((place["name"], place["country"]))
+        return dict(observation) if observation else None
+
+
+class OpenMeteoProvider(WeatherProvider):
+    """Current conditions from the Open-Meteo forecast API (no API key needed)."""
+
+    name = "open_meteo"
+
+    def __init__(self, base_url: str = OPEN_METEO_BASE_URL):
+        self.base_url = base_url
+
+    def observe(self, place: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = http_client.get(
+            self.base_url,
+            params={
+                "latitude": place["latitude"],
+                "longitude": place["longitude"],
+                "current": "temperature_2m,weather_code",
+            },
+            upstream="open_meteo",
+        )
+        response.raise_for_status()
+        current = response.json().get("current")
+        if not current or current.get("temperature_2m") is None:
+            return None
+        code = current.get("weather_code")
+        return {
+            "temperature_c": current["temperature_2m"],
+            "conditions": WMO_CONDITIONS.get(code, "unknown conditions"),
+            "weather_code": code,
+        }
+
+
+PROVIDERS = {provider.name: provider for provider in (MockWeatherProvider, OpenMeteoProvider)}
+
+_cells = ToolCache(CachePolicy(
+    name="weather_cells",
+    ttl=WEATHER_BUCKET_SECONDS,
+    max_entries=4096,
+    cache_if=lambda observation: observation is not None,
+))
+_flights = SingleFlight("weather_cells")
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def _record(provider: str, seconds: float, ok: bool) -> None:
+    with _stats_lock:
+        stats = _stats.setdefault(provider, {"calls": 0, "errors": 0, "latencies": deque(maxlen=LATENCY_SAMPLES)})
+        stats["calls"] += 1
+        if ok:
+            stats["latencies"].append(seconds)
+        else:
+            stats["errors"] += 1
+
+
+def cell_key(provider: WeatherProvider, place: Dict[str, Any], now: Optional[float] = None) -> Hashable:
+    """(provider, geohash cell, time bucket) a place's observation is cached under."""
+    bucket = int((time.time() if now is None else now) // WEATHER_BUCKET_SECONDS)
+    return provider.name, geohash(place["latitude"], place["longitude"], WEATHER_CELL_PRECISION), bucket
+
+
+def current_weather(place: Dict[str, Any], provider: Optional[WeatherProvider] = None) -> Optional[Dict[str, Any]]:
+    """Current weather at a place, from the cell cache or the provider.
+
+    Concurrent misses for the same cell share one provider call.
+    """
+    provider = provider or get_weather_provider()
+    key = cell_key(provider, place)
+    state, observation = _cells.lookup(key)
+    if state == "fresh":
+        return observation
+
+    def fetch() -> Optional[Dict[str, Any]]:
+        start = time.perf_counter()
+        try:
+            result = provider.observe(place)
+        except Exception:
+            _record(provider.name, time.perf_counter() - start, ok=False)
+            raise
+        _record(provider.name, time.perf_counter() - start, ok=True)
+        _cells.store(key, result)
+        return result
+
+    return _flights.do(key, fetch)
+
+
+def provider_stats() -> Dict[str, Any]:
+    """Per-provider call counts and latency, plus cell cache counters."""
+    with _stats_lock:
+        report = {}
+        for name, stats in _stats.items():
+            latencies = sorted(stats["latencies"])
+            entry = {"calls": stats["calls"], "errors": stats["errors"]}
+            if latencies:
+                entry.update(
+                    avg_ms=round(1000 * sum(latencies) / len(latencies), 2),
+                    p50_ms=round(1000 * latencies[int(0.5 * (len(latencies) - 1))], 2),
+                    p95_ms=round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2),
+                    max_ms=round(1000 * latencies[-1], 2),
+                )
+            report[name] = entry
+    return {"providers": report, "cells": _cells.stats()}
+
+
+_provider: Optional[WeatherProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_weather_provider() -> WeatherProvider:
+    """Returns the process-wide provider selected by WEATHER_PROVIDER."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                if WEATHER_PROVIDER not in PROVIDERS:
+                    raise ValueError(f"Unknown WEATHER_PROVIDER '{WEATHER_PROVIDER}'; expected one of {sorted(PROVIDERS)}")
+                _provider = PROVIDERS[WEATHER_PROVIDER]()
+    return _provider
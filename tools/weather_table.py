@@ -0,0 +1,202 @@
+"""
+Weather Table
+Columnar NumPy table of current observations behind get_weather_many. City
+ids, numeric temperatures and WMO condition codes are kept in parallel
+arrays, so ranking, filtering, unit conversion and aggregation over many
+cities are each one vectorized operation.
+
+Filters are small expressions over the columns, joined with "and":
+    temperature > 20            (in the requested units, or "> 68F" / "> 20C")
+    conditions = rain           (also "!=", several groups as "rain/snow")
+    rain, not snow              (shorthand for conditions = / != group)
+    country = JP
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+import operator
+import re
+
+import numpy as np
+
+# Condition groups the filter and summary use, derived from WMO codes
+CONDITION_GROUPS = ("clear", "cloudy", "fog", "rain", "snow", "storm", "unknown")
+_UNKNOWN = CONDITION_GROUPS.index("unknown")
+_GROUP_RANGES = {
+    "clear": [(0, 1)],
+    "cloudy": [(2, 3)],
+    "fog": [(45, 48)],
+    "rain": [(51, 67), (80, 82)],
+    "snow": [(71, 77), (85, 86)],
+    "storm": [(95, 99)],
+}
+_GROUP_OF_CODE = np.full(100, _UNKNOWN, dtype=np.int8)
+for _group, _ranges in _GROUP_RANGES.items():
+    for _low, _high in _ranges:
+        _GROUP_OF_CODE[_low:_high + 1] = CONDITION_GROUPS.index(_group)
+
+SORT_KEYS = ("warmest", "coldest", "name", "population")
+UNITS = ("C", "F")
+
+_OPERATORS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "=": operator.eq, "==": operator.eq, "!=": operator.ne,
+}
+_CLAUSE = re.compile(r"^(temperature|temp|conditions|condition|country)\s*(>=|<=|!=|==|=|>|<)\s*(.+)$")
+_TEMPERATURE = re.compile(r"^(-?\d+(?:\.\d+)?)\s*°?\s*([cf])?$")
+
+
+def parse_units(units: str) -> str:
+    """'C' or 'F' from "C", "celsius", "F", "fahrenheit" (any case)."""
+    unit = (units or "C").strip()[:1].upper()
+    if unit not in UNITS:
+        raise ValueError(f"Unknown units '{units}'. Use 'C' or 'F'.")
+    return unit
+
+
+def _groups(value: str) -> List[int]:
+    groups = []
+    for name in re.split(r"[/|]", value):
+        name = name.strip()
+        if name not in CONDITION_GROUPS:
+            raise ValueError(f"Unknown conditions '{name}'. Use one of: {', '.join(CONDITION_GROUPS)}.")
+        groups.append(CONDITION_GROUPS.index(name))
+    return groups
+
+
+def parse_filter(expression: str, units: str = "C") -> List[Callable[["WeatherTable"], np.ndarray]]:
+    """Compiles a filter expression into column predicates.
+
+    Raises:
+        ValueError: If the expression can't be parsed.
+    """
+    predicates = []
+    for clause in re.split(r"\s+and\s+|,|;", (expression or "").strip().lower()):
+        clause = clause.strip()
+        if not clause:
+            continue
+        negated = clause.startswith(("not ", "no "))
+        bare = clause.split(None, 1)[1] if negated else clause
+        if bare in CONDITION_GROUPS:
+            clause = f"conditions {'!=' if negated else '='} {bare}"
+
+        match = _CLAUSE.match(clause)
+        if match is None:
+            raise ValueError(f"Can't understand filter '{clause}'. Try 'temperature > 20' or 'conditions = rain'.")
+        column, symbol, value = match.group(1), match.group(2), match.group(3).strip()
+        compare = _OPERATORS[symbol]
+
+        if column in ("temperature", "temp"):
+            number = _TEMPERATURE.match(value)
+            if number is None:
+                raise ValueError(f"'{value}' is not a temperature.")
+            threshold, unit = float(number.group(1)), (number.group(2) or units).upper()
+            predicates.append(lambda table, compare=compare, threshold=threshold, unit=unit: compare(table.temperature(unit), threshold))
+            continue
+
+        if symbol not in ("=", "==", "!="):
+            raise ValueError(f"'{column}' can only be compared with = or !=.")
+        if column == "country":
+            predicates.append(lambda table, compare=compare, value=value.upper(): compare(table.country, value))
+        else:
+            groups = _groups(value)
+            member = (lambda table, groups=groups: np.isin(table.condition_groups(), groups))
+            predicates.append(member if symbol != "!=" else (lambda table, member=member: ~member(table)))
+    return predicates
+
+
+class WeatherTable:
+    """One row per city; every attribute is a column array of the same length."""
+
+    def __init__(
+        self,
+        city_id: np.ndarray,
+        name: np.ndarray,
+        country: np.ndarray,
+        population: np.ndarray,
+        temperature_c: np.ndarray,
+        weather_code: np.ndarray,
+        conditions: np.ndarray,
+    ):
+        self.city_id = city_id
+        self.name = name
+        self.country = country
+        self.population = population
+        self.temperature_c = temperature_c
+        self.weather_code = weather_code
+        self.conditions = conditions
+
+    @classmethod
+    def from_observations(cls, rows: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> "WeatherTable":
+        """Builds the table from (gazetteer place, provider observation) pairs."""
+        count = len(rows)
+        code = (observation.get("weather_code") for _, observation in rows)
+        return cls(
+            city_id=np.fromiter((place["id"] for place, _ in rows), dtype=np.int32, count=count),
+            name=np.array([place["name"] for place, _ in rows], dtype=str),
+            country=np.array([place["country"] for place, _ in rows], dtype=str),
+            population=np.fromiter((place["population"] for place, _ in rows), dtype=np.int64, count=count),
+            temperature_c=np.fromiter((observation["temperature_c"] for _, observation in rows), dtype=np.float64, count=count),
+            weather_code=np.fromiter((-1 if value is None else value for value in code), dtype=np.int16, count=count),
+            conditions=np.array([observation["conditions"] for _, observation in rows], dtype=str),
+        )
+
+    def __len__(self) -> int:
+        return len(self.city_id)
+
+    def take(self, indices: np.ndarray) -> "WeatherTable":
+        """Rows at `indices` (an index array or boolean mask), in that order."""
+        return WeatherTable(**{column: values[indices] for column, values in vars(self).items()})
+
+    def temperature(self, units: str = "C") -> np.ndarray:
+        if units == "F":
+            return self.temperature_c * 1.8 + 32
+        return self.temperature_c
+
+    def condition_groups(self) -> np.ndarray:
+        """Index into CONDITION_GROUPS for every row; unknown for missing codes."""
+        known = (self.weather_code >= 0) & (self.weather_code < len(_GROUP_OF_CODE))
+        return np.where(known, _GROUP_OF_CODE[np.clip(self.weather_code, 0, len(_GROUP_OF_CODE) - 1)], _UNKNOWN)
+
+    def mask(self, predicates: List[Callable[["WeatherTable"], np.ndarray]]) -> np.ndarray:
+        """Rows matching every predicate."""
+        selected = np.ones(len(self), dtype=bool)
+        for predicate in predicates:
+            selected &= predicate(self)
+        return selected
+
+    def order(self, sort_by: str) -> np.ndarray:
+        """Row indices in ranking order; ties keep the order cities were asked for."""
+        if sort_by == "warmest":
+            return np.argsort(-self.temperature_c, kind="stable")
+        if sort_by == "coldest":
+            return np.argsort(self.temperature_c, kind="stable")
+        if sort_by == "population":
+            return np.argsort(-self.population, kind="stable")
+        if sort_by == "name":
+            return np.argsort(np.char.lower(self.name), kind="stable")
+        raise ValueError(f"Unknown sort_by '{sort_by}'. Use one of: {', '.join(SORT_KEYS)}.")
+
+    def summary(self, units: str = "C") -> Dict[str, Any]:
+        """Temperature range and mean, warmest/coldest city and counts per condition group."""
+        if not len(self):
+            return {}
+        temperatures = self.temperature(units)
+        counts = np.bincount(self.condition_groups(), minlength=len(CONDITION_GROUPS))
+        return {
+            "warmest": str(self.name[np.argmax(temperatures)]),
+            "coldest": str(self.name[np.argmin(temperatures)]),
+            "max_temperature": round(float(temperatures.max()), 1),
+            "min_temperature": round(float(temperatures.min()), 1),
+            "mean_temperature": round(float(temperatures.mean()), 1),
+            "conditions": {group: int(count) for group, count in zip(CONDITION_GROUPS, counts) if count},
+        }
+
+    def records(self, units: str = "C") -> List[Dict[str, Any]]:
+        """Compact per-row dicts in table order, ranked from 1."""
+        temperatures = np.round(self.temperature(units), 1).tolist()
+        return [
+            {"rank": rank, "city": name, "country": country, "temperature": temperature, "conditions": conditions}
+            for rank, (name, country, temperature, conditions) in enumerate(
+                zip(self.name.tolist(), self.country.tolist(), temperatures, self.conditions.tolist()), start=1
+            )
+        ]